@@ -0,0 +1,489 @@
+import re
+import logging
+
+from arbitrage import profit_percentage
+
+logger = logging.getLogger(__name__)
+
+# --- Single-pass tokenizer for the forwarded alert formats ---
+# The message type is detected once from its markers. After that every line is
+# stripped and classified once (prefix dispatch plus precompiled patterns),
+# its value is extracted, and a typed token is emitted:
+#   (kind, line, value), kind in HEADER / BLOCK / PROFIT / EV_RANGE / PROB /
+#   SPORT / DATE / MATCH / BOOK / BOOKIE / LEG / STAKE / LEAGUE / EVENT / OTHER
+# Tokens are folded into blocks (one per surebet/middlebet) and the templates
+# render from those blocks only. The output is byte for byte the one produced
+# by the former per-template parsers (bench_formatters.py checks this against
+# a corpus).
+
+HEADER = "header"      # Channel header lines that are dropped
+BLOCK = "block"        # First line of a surebet / middlebet block
+PROFIT = "profit"
+EV_RANGE = "ev_range"
+PROB = "prob"
+SPORT = "sport"
+DATE = "date"
+MATCH = "match"
+BOOK = "book"          # Bookie leg line (📕 / 🏠)
+BOOKIE = "bookie"      # "Bet365:" (new surebet format)
+LEG = "leg"            # "▫️Over 2.5 → 2.10"
+STAKE = "stake"        # "▫️Stake: 35.62 $ Place Bet (url)"
+LEAGUE = "league"
+EVENT = "event"
+OTHER = "other"
+
+# Message types
+NEW_SUREBET = "new_surebet"
+SUREBETS = "surebets"
+MIDDLEBETS = "middlebets"
+
+# Markers in detection priority order. Plain substring scans: an alternation
+# regex over emoji-heavy text is several times slower than str.__contains__.
+_MARKERS = (
+    (NEW_SUREBET, ("💰 New surebet found!",)),
+    (SUREBETS, ("Alerta de Surebets", "💵 Rango Beneficio")),
+    (MIDDLEBETS, ("Alerta de Middlebets", "👑 Rango Valor Esperado")),
+)
+
+_PCT_RE = re.compile(r"([\d.,]+)%")
+_PCT_WITH_SIGN_RE = re.compile(r"([\d.,]+%)")
+_MATCH_RE = re.compile(r"^(.*?)\s*\((.*)\)\s*$")
+_EV_RE = re.compile(r"Mín\.\s*([\d.,]+%)\s*\|\s*📈 Máx\.\s*([\d.,]+%)")
+_BOOK_ODDS_RE = re.compile(r"@\s*([\d.,]+)")
+_BOOK_STAKE_RE = re.compile(r"\s*([\d.,]+%?)\s*(.*)")
+_NEW_STAKE_RE = re.compile(r"Stake:\s*([\d.,]+)")
+_NEW_URL_RE = re.compile(r"\((http.*?)\)")
+_BRANDED_ODDS_RE = re.compile(r"🎯 @([\d.]+)")
+_BRANDED_STAKE_RE = re.compile(r" 💰.*$")
+
+
+def detect(text):
+    """
+    Message type (NEW_SUREBET, SUREBETS, MIDDLEBETS) or None.
+    """
+    for kind, markers in _MARKERS:
+        for marker in markers:
+            if marker in text:
+                return kind
+    return None
+
+
+def calculate_profit_percentage(*odds):
+    # Profit % of a surebet with any number of legs (arbitrage.py), None if an odds is invalid
+    return profit_percentage(odds)
+
+
+def parse_book_line(line):
+    """
+    (casa, mercado, cuota, stake, sufijo) of a "📕 Casa 📍 Mercado 🎲 @cuota 💰 stake% sufijo"
+    line. Missing parts come back empty; without 📍 the whole line is the name.
+    """
+    line_wo_icon = line.replace("📕", "").replace("🏠", "").strip()
+    if "📍" not in line_wo_icon:
+        return line, "", "", "", ""
+
+    left, right = line_wo_icon.split("📍", 1)
+    right = right.strip()
+
+    # Mercado: hasta 🎲
+    part_after_odd = ""
+    if "🎲" in right:
+        market, part_after_odd = right.split("🎲", 1)
+        market = market.strip()
+        part_after_odd = part_after_odd.strip()
+    else:
+        market = right
+
+    # Cuota: después de @
+    m_odds = _BOOK_ODDS_RE.search(part_after_odd)
+    odds = m_odds.group(1) if m_odds else ""
+
+    # Stake y sufijo: después de 💰 ("14.01% ⚡️ Causa Surebet")
+    stake = suffix = ""
+    if "💰" in part_after_odd:
+        m_stake = _BOOK_STAKE_RE.match(part_after_odd.split("💰", 1)[1])
+        if m_stake:
+            stake = m_stake.group(1)
+            suffix = m_stake.group(2).strip()
+
+    return left.strip(), market, odds, stake, suffix
+
+
+# --- Tokenizers ---
+# Each returns the list of (kind, line, value) tokens of a message. Lines are
+# dispatched on their first character, so most of them cost one dict lookup.
+_LEAD = {
+    "⚽": SPORT, "🏀": SPORT, "🎾": SPORT, "🏈": SPORT,
+    "🗓": DATE, "📆": DATE,
+    "🏆": MATCH,
+}
+
+
+def _common_token(line, s, kind):
+    # Lines shared by the surebet and middlebet templates
+    if kind is SPORT:
+        parts = s.split(maxsplit=1)
+        return SPORT, line, (parts[0], parts[1] if len(parts) > 1 else "")
+    if kind is DATE:
+        parts = s.split(maxsplit=1)
+        return DATE, line, parts[1] if len(parts) > 1 else ""
+    if kind is MATCH:
+        raw = s[1:].strip()  # quitamos el emoji
+        m = _MATCH_RE.match(raw)
+        return MATCH, line, (m.group(1).strip(), m.group(2).strip()) if m else (raw, "")
+    if "📕" in s or "🏠" in s:
+        return BOOK, line, None
+    return OTHER, line, None
+
+
+def tokenize_surebets(text):
+    tokens = []
+    emit = tokens.append
+    lead = _LEAD.get
+    for line in text.splitlines():
+        s = line.strip()
+        if not s:
+            emit((OTHER, line, None))
+        elif s.startswith("💵 Rango Beneficio:") or "📢 Alerta de Surebets" in s:
+            emit((HEADER, line, None))
+        elif s.startswith("💎 Profit"):
+            m = _PCT_RE.search(s)
+            emit((BLOCK, line, m.group(1) if m else None))
+        else:
+            emit(_common_token(line, s, lead(s[0])))
+    return tokens
+
+
+def _middle_token(line, s):
+    if "📉 Mín." in s and "📈 Máx." in s:
+        m = _EV_RE.search(s)
+        return EV_RANGE, line, (m.group(1), m.group(2)) if m else None
+    if s.startswith("🍀"):
+        m = _PCT_WITH_SIGN_RE.search(s)
+        return PROB, line, m.group(1) if m else None
+    return _common_token(line, s, _LEAD.get(s[0]))
+
+
+def tokenize_middlebets(text):
+    tokens = []
+    emit = tokens.append
+    for line in text.splitlines():
+        s = line.strip()
+        if not s:
+            emit((OTHER, line, None))
+        elif s.startswith("👑 Rango Valor Esperado") or "📢 Alerta de Middlebets" in s:
+            emit((HEADER, line, None))
+        elif s.startswith("💎 Valor esperado"):
+            # The block opener is classified like any other block line too
+            emit((BLOCK, line, _middle_token(line, s)))
+        else:
+            emit(_middle_token(line, s))
+    return tokens
+
+
+# "Field: value" lines of the new surebet format, keyed on the text before ":"
+_NEW_FIELDS = {"Profit": PROFIT, "Sport": SPORT, "League": LEAGUE, "Event": EVENT, "Start at ": DATE}
+_NEW_RESERVED = ("Start at", "Profit", "Sport", "League", "Event")
+
+
+def tokenize_new_surebet(text):
+    tokens = []
+    emit = tokens.append
+    for line in text.splitlines():
+        s = line.strip()
+        head, sep, _ = s.partition(":")
+        kind = _NEW_FIELDS.get(head) if sep else None
+        if kind is not None:
+            value = s.replace(head + ":", "").strip()
+            emit((kind, s, value.replace("%", "") if kind is PROFIT else value))
+        elif s.endswith(":") and not s.startswith(_NEW_RESERVED):
+            emit((BOOKIE, s, s.rstrip(":")))
+        elif "→" in s:
+            parts = s.split("→")
+            emit((LEG, s, (parts[0].replace("▫️", "").strip(), parts[1].strip()) if len(parts) == 2 else None))
+        elif "Stake:" in s:
+            # ▫️Stake: 35.62 $ Place Bet (url)
+            c = s.replace("▫️", "").strip()
+            m_stake = _NEW_STAKE_RE.search(c)
+            m_url = _NEW_URL_RE.search(c)
+            emit((STAKE, s, (m_stake.group(1) if m_stake else None, m_url.group(1) if m_url else None)))
+        else:
+            emit((OTHER, s, None))
+    return tokens
+
+
+# --- IR: blocks ---
+def _new_block(line):
+    return {
+        'lines': [line], 'profit': "", 'min_ev': "", 'max_ev': "", 'prob': "",
+        'sport_emoji': "", 'sport_name': "", 'date': "", 'match': "", 'comp': "",
+        'books': []
+    }
+
+
+def _apply(block, kind, line, value):
+    if kind is OTHER:
+        return
+    if kind is BOOK:
+        if len(block['books']) < 2:
+            block['books'].append(parse_book_line(line))
+    elif kind is SPORT:
+        block['sport_emoji'], block['sport_name'] = value
+    elif kind is DATE:
+        block['date'] = value
+    elif kind is MATCH:
+        block['match'], block['comp'] = value
+    elif kind is EV_RANGE:
+        if value:
+            block['min_ev'], block['max_ev'] = value
+    elif kind is PROB:
+        if value:
+            block['prob'] = value
+
+
+def build_blocks(tokens):
+    """
+    Folds the tokens into blocks; lines before the first block are ignored.
+    """
+    blocks = []
+    current = None
+    for kind, line, value in tokens:
+        if kind is BLOCK:
+            current = _new_block(line)
+            blocks.append(current)
+            if isinstance(value, tuple):
+                _apply(current, *value)
+            elif value:
+                current['profit'] = value
+        elif current is not None and kind is not HEADER:
+            current['lines'].append(line)
+            _apply(current, kind, line, value)
+    return blocks
+
+
+# --- Templates ---
+def _render_event(out, block):
+    # Deporte
+    if block['sport_emoji'] or block['sport_name']:
+        out.append(f"{block['sport_emoji']} Deporte: {block['sport_name']}".strip())
+    # Fecha
+    if block['date']:
+        out.append(f"📆 Fecha: {block['date']}")
+    # Partido
+    if block['match']:
+        if block['comp']:
+            out.append(f"🏆 Partido: {block['match']} ({block['comp']})")
+        else:
+            out.append(f"🏆 Partido: {block['match']}")
+
+
+def _render_book(out, n, book):
+    name, market, odds, stake, suffix = book
+    out.append(f"🏦 Casa {n}: {name}")
+    if market:
+        out.append(f"   🎯 Mercado: {market}")
+    if odds:
+        out.append(f"   📊 Cuota: {odds}")
+    if stake or suffix:
+        suf = f"  {suffix}" if suffix else ""
+        out.append(f"   💰 % Stake: {stake}{suf}")
+
+
+def render_surebets(blocks):
+    out = ["📢 ALERTA DE SUREBETS (SIN RIESGO)", ""]
+    for idx, block in enumerate(blocks, start=1):
+        try:
+            out.append(f"{idx}️⃣ 🔥 -- SURESTABERA -- 🔥")
+            out.append(f"📈 PROFIT: {block['profit']}%" if block['profit'] else "📈 PROFIT:")
+            out.append("")
+            _render_event(out, block)
+            out.append("")
+            for n, book in enumerate(block['books'], start=1):
+                if n > 1:
+                    out.append("")
+                _render_book(out, n, book)
+        except Exception:
+            logger.exception("Error formateando surebet, devolviendo bloque original")
+            # Si algo falla, metemos el bloque original tal cual
+            out.append("\n".join(block['lines']))
+        if idx != len(blocks):
+            out.append("")
+            out.append("")
+    return "\n".join(out).strip()
+
+
+def render_middlebets(blocks):
+    out = ["📢 ALERTA DE MIDDLEBETS", ""]
+    for idx, block in enumerate(blocks, start=1):
+        try:
+            out.append(f"{idx}️⃣ 🔥 -- SURESTABERA -- 🔥")
+            if block['min_ev'] and block['max_ev']:
+                out.append(f"📉 Rango EV: {block['min_ev']}  →  {block['max_ev']}")
+            if block['prob']:
+                out.append(f"🍀 Probabilidad de middle: {block['prob']}")
+            out.append("")
+            _render_event(out, block)
+            out.append("")
+            out.append("🧩 Estructura del middle:")
+            for n, book in enumerate(block['books'], start=1):
+                out.append("")
+                _render_book(out, n, book)
+        except Exception:
+            logger.exception("Error formateando middlebet, devolviendo bloque original")
+            out.append("\n".join(block['lines']))
+        if idx != len(blocks):
+            out.append("")
+            out.append("")
+    return "\n".join(out).strip()
+
+
+def parse_new_surebet(tokens):
+    data = {}
+    bookies = []
+    current = {}
+    for kind, _, value in tokens:
+        if kind is PROFIT or kind is SPORT or kind is LEAGUE or kind is EVENT:
+            data[kind] = value
+        elif kind is DATE:
+            data['start'] = value
+        elif kind is BOOKIE:
+            if current:
+                bookies.append(current)
+            current = {'name': value}
+        elif kind is LEG:
+            if value:
+                current['market'], current['odds'] = value
+        elif kind is STAKE:
+            stake, url = value
+            if stake:
+                current['stake'] = stake
+            if url:
+                current['url'] = url
+    if current:
+        bookies.append(current)
+    return data, bookies
+
+
+def render_new_surebet(data, bookies):
+    out = []
+    out.append("📢 ALERTA DE SUREBETS (SIN RIESGO)")
+    out.append("")
+    out.append("1️⃣ 🔥 -- SURESTABERA -- 🔥")
+    out.append(f"📈 PROFIT: {data.get(PROFIT, '0')}%")
+    out.append("")
+
+    # Sport mapping (only emojis, no naming translation as requested)
+    sport_raw = data.get(SPORT, 'Unknown')
+    emoji = "🏆"
+    if "Basketball" in sport_raw or "Baloncesto" in sport_raw:
+        emoji = "🏀"
+    elif "Football" in sport_raw or "Soccer" in sport_raw or "Fútbol" in sport_raw:
+        emoji = "⚽️"
+    elif "Tennis" in sport_raw or "Tenis" in sport_raw:
+        emoji = "🎾"
+
+    out.append(f"{emoji} Deporte: {sport_raw}")
+    # Date (raw as requested)
+    out.append(f"📆 Fecha: {data.get('start', '')}")
+    out.append(f"🏆 Partido: {data.get(EVENT, '')} ({data.get(LEAGUE, '')})")
+    out.append("")
+
+    for i, b in enumerate(bookies):
+        b_url = b.get("url", "")
+        b_link_str = f" ({b_url})" if b_url else ""
+        out.append(f"🏦 Casa {i+1}: {b.get('name', '')}{b_link_str}")
+        out.append(f"   🎯 Mercado: {b.get('market', '')}")
+        out.append(f"   📊 Cuota: {b.get('odds', '')}")
+        out.append(f"   💰 % Stake: {b.get('stake', '')}%")
+        if i < len(bookies) - 1:
+            out.append("")
+
+    return "\n".join(out).strip()
+
+
+# --- Public formatters (same contract as before: text in, text out) ---
+def format_new_surebet(text):
+    try:
+        return render_new_surebet(*parse_new_surebet(tokenize_new_surebet(text)))
+    except Exception:
+        logger.exception("Error formatting new surebet")
+        return text
+
+
+def format_surebets(text):
+    blocks = build_blocks(tokenize_surebets(text))
+    return render_surebets(blocks) if blocks else text
+
+
+def format_middlebets(text):
+    blocks = build_blocks(tokenize_middlebets(text))
+    return render_middlebets(blocks) if blocks else text
+
+
+# --- Legs for the odds validator (odds_validator.py) ---
+def extract_surebets(text):
+    """
+    [(event, [{'bookie', 'market', 'odds'}, ...]), ...] of the surebets in a
+    channel alert. Middlebets and unknown formats give [].
+    """
+    kind = detect(text)
+    if kind is SUREBETS:
+        return [(block['match'], [{'bookie': name, 'market': market, 'odds': odds}
+                                  for name, market, odds, _, _ in block['books']])
+                for block in build_blocks(tokenize_surebets(text)) if block['match']]
+    if kind is NEW_SUREBET:
+        data, bookies = parse_new_surebet(tokenize_new_surebet(text))
+        if data.get(EVENT):
+            return [(data[EVENT], [{'bookie': b.get('name', ''), 'market': b.get('market', ''), 'odds': b.get('odds', '')}
+                                   for b in bookies])]
+    return []
+
+
+_FORMATTERS = {
+    NEW_SUREBET: format_new_surebet,
+    SUREBETS: format_surebets,
+    MIDDLEBETS: format_middlebets,
+}
+
+
+def modify_sure_middle_text(text):
+    kind = detect(text)
+    return _FORMATTERS[kind](text) if kind else text
+
+
+def modify_text(text):
+    """
+    SUREBETS25 -> SURESTABERA rebrand: drops the "💰 ... € para ..." tail of
+    the odds lines and recomputes PROFIT from the odds of each block (2 or more legs).
+    """
+    text = text.replace("SUREBETS25", "SURESTABERA")
+
+    header = "🔥 -- SURESTABERA -- 🔥"
+    parts = text.split(header)
+    if len(parts) < 2:
+        return text  # No hay bloques, devolver tal cual
+
+    modified_parts = [parts[0]]
+    for part in parts[1:]:
+        lines = part.strip().split('\n')
+        profit_line_idx = None
+        odds = []
+        for i, line in enumerate(lines):
+            if line.startswith("📈 PROFIT:"):
+                profit_line_idx = i
+            elif "🎯 @" in line:
+                match = _BRANDED_ODDS_RE.search(line)
+                if match:
+                    odds.append(match.group(1))
+                # Quitar "💰...€ para ..." pero dejar "🎯 @odds"
+                lines[i] = _BRANDED_STAKE_RE.sub("", line)
+
+        # Si hay 2 o más odds y una línea PROFIT, calcular profit y reemplazar
+        if len(odds) >= 2 and profit_line_idx is not None:
+            profit_pct = calculate_profit_percentage(*odds)
+            if profit_pct is not None:
+                lines[profit_line_idx] = f"📈 PROFIT: {profit_pct:.2f}%"
+
+        modified_parts.append('\n'.join(lines))
+
+    return header.join(modified_parts)
@@ -0,0 +1,160 @@
+import os
+import re
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# --- N-way arbitrage math ---
+# A page of bets is evaluated as one (bets x legs) odds matrix, padded with NaN
+# for bets with fewer legs, so profit and stakes of every bet come out of a
+# handful of NumPy operations instead of a Python loop per bet.
+#
+#   implied   = sum(1 / odds)             (< 1 means a surebet)
+#   profit %  = (1 / implied - 1) * 100
+#   stake_i   = bankroll * (1 / odds_i) / implied   (same return on every leg)
+#
+# Exchange legs pay (odds - 1) * (1 - commission) on a win, so they enter the
+# formulas with their effective odds. Rounded stakes (whole euros by default,
+# what a bookie actually accepts) are re-evaluated to give the profit that is
+# really guaranteed after rounding.
+
+EXCHANGE_COMMISSION = float(os.environ.get("EXCHANGE_COMMISSION", 0.05)) # Betfair base rate
+COMMISSIONS = {"betfair exchange": EXCHANGE_COMMISSION} # Lowercase bookie name -> commission on net winnings
+STAKE_BANKROLL = float(os.environ.get("STAKE_BANKROLL", 100)) # Total stake the suggested split adds up to
+STAKE_ROUNDING = float(os.environ.get("STAKE_ROUNDING", 1)) # Stakes are multiples of this
+
+_ODDS_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+Arbitrage = namedtuple("Arbitrage", "profit split stakes rounded_profit")
+
+
+def parse_odds(value):
+    # "2.10", "2,10", "@2.1" -> 2.1; anything else -> NaN
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _ODDS_RE.search(str(value or ""))
+    return float(match.group(0).replace(",", ".")) if match else float("nan")
+
+
+def commission_for(bookie):
+    return COMMISSIONS.get(str(bookie or "").strip().lower(), 0.0)
+
+
+def effective_odds(odds, commission=0.0):
+    return 1 + (odds - 1) * (1 - commission)
+
+
+def profit_percentage(odds, commissions=None):
+    """
+    Profit % of a single N-leg surebet, or None if any odds are invalid.
+    Plain Python: for one alert, NumPy's call overhead costs more than the math.
+    """
+    try:
+        inverse = 0.0
+        for i, o in enumerate(odds):
+            o = float(o)
+            if not 1 < o < math.inf:
+                return None  # Odds inválidas (NaN / inf included: no readable price)
+            inverse += 1 / effective_odds(o, commissions[i] if commissions else 0.0)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    if len(odds) < 2:
+        return None
+    return (1 / inverse - 1) * 100
+
+
+def evaluate(odds, commissions=None, bankroll=STAKE_BANKROLL, rounding=STAKE_ROUNDING):
+    """
+    Vectorized evaluation of a batch of surebets.
+
+    odds: (bets x legs) array, NaN where a bet has no such leg.
+    commissions: same shape (or broadcastable), commission per leg.
+    bankroll: scalar or one value per bet.
+
+    Returns an Arbitrage of arrays: profit % (NaN when the bet has fewer than
+    two legs or an invalid price), the stake split (fractions summing to 1),
+    the stakes rounded to `rounding`, and the profit % those rounded stakes
+    guarantee.
+    """
+    odds = np.atleast_2d(np.asarray(odds, dtype=float))
+    eff = odds if commissions is None else effective_odds(odds, np.asarray(commissions, dtype=float))
+    legs = ~np.isnan(eff)
+    valid = (legs.sum(axis=1) >= 2) & ~((~np.isfinite(eff) | (eff <= 1)) & legs).any(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse = np.where(legs & valid[:, None], 1 / eff, 0.0)
+        implied = inverse.sum(axis=1)
+        profit = np.where(valid, (1 / implied - 1) * 100, np.nan)
+        split = inverse / implied[:, None]
+
+        stakes = split * np.broadcast_to(np.asarray(bankroll, dtype=float), implied.shape)[:, None]
+        if rounding:
+            stakes = np.round(stakes / rounding) * rounding
+        total = stakes.sum(axis=1)
+        worst_return = np.where(legs, stakes * eff, np.inf).min(axis=1)
+        rounded_profit = np.where(valid & (total > 0), (worst_return / total - 1) * 100, np.nan)
+
+    split = np.where(valid[:, None], split, np.nan)
+    stakes = np.where(valid[:, None] & legs, stakes, np.nan)
+    return Arbitrage(profit, split, stakes, rounded_profit)
+
+
+def evaluate_bets(bets, legs_key="bets", bankroll=STAKE_BANKROLL, rounding=STAKE_ROUNDING):
+    """
+    Bet dicts (scraper bets: legs under 'bets', filter bot rows: under 'legs',
+    each leg with 'odds' and 'bookie') -> one dict per bet with 'profit',
+    'stake_pct', 'stakes' and 'rounded_profit'. Profit is None for bets that
+    cannot be verified. One NumPy pass for the whole list.
+    """
+    if not bets:
+        return []
+    width = max(2, max(len(b.get(legs_key) or ()) for b in bets))
+    odds = np.full((len(bets), width), np.nan)
+    commissions = np.zeros((len(bets), width))
+    for i, bet in enumerate(bets):
+        for j, leg in enumerate(bet.get(legs_key) or ()):
+            odds[i, j] = parse_odds(leg.get("odds"))
+            commissions[i, j] = commission_for(leg.get("bookie"))
+
+    arb = evaluate(odds, commissions, bankroll, rounding)
+    out = []
+    for i, bet in enumerate(bets):
+        n = len(bet.get(legs_key) or ())
+        if np.isnan(arb.profit[i]) or np.isnan(odds[i, :n]).any():  # Unreadable price on some leg
+            out.append({"profit": None, "stake_pct": [], "stakes": [], "rounded_profit": None})
+            continue
+        out.append({
+            "profit": round(float(arb.profit[i]), 2),
+            "stake_pct": [round(float(x) * 100, 2) for x in arb.split[i, :n]],
+            "stakes": [float(x) for x in arb.stakes[i, :n]],
+            "rounded_profit": round(float(arb.rounded_profit[i]), 2),
+        })
+    return out
+
+
+def profit_label(reported, arb):
+    """
+    Text of the alert's PROFIT line: the verified profit, what the rounded
+    stake lines really guarantee when that differs, and the feed's own figure
+    when it disagrees. The feed's figure alone when the bet could not be
+    verified.
+    """
+    if arb['profit'] is None:
+        return f"{reported}%"
+    label = f"{arb['profit']:.2f}%"
+    if arb['rounded_profit'] is not None and arb['rounded_profit'] != arb['profit']:
+        label += f" ({arb['rounded_profit']:.2f}% con los stakes indicados)"
+    try:
+        if abs(float(reported) - arb['profit']) >= 0.01:
+            label += f" (fuente: {reported}%)"
+    except (TypeError, ValueError):
+        pass
+    return label
+
+
+def annotate(bets, legs_key="bets", **kwargs):
+    # Stores the evaluation of every bet under bet['arb'] (one batch call)
+    for bet, arb in zip(bets, evaluate_bets(bets, legs_key, **kwargs)):
+        bet['arb'] = arb
+    return bets
@@ -0,0 +1,98 @@
+import sys
+import json
+import time
+import argparse
+import importlib
+
+# --- Alert formatter benchmark / golden check ---
+# Replays the alert corpus (alert_corpus.txt, messages separated by a
+# "-----" line) through the forwarder transforms, checks the output against
+# alert_corpus.golden.json and reports messages/s.
+#   python bench_formatters.py
+#   python bench_formatters.py --module old_formatters alert_tokenizer   # side by side
+#   python bench_formatters.py --save-golden                # after an intended output change
+
+CORPUS_FILE = "alert_corpus.txt"
+GOLDEN_FILE = "alert_corpus.golden.json"
+SEPARATOR = "\n-----\n"
+TRANSFORMS = ("modify_sure_middle_text", "modify_text")
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [m.strip("\n") for m in f.read().split(SEPARATOR) if m.strip()]
+
+
+def run_all(module, corpus):
+    return {name: [getattr(module, name)(msg) for msg in corpus] for name in TRANSFORMS}
+
+
+def golden_check(outputs, path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            golden = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️ {path} not found, skipping golden check (use --save-golden).")
+        return True
+    ok = True
+    for name in TRANSFORMS:
+        for i, (got, expected) in enumerate(zip(outputs[name], golden.get(name, []))):
+            if got != expected:
+                ok = False
+                print(f"❌ {name} differs on message #{i + 1}")
+        if len(outputs[name]) != len(golden.get(name, [])):
+            ok = False
+            print(f"❌ {name}: {len(outputs[name])} outputs vs {len(golden.get(name, []))} in golden file")
+    if ok:
+        print(f"✅ Output identical to {path}")
+    return ok
+
+
+def bench(module, corpus, repeat, rounds):
+    print(f"\n{'transform':<26}{'msgs':>6}{'µs/msg':>10}{'msgs/s':>10}")
+    for name in TRANSFORMS:
+        fn = getattr(module, name)
+        for msg in corpus:
+            fn(msg)  # Warm-up
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for msg in corpus:
+                    fn(msg)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        n = repeat * len(corpus)
+        print(f"{name:<26}{len(corpus):>6}{best / n * 1e6:>10.1f}{n / best:>10.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the forwarder alert formatters")
+    ap.add_argument("--module", nargs="+", default=["alert_tokenizer"], help="Module(s) providing the transforms")
+    ap.add_argument("--corpus", default=CORPUS_FILE)
+    ap.add_argument("--golden", default=GOLDEN_FILE)
+    ap.add_argument("--repeat", type=int, default=1000)
+    ap.add_argument("--rounds", type=int, default=5, help="Best of N rounds is reported")
+    ap.add_argument("--save-golden", action="store_true")
+    args = ap.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"📦 {len(corpus)} messages from {args.corpus}")
+    ok = True
+    for name in args.module:
+        module = importlib.import_module(name)
+        outputs = run_all(module, corpus)
+        print(f"\n🔎 {name}")
+        if args.save_golden:
+            with open(args.golden, "w", encoding="utf-8") as f:
+                json.dump(outputs, f, ensure_ascii=False, indent=1)
+            print(f"💾 Golden outputs saved to {args.golden}")
+            args.save_golden = False  # Only the first module writes it
+        elif not golden_check(outputs, args.golden):
+            ok = False
+        bench(module, corpus, args.repeat, args.rounds)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import re
+import sys
+import time
+import logging
+import argparse
+import tracemalloc
+
+import surebet_parser
+
+# --- Parser benchmark / golden check ---
+# Replays bethero_dump.html and synthetic pages built by repeating its rows,
+# checks every backend returns exactly what the bs4 reference returns, and
+# reports rows/s and peak Python allocations per backend (tracemalloc does not
+# see libxml2/lexbor's own C heap).
+#   python bench_parser.py --rows 500 --repeat 20
+
+DUMP_FILE = "bethero_dump.html"
+
+_TBODY_RE = re.compile(r'(<tbody[^>]*role="rowgroup"[^>]*>)(.*?)(</tbody>)', re.S)
+_PROFIT_RE = re.compile(r'(\d+(?:\.\d+)?)%')
+
+
+def synthetic_page(html, n_rows):
+    """
+    Same page with the surebet rows repeated up to n_rows. Profits are shifted
+    per copy so every row is distinct.
+    """
+    m = _TBODY_RE.search(html)
+    if not m:
+        raise ValueError("No tbody[role=rowgroup] in the dump")
+    rows = re.findall(r'<tr[^>]*role="row".*?</tr>', m.group(2), re.S)
+    if not rows:
+        raise ValueError("No rows in the dump")
+
+    out = []
+    for i in range(n_rows):
+        copy = i // len(rows)
+        row = rows[i % len(rows)]
+        if copy:
+            row = _PROFIT_RE.sub(lambda p: f"{float(p.group(1)) + copy / 100:.2f}%", row)
+        out.append(row)
+    return html[:m.start(2)] + "".join(out) + html[m.end(2):]
+
+
+def golden_check(pages):
+    ok = True
+    for label, html in pages:
+        expected = surebet_parser.extract_rows_bs4(html)
+        for name, fn in surebet_parser.BACKENDS.items():
+            got = fn(html)
+            if got != expected:
+                ok = False
+                bad = next((i for i, (a, b) in enumerate(zip(got, expected)) if a != b), min(len(got), len(expected)))
+                print(f"❌ {name} differs from bs4 on {label} (row {bad}, {len(got)} vs {len(expected)} rows)")
+                if bad < len(got) and bad < len(expected):
+                    print(f"   bs4:  {expected[bad]}")
+                    print(f"   {name}: {got[bad]}")
+            else:
+                print(f"✅ {name} matches bs4 on {label} ({len(expected)} rows)")
+    return ok
+
+
+def bench(pages, repeat):
+    print(f"\n{'page':<12}{'backend':<12}{'rows':>6}{'ms/page':>10}{'rows/s':>10}{'py KB':>10}")
+    for label, html in pages:
+        for name, fn in surebet_parser.BACKENDS.items():
+            rows = len(fn(html))  # Warm-up (imports, compiled selectors)
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fn(html)
+            elapsed = (time.perf_counter() - start) / repeat
+
+            tracemalloc.start()
+            fn(html)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            rate = rows / elapsed if elapsed else 0
+            print(f"{label:<12}{name:<12}{rows:>6}{elapsed * 1000:>10.2f}{rate:>10.0f}{peak / 1024:>10.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the surebets parser backends")
+    ap.add_argument("--dump", default=DUMP_FILE)
+    ap.add_argument("--rows", type=int, nargs="*", default=[100, 500, 1000], help="Synthetic page sizes")
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--check-only", action="store_true", help="Golden check, no timings")
+    args = ap.parse_args()
+
+    logging.disable(logging.INFO)  # The per-row debug logs would dominate the timings
+
+    with open(args.dump, encoding="utf-8") as f:
+        html = f.read()
+    pages = [("dump", html)] + [(f"{n} rows", synthetic_page(html, n)) for n in args.rows]
+
+    print(f"📦 Backends: {', '.join(surebet_parser.BACKENDS)} (auto = {surebet_parser.get_backend('auto')[0]})")
+    ok = golden_check(pages)
+    if not args.check_only:
+        bench(pages, args.repeat)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# --- In-process Bet Bus ---
+# Hands freshly persisted surebets from the scraper thread to the filter bot
+# event loop without waiting for the next SQLite poll. SQLite stays the durable
+# log: anything published while no consumer is attached is picked up by the
+# bot's catch-up replay from last_processed_id.
+
+
+class BetBus:
+    def __init__(self, maxsize=1000):
+        self._maxsize = maxsize
+        self._loop = None
+        self._queue = None
+
+    @property
+    def attached(self):
+        return self._loop is not None and not self._loop.is_closed()
+
+    def attach(self):
+        """
+        Binds the bus to the running event loop (call from inside the consumer loop).
+        """
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._maxsize)
+        logger.info("🚌 Bet bus attached to consumer loop.")
+
+    def detach(self):
+        self._loop = None
+        self._queue = None
+
+    def publish(self, bet):
+        """
+        Thread-safe. Returns False when no consumer is attached (the bet is
+        still in SQLite and will be replayed).
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return False
+        try:
+            loop.call_soon_threadsafe(self._put, bet)
+            return True
+        except RuntimeError:
+            # Loop closed between the check and the call
+            return False
+
+    def _put(self, bet):
+        try:
+            self._queue.put_nowait(bet)
+        except asyncio.QueueFull:
+            # Consumer is far behind: drop the push, the DB replay will catch it up
+            logger.warning(f"⚠️ Bet bus full, bet {bet.get('id')} left for DB catch-up.")
+
+    async def get(self):
+        return await self._queue.get()
+
+    def drain(self):
+        """
+        Everything queued right now, without waiting.
+        """
+        items = []
+        while self._queue and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    def qsize(self):
+        return self._queue.qsize() if self._queue else 0
+
+
+# Shared instance for the combined deployment (scraper + bot in one process)
+BET_BUS = BetBus()
@@ -0,0 +1,163 @@
+import json
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# --- BetHero JSON capture ---
+# app.betherosports.com is a Next.js app that fills the surebets table from JSON
+# requests. Reading those responses directly skips HTML rendering/parsing and
+# gives numeric odds. Two ways to get them:
+#   1. CDP: Chrome performance log on the existing uc.Chrome driver, then
+#      Network.getResponseBody for every JSON response whose URL matches.
+#   2. Replay: GET the endpoint ourselves (BETHERO_API_URL) with the session
+#      cookies of the browser / bethero_cookies.json.
+# The payload schema is not documented, so rows_from_payload() looks for the
+# list of surebet-like objects and maps the usual field names.
+
+DEFAULT_URL_FILTER = "surebet"
+
+PROFIT_KEYS = ("profit", "profit_percentage", "profitPercentage", "percent", "roi")
+EVENT_KEYS = ("event", "event_name", "eventName", "match", "name")
+LEAGUE_KEYS = ("league", "league_name", "leagueName", "tournament", "competition")
+START_KEYS = ("start_time", "startTime", "starts_at", "startsAt", "start", "date")
+LEGS_KEYS = ("bets", "legs", "outcomes", "selections", "odds")
+BOOKIE_KEYS = ("bookie", "bookmaker", "bookmaker_name", "bookmakerName", "name")
+MARKET_KEYS = ("market", "market_name", "marketName", "bet", "type")
+ODDS_KEYS = ("odds", "price", "value", "coef", "odd")
+
+
+# --- CDP capture ---
+def enable_network_capture(options):
+    """
+    Must be called on the ChromeOptions before the driver is created.
+    """
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def drain_json_responses(driver, url_filter=DEFAULT_URL_FILTER):
+    """
+    Returns the decoded JSON bodies of the responses seen since the last call
+    whose URL contains `url_filter`.
+    """
+    payloads = []
+    for entry in driver.get_log("performance"):
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        if msg.get("method") != "Network.responseReceived":
+            continue
+        params = msg.get("params", {})
+        response = params.get("response", {})
+        if "json" not in (response.get("mimeType") or ""):
+            continue
+        if url_filter and url_filter not in response.get("url", ""):
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+            payloads.append(json.loads(body.get("body") or "null"))
+        except Exception as e:
+            # Body already evicted by Chrome or not JSON after all
+            logger.debug(f"Could not read response body: {e}")
+    return payloads
+
+
+# --- Replay ---
+def build_session(cookies):
+    session = requests.Session()
+    session.headers.update({"Accept": "application/json"})
+    sync_cookies(session, cookies)
+    return session
+
+
+def sync_cookies(session, cookies):
+    # Accepts Selenium cookie dicts (bethero_cookies.json or driver.get_cookies())
+    for c in cookies or []:
+        session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+
+
+def fetch(session, url, timeout=10):
+    resp = session.get(url, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+# --- Payload mapping ---
+def _pick(obj, keys, default=None):
+    for k in keys:
+        if k in obj and obj[k] not in (None, ""):
+            return obj[k]
+    return default
+
+
+def _name(value):
+    # Fields like {"bookmaker": {"name": "bet365"}} or plain strings
+    if isinstance(value, dict):
+        return _pick(value, ("name", "title", "slug"), "")
+    return value
+
+
+def _float(value):
+    try:
+        return float(str(value).replace("%", "").replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def _find_rows(payload, depth=0):
+    # Largest list of dicts that carry a profit-like key
+    best = []
+    if depth > 6:
+        return best
+    if isinstance(payload, list):
+        if payload and all(isinstance(x, dict) for x in payload) and any(_pick(x, PROFIT_KEYS) is not None for x in payload):
+            best = payload
+        for x in payload:
+            found = _find_rows(x, depth + 1)
+            if len(found) > len(best):
+                best = found
+    elif isinstance(payload, dict):
+        for v in payload.values():
+            found = _find_rows(v, depth + 1)
+            if len(found) > len(best):
+                best = found
+    return best
+
+
+def rows_from_payload(payload):
+    """
+    Maps a JSON payload to raw rows in the extract_rows() format, with
+    numeric profit and odds.
+    """
+    rows = []
+    for item in _find_rows(payload):
+        legs = _pick(item, LEGS_KEYS, [])
+        if not isinstance(legs, list):
+            continue
+
+        markets = []
+        bookmakers = []
+        for leg in legs:
+            if not isinstance(leg, dict):
+                continue
+            odds = _float(_pick(leg, ODDS_KEYS))
+            if odds is None:
+                continue
+            markets.append(str(_name(_pick(leg, MARKET_KEYS, "")) or ""))
+            bookmakers.append({"name": str(_name(_pick(leg, BOOKIE_KEYS, "Unknown")) or "Unknown"), "odds": odds})
+
+        profit = _float(_pick(item, PROFIT_KEYS))
+        if profit is None or not bookmakers:
+            continue
+
+        rows.append({
+            "profit": profit,
+            "league": str(_name(_pick(item, LEAGUE_KEYS, "Unknown League"))),
+            "event": str(_name(_pick(item, EVENT_KEYS, "Unknown Event"))),
+            "markets": markets,
+            "bookmakers": bookmakers,
+            "start_time": str(_pick(item, START_KEYS, ""))
+        })
+    return rows
@@ -0,0 +1,136 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# --- In-page MutationObserver for the BetHero surebets table ---
+# Instead of pulling the whole driver.page_source (~110 KB) and re-parsing it
+# with BeautifulSoup every tick, we install an observer on the table body that
+# remembers which rows were added or changed. Each tick Python drains only
+# those rows, already reduced to the same fields extract_rows() produces.
+
+# Text helper mirrors BeautifulSoup's get_text(strip=True): every text node is
+# stripped and the pieces are joined with no separator.
+_JS_HELPERS = r"""
+function __robinText(el) {
+    if (!el) return '';
+    var out = [];
+    var walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT, null);
+    var n;
+    while ((n = walker.nextNode())) {
+        var t = n.nodeValue.trim();
+        if (t) out.push(t);
+    }
+    return out.join('');
+}
+
+function __robinRow(row) {
+    var profitEl = row.querySelector('td:nth-child(1) .text-green-500');
+    if (!profitEl) return null;
+    var eventTd = row.querySelector('td:nth-child(2)');
+    if (!eventTd) return null;
+
+    var leagueEl = eventTd.querySelector('.line-clamp-1');
+    var eventEl = eventTd.querySelector('.font-bold');
+    var marketTd = row.querySelector('td:nth-child(3)');
+    var bookieTd = row.querySelector('td:nth-child(4)');
+    var timeTd = row.querySelector('td:nth-child(5)');
+
+    var markets = [];
+    if (marketTd) {
+        marketTd.querySelectorAll('.line-clamp-2').forEach(function (d) { markets.push(__robinText(d)); });
+    }
+
+    var bookmakers = [];
+    if (bookieTd) {
+        bookieTd.querySelectorAll('div.flex.items-center.gap-2').forEach(function (br) {
+            var oddsDiv = br.querySelector('div[class*="text-left"]');
+            var img = br.querySelector('img');
+            var name = 'Unknown';
+            if (img && img.hasAttribute('alt')) name = img.getAttribute('alt').replace(' logo', '').trim();
+            bookmakers.push({name: name, odds: oddsDiv ? __robinText(oddsDiv) : '0.0'});
+        });
+    }
+    if (!bookmakers.length) return null;
+
+    return {
+        profit: __robinText(profitEl).replace('%', ''),
+        league: leagueEl ? __robinText(leagueEl) : 'Unknown League',
+        event: eventEl ? __robinText(eventEl) : 'Unknown Event',
+        markets: markets,
+        bookmakers: bookmakers,
+        start_time: timeTd ? __robinText(timeTd) : ''
+    };
+}
+"""
+
+INSTALL_JS = _JS_HELPERS + r"""
+var tbody = document.querySelector('table[role="table"] tbody[role="rowgroup"]');
+if (!tbody) return 'missing';
+if (window.__robinObserver && window.__robinTbody === tbody) return 'active';
+if (window.__robinObserver) window.__robinObserver.disconnect();
+
+window.__robinText = __robinText;
+window.__robinRow = __robinRow;
+window.__robinTbody = tbody;
+window.__robinPending = new Set();
+window.__robinLast = new WeakMap();
+
+// Every row already on screen is reported on the first drain
+tbody.querySelectorAll('tr[role="row"]').forEach(function (r) { window.__robinPending.add(r); });
+
+window.__robinObserver = new MutationObserver(function (mutations) {
+    mutations.forEach(function (m) {
+        var node = m.target.nodeType === 1 ? m.target : m.target.parentElement;
+        var row = node && node.closest ? node.closest('tr[role="row"]') : null;
+        if (row) window.__robinPending.add(row);
+        m.addedNodes.forEach(function (a) {
+            if (a.nodeType !== 1) return;
+            if (a.matches('tr[role="row"]')) window.__robinPending.add(a);
+            a.querySelectorAll('tr[role="row"]').forEach(function (r) { window.__robinPending.add(r); });
+        });
+    });
+});
+window.__robinObserver.observe(tbody, {childList: true, subtree: true, characterData: true});
+return 'installed';
+"""
+
+# Returns null when the observer is gone (navigation / table re-mounted)
+DRAIN_JS = r"""
+if (!window.__robinObserver || !window.__robinTbody || !document.contains(window.__robinTbody)) return null;
+var out = [];
+window.__robinPending.forEach(function (row) {
+    if (!row.isConnected) return;
+    var payload = window.__robinRow(row);
+    if (!payload) return;
+    var sig = JSON.stringify(payload);
+    if (window.__robinLast.get(row) === sig) return;  // Re-render without real change
+    window.__robinLast.set(row, sig);
+    out.push(payload);
+});
+window.__robinPending.clear();
+return JSON.stringify(out);
+"""
+
+
+def install(driver):
+    """
+    Installs (or re-installs) the observer. Returns 'installed', 'active' or
+    'missing' (table not rendered yet).
+    """
+    try:
+        return driver.execute_script(INSTALL_JS)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not install DOM observer: {e}")
+        return 'missing'
+
+
+def drain(driver):
+    """
+    Returns the rows added/changed since the last drain (extract_rows format),
+    or None if the observer has to be re-installed.
+    """
+    raw = driver.execute_script(DRAIN_JS)
+    if raw is None:
+        return None
+    return json.loads(raw)
@@ -6,8 +6,9 @@ import logging
 import re
 import sys
 import json
-import sqlite3
-from datetime import datetime
+import database as db
+import migrations
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 load_dotenv() # Load variables from .env
@@ -21,6 +22,22 @@ from bs4 import BeautifulSoup
 # Telegram dependencies
 from telethon import TelegramClient
 from telethon.sessions import StringSession
+from telethon.errors import FloodWaitError
+
+from bet_bus import BET_BUS
+import bethero_observer
+import bethero_api
+from dedup_store import DedupStore
+from surebet_parser import extract_rows
+from browser_worker import BrowserWorker
+from rate_limit import TokenBucket
+from latency import LATENCY
+import arbitrage
+from odds_validator import ODDS_BOOK
+from sport_classifier import classify_sport, sport_emoji
+from bookie_registry import legs_mask
+from metrics import (REGISTRY, BETS_SCRAPED, BETS_DEDUPED, BETS_PERSISTED, ALERTS_SENT, ALERTS_FAILED,
+                     PARSE_SECONDS, PAGE_SOURCE_SECONDS, SEND_SECONDS, LAST_DOM)
 
 # Configuration
 try:
@@ -47,7 +64,18 @@ if API_ID == 0 or not API_HASH or not SESSION:
 
 # Scraper Configuration
 CHECK_INTERVAL = 10 # Seconds between checks
-SEEN_BETS = set() # To store IDs of sent bets
+# "dom" = read and parse the whole page_source every CHECK_INTERVAL
+# "observer" = in-page MutationObserver, only changed rows are pulled (sub-second polling)
+# "api" = read the JSON the web app itself loads (CDP network capture, or replay of BETHERO_API_URL)
+SCRAPE_MODE = os.environ.get("SCRAPE_MODE", "dom").strip().lower()
+OBSERVER_POLL_INTERVAL = float(os.environ.get("OBSERVER_POLL_INTERVAL", "0.5") or "0.5")
+API_POLL_INTERVAL = float(os.environ.get("API_POLL_INTERVAL", "1") or "1")
+BETHERO_API_URL = os.environ.get("BETHERO_API_URL", "").strip() # Set to replay the request instead of sniffing it
+BETHERO_API_FILTER = os.environ.get("BETHERO_API_FILTER", bethero_api.DEFAULT_URL_FILTER) # URL substring of the JSON feed
+POLL_INTERVALS = {"observer": OBSERVER_POLL_INTERVAL, "api": API_POLL_INTERVAL}
+# Hashed bet signatures, expiring after the event starts, persisted so restarts don't re-send
+SEEN_BETS = DedupStore("scraper", persist=True)
+REGISTRY.gauge("scraper_seen_bets", "Entries in the scraper dedup store.", fn=lambda: len(SEEN_BETS))
 
 # Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -56,179 +84,165 @@ logger = logging.getLogger(__name__)
 
 # --- Database Integration ---
 # Use absolute path to avoid confusion
-DB_NAME = os.path.abspath("surebets.db")
+DB_NAME = db.DB_NAME
 
 def init_db():
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS surebets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                event TEXT,
-                league TEXT,
-                profit REAL,
-                bookies_json TEXT, -- Stores JSON list of bookmakers/markets
-                raw_id TEXT UNIQUE -- To prevent duplicates in DB if needed
-            )
-        ''')
-        # Enable WAL mode for better concurrency (Scraper writing, Bot reading)
-        cursor.execute("PRAGMA journal_mode=WAL;")
-        conn.commit()
-        conn.close()
-        logger.info(f"✅ Database initialized at: {DB_NAME}")
+        # Tables, columns and indexes are versioned in migrations.py
+        # WAL mode (Scraper writing, Bot reading) and the other pragmas are set by database.py
+        version = migrations.migrate()
+        logger.info(f"✅ Database initialized at: {DB_NAME} (schema v{version})")
         print(f"📂 DATABASE LOCATION: {DB_NAME}") # Print for user to see
     except Exception as e:
         logger.error(f"❌ Database error: {e}")
 
 def save_bet_to_db(bet):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        
         # Serialize bookmakers info to JSON
         bookies_json = json.dumps(bet['bets'], ensure_ascii=False)
+        # Same format as CURRENT_TIMESTAMP, set here so the pushed row matches the stored one
+        found_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        profit = float(bet['profit'])
+        start_time = bet.get('start_time') or None
         
-        # We use 'event' + 'profit' + 'first_bookie_odds' as a rough unique signature,
-        # but here we rely on the main loop's SEEN_BETS to filter real-time dupes.
-        # For the DB, we can just insert every "alert" we sent.
+        # Same signature as SEEN_BETS (migrations.bet_signature). content_hash is UNIQUE,
+        # so a bet re-seen after a restart or by another scraper worker is not stored twice.
+        first_odds = bet['bets'][0]['odds'] if bet['bets'] else ''
+        raw_id = f"{bet['event']}_{bet['profit']}_{first_odds}"
+        content_hash = migrations.bet_signature(bet['event'], profit, first_odds)
+        leg_count, implied_prob, max_odds = migrations.odds_summary(bet['bets'])
+        sport = bet.get('sport') or classify_sport(bet['league'], bet['event'])
+        bookies_mask = legs_mask(bet['bets']) # Bookie ids of the legs (bookie_registry)
         
-        cursor.execute('''
-            INSERT INTO surebets (event, league, profit, bookies_json, raw_id)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (bet['event'], bet['league'], float(bet['profit']), bookies_json, f"{bet['event']}_{bet['profit']}_{datetime.now().timestamp()}"))
+        with db.transaction() as conn:
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO surebets (found_at, event, league, profit, bookies_json, raw_id, content_hash,
+                                                start_time, start_ts, leg_count, implied_prob, max_odds, sport, bookies_mask)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (found_at, bet['event'], bet['league'], profit, bookies_json, raw_id, content_hash,
+                  start_time, migrations.start_timestamp(start_time, found_at), leg_count, implied_prob, max_odds,
+                  sport, bookies_mask))
+            if not cursor.rowcount:
+                logger.info(f"♻️ Bet already in database, not stored again.")
+                BETS_DEDUPED.inc(stage="db")
+                return None
+            bet_id = cursor.lastrowid
+            # One row per leg (bookie dimension + numeric odds), same commit as the bet
+            migrations.insert_legs(conn, bet_id, bet['bets'])
         
-        conn.commit()
-        conn.close()
         logger.info(f"💾 Bet saved to database.")
+        BETS_PERSISTED.inc()
+        trace = LATENCY.stamp(bet.setdefault('trace', {}), 'persisted')
     except Exception as e:
         logger.error(f"❌ Failed to save to DB: {e}")
+        return None
+
+    # Push to the filter bot right after the commit (combined deployment only)
+    BET_BUS.publish({
+        'id': bet_id,
+        'found_at': found_at,
+        'event': bet['event'],
+        'league': bet['league'],
+        'sport': sport,
+        'bookies_mask': bookies_mask,
+        'profit': profit,
+        'bookies_json': bookies_json,
+        'legs': bet['bets'],
+        'start_time': start_time,
+        'trace': trace
+    })
+    return bet_id
+
+# Flood control for channel posts (user accounts get FloodWait past ~20 msg/min per chat)
+TELEGRAM_BUCKET = TokenBucket(rate=1/3, capacity=5)
 
 async def send_to_telegram(client, chat_id, message):
     try:
         if chat_id == 0:
             logger.warning(f"Destination chat not set, cannot send message.")
             return
-        await client.send_message(chat_id, message)
+        for attempt in range(2):
+            await TELEGRAM_BUCKET.acquire()
+            try:
+                with SEND_SECONDS.time(sender="scraper"):
+                    await client.send_message(chat_id, message)
+                break
+            except FloodWaitError as fw:
+                # Telegram tells us exactly how long to wait: pause every sender, retry once
+                logger.warning(f"⏳ FloodWait {fw.seconds}s sending to {chat_id}")
+                TELEGRAM_BUCKET.pause(fw.seconds)
+                if attempt:
+                    raise
         logger.info(f"✅ Message sent to {chat_id}")
+        ALERTS_SENT.inc(destination=str(chat_id))
     except Exception as e:
         logger.error(f"❌ Error sending message: {e}")
+        ALERTS_FAILED.inc(destination=str(chat_id))
 
-def get_sport_emoji(sport_text):
-    s = sport_text.lower()
-    if "basketball" in s or "baloncesto" in s or "nba" in s or "ncaa" in s or "euroleague" in s:
-        return "🏀"
-    if "soccer" in s or "football" in s or "fútbol" in s:
-        return "⚽️"
-    if "tennis" in s or "tenis" in s:
-        return "🎾"
-    return "🏆"
-
-def parse_surebets(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    rows = soup.select('table[role="table"] tbody[role="rowgroup"] tr[role="row"]')
-    
+def build_new_bets(raw_rows):
+    """
+    Turns raw rows (from extract_rows or the in-page observer) into bet objects,
+    dropping the ones already seen.
+    """
     new_bets = []
-    logger.info(f"DEBUG: Parsing {len(rows)} rows...")
-    
-    for i, row in enumerate(rows):
-        try:
-            # 1. Profit
-            profit_elem = row.select_one('td:nth-child(1) .text-green-500')
-            if not profit_elem:
-                logger.info(f"Row {i}: No profit element found. Skipping.")
-                continue
-            profit = profit_elem.get_text(strip=True).replace('%', '')
-            
-            # 2. Event & League
-            event_td = row.select_one('td:nth-child(2)')
-            if not event_td:
-                logger.info(f"Row {i}: No event column. Skipping.")
-                continue
-                
-            league = event_td.select_one('.line-clamp-1').get_text(strip=True) if event_td.select_one('.line-clamp-1') else "Unknown League"
-            event_name = event_td.select_one('.font-bold').get_text(strip=True) if event_td.select_one('.font-bold') else "Unknown Event"
-            
-            # 3. Markets (Bets)
-            market_td = row.select_one('td:nth-child(3)')
-            markets = [div.get_text(strip=True) for div in market_td.select('.line-clamp-2')] if market_td else []
-            
-            # 4. Bookmakers & Odds
-            bookie_td = row.select_one('td:nth-child(4)')
-            # Use a more generic selector for bookie rows in the cell
-            bookie_rows = bookie_td.select('div.flex.items-center.gap-2') if bookie_td else []
-            
-            bookmakers = []
-            for br in bookie_rows:
-                # Try finding text directly if class selector fails
-                # The text is usually in a div with w-12 or just text-left
-                odds_div = br.select_one('div[class*="text-left"]') 
-                odds = odds_div.get_text(strip=True) if odds_div else "0.0"
-                
-                img = br.select_one('img')
-                name = "Unknown"
-                if img and 'alt' in img.attrs:
-                    name = img['alt'].replace(' logo', '').strip()
-                
-                bookmakers.append({'name': name, 'odds': odds})
-            
-            if not bookmakers:
-                 logger.info(f"Row {i}: No bookmakers found. Skipping.")
-                 continue
-
-            # 5. Start Time
-            time_td = row.select_one('td:nth-child(5)')
-            start_time = time_td.get_text(strip=True) if time_td else ""
-            
-            # Construct Unique ID
-            unique_id = f"{event_name}_{profit}_{bookmakers[0]['odds'] if bookmakers else ''}"
-            
-            if unique_id in SEEN_BETS:
-                # logger.info(f"Row {i}: duplicate {unique_id}")
-                continue
-                
-            SEEN_BETS.add(unique_id)
-            logger.info(f"Row {i}: ✅ New Surebet found: {unique_id}")
-            
-            # Map markets to bookmakers (assuming order matches, checking length)
-            # Table has markets stacked, bookies stacked. Usually 1-to-1.
-            # Safety check
-            bets_data = []
-            count = min(len(markets), len(bookmakers))
-            for i in range(count):
-                bets_data.append({
-                    'market': markets[i],
-                    'bookie': bookmakers[i]['name'],
-                    'odds': bookmakers[i]['odds']
-                })
-            
-            bet_obj = {
-                'profit': profit,
-                'league': league,
-                'event': event_name,
-                'start_time': start_time,
-                'bets': bets_data
-            }
-            new_bets.append(bet_obj)
-            
-        except Exception as e:
-            logger.error(f"Error parsing row: {e}")
+    BETS_SCRAPED.inc(len(raw_rows))
+    now = time.time()
+    for i, r in enumerate(raw_rows):
+        bookmakers = r['bookmakers']
+        markets = r['markets']
+        
+        # Map markets to bookmakers (assuming order matches, checking length)
+        # Table has markets stacked, bookies stacked. Usually 1-to-1.
+        # Safety check
+        bets_data = []
+        count = min(len(markets), len(bookmakers))
+        for j in range(count):
+            bets_data.append({
+                'market': markets[j],
+                'bookie': bookmakers[j]['name'],
+                'odds': bookmakers[j]['odds']
+            })
+        # Every row on the page (new or not) refreshes the odds book used to re-price alerts
+        ODDS_BOOK.observe(r['event'], bets_data, "bethero", now)
+        
+        # Construct Unique ID (same signature as surebets.content_hash)
+        first_odds = bookmakers[0]['odds'] if bookmakers else ''
+        unique_id = f"{r['event']}_{r['profit']}_{first_odds}"
+        
+        if not SEEN_BETS.check_and_add(migrations.bet_signature(r['event'], r['profit'], first_odds), r['start_time']):
+            # logger.info(f"Row {i}: duplicate {unique_id}")
+            BETS_DEDUPED.inc(stage="scraper")
             continue
             
+        logger.info(f"Row {i}: ✅ New Surebet found: {unique_id}")
+        
+        bet_obj = {
+            'profit': r['profit'],
+            'league': r['league'],
+            'event': r['event'],
+            'sport': classify_sport(r['league'], r['event']), # Once per bet, stored with it
+            'start_time': r['start_time'],
+            'bets': bets_data
+        }
+        new_bets.append(bet_obj)
+        
     return new_bets
 
+def parse_surebets(html):
+    return build_new_bets(extract_rows(html))
+
 def format_message(bet, branding="ROBINSURESHOOD"):
     # Recreate the style from bot_sures.py format_new_surebet
     # ...
     
-    emoji = get_sport_emoji(bet['league'])
+    emoji = sport_emoji(bet.get('sport') or classify_sport(bet['league'], bet['event']))
+    arb = bet.get('arb') or arbitrage.evaluate_bets([bet])[0]
     
     lines = []
     lines.append("📢 ALERTA DE SUREBETS (SIN RIESGO)")
     lines.append("")
     lines.append(f"1️⃣ 🔥 -- {branding} -- 🔥")
-    lines.append(f"📈 PROFIT: {bet['profit']}%")
+    lines.append(f"📈 PROFIT: {arbitrage.profit_label(bet['profit'], arb)}")
     lines.append("")
     lines.append(f"{emoji} Liga: {bet['league']}")
     lines.append(f"📆 Fecha: {bet['start_time']}")
@@ -239,25 +253,17 @@ def format_message(bet, branding="ROBINSURESHOOD"):
         lines.append(f"🏦 Casa {i+1}: {b['bookie']}")
         lines.append(f"   🎯 Mercado: {b['market']}")
         lines.append(f"   📊 Cuota: {b['odds']}")
-        # Stake not calculated here yet, maybe add later if formula known
-        # lines.append(f"   💰 % Stake: ?") 
+        if arb['profit'] is not None:
+            lines.append(f"   💰 Stake: {arb['stakes'][i]:g}€ ({arb['stake_pct'][i]:.2f}%)")
         if i < len(bet['bets']) - 1:
             lines.append("")
             
     return "\n".join(lines)
 
-async def main():
-    print("🚀 Starting BetHero Scraper...")
-    
-    # 1. Initialize Telegram
-    client = TelegramClient(StringSession(SESSION), API_ID, API_HASH)
-    await client.connect()
-    
-    if not await client.is_user_authorized():
-        logger.error("Telegram session invalid. Please log in again using the main bot logic first.")
-        return
+SUREBETS_URL = "https://app.betherosports.com/surebets"
 
-    # 2. Initialize Browser
+# --- Browser helpers (run on the BrowserWorker thread, never on the event loop) ---
+def create_driver(debug_port=9222):
     options = uc.ChromeOptions()
     options.add_argument("--no-first-run")
     options.add_argument("--no-service-autorun")
@@ -267,119 +273,229 @@ async def main():
     options.add_argument("--disable-dev-shm-usage") # Overcome limited resource problems
     options.add_argument("--no-sandbox") # Bypass OS security model (required for Docker)
     options.add_argument("--disable-gpu") # Disable GPU hardware acceleration
-    options.add_argument("--remote-debugging-port=9222")
+    options.add_argument(f"--remote-debugging-port={debug_port}") # One port per driver when pooled
     options.add_argument("--disable-extensions")
     options.add_argument("--dns-prefetch-disable")
+    if SCRAPE_MODE == "api" and not BETHERO_API_URL:
+        bethero_api.enable_network_capture(options) # Performance log -> Network.* events
     # options.page_load_strategy = 'eager' # REMOVED: Might be causing "static" page issues
     
     driver = uc.Chrome(options=options, use_subprocess=True)
     driver.set_page_load_timeout(60) 
     driver.set_window_size(1920, 1080)
-    
-    # Initialize DB
-    init_db()
+    return driver
 
-
-    def ensure_auto_refresh():
-        print("🔄 Scanning page for buttons...")
-        try:
-            buttons = driver.find_elements(By.TAG_NAME, "button")
-            print(f"found {len(buttons)} buttons.")
-            
-            target_button = None
-            
-            for i, btn in enumerate(buttons):
-                try:
-                    aria = btn.get_attribute("aria-label") or ""
-                    cls = btn.get_attribute("class") or ""
-                    inner = btn.get_attribute("innerHTML") or ""
-                    text = btn.text or ""
+def ensure_auto_refresh(driver):
+    print("🔄 Scanning page for buttons...")
+    try:
+        buttons = driver.find_elements(By.TAG_NAME, "button")
+        print(f"found {len(buttons)} buttons.")
+        
+        target_button = None
+        
+        for i, btn in enumerate(buttons):
+            try:
+                aria = btn.get_attribute("aria-label") or ""
+                cls = btn.get_attribute("class") or ""
+                inner = btn.get_attribute("innerHTML") or ""
+                text = btn.text or ""
+                
+                # Log potential candidates
+                if "refresh" in aria.lower() or "play" in cls or "lucide-play" in inner:
+                    print(f"➡️ Candidate #{i}: Aria='{aria}', Class='{cls}', Text='{text}'")
                     
-                    # Log potential candidates
-                    if "refresh" in aria.lower() or "play" in cls or "lucide-play" in inner:
-                        print(f"➡️ Candidate #{i}: Aria='{aria}', Class='{cls}', Text='{text}'")
-                        
-                    # Target identification
-                    if "Start auto refresh" in aria:
-                        target_button = btn
-                        print("🎯 MATCH FOUND by aria-label!")
-                        break
-                    elif "lucide-play" in inner and "bg-gray-100" in cls:
-                         target_button = btn
-                         print("🎯 MATCH FOUND by innerHTML (icon)!")
-                         break
-                         
-                except: continue
+                # Target identification
+                if "Start auto refresh" in aria:
+                    target_button = btn
+                    print("🎯 MATCH FOUND by aria-label!")
+                    break
+                elif "lucide-play" in inner and "bg-gray-100" in cls:
+                     target_button = btn
+                     print("🎯 MATCH FOUND by innerHTML (icon)!")
+                     break
+                     
+            except: continue
+        
+        if target_button:
+            print("✅ Clicking target button...")
+            driver.execute_script("arguments[0].style.border='5px solid red'", target_button)
+            time.sleep(0.2)
+            try:
+                target_button.click()
+            except:
+                print("⚠️ Standard click failed. Forcing with JS...")
+                driver.execute_script("arguments[0].click();", target_button)
             
-            if target_button:
-                print("✅ Clicking target button...")
-                driver.execute_script("arguments[0].style.border='5px solid red'", target_button)
-                time.sleep(0.2)
-                try:
-                    target_button.click()
-                except:
-                    print("⚠️ Standard click failed. Forcing with JS...")
-                    driver.execute_script("arguments[0].click();", target_button)
-                
-                print("✅ CLICKED (via Auto Logic).")
-                return True
-            else:
-                print("⚠️ Target button NOT found in list.")
-                return False
-                
-        except Exception as e:
-            print(f"⚠️ Error scanning buttons: {e}")
+            print("✅ CLICKED (via Auto Logic).")
+            return True
+        else:
+            print("⚠️ Target button NOT found in list.")
             return False
+            
+    except Exception as e:
+        print(f"⚠️ Error scanning buttons: {e}")
+        return False
+
+def load_cookies():
+    # Check for cookies in ENV or File
+    cookies_env = os.environ.get("BETHERO_COOKIES")
+    cookies_file = "bethero_cookies.json"
+    
+    cookies = None
+    
+    if cookies_env:
+         try:
+             cookies = json.loads(cookies_env)
+             print("🍪 Found cookies in environment (BETHERO_COOKIES). Loading...")
+         except: pass
+         
+    if not cookies and os.path.exists(cookies_file):
+         try:
+             with open(cookies_file, 'r') as f:
+                 cookies = json.load(f)
+             print(f"🍪 Found cookies in {cookies_file}. Loading...")
+         except: pass
+    return cookies
+
+def inject_cookies(driver, cookies):
+    for cookie in cookies:
+        cookie = dict(cookie)
+        if 'expiry' in cookie:
+            cookie['expiry'] = int(cookie['expiry'])
+        try:
+            driver.add_cookie(cookie)
+        except Exception as ce:
+            logger.warning(f"Could not add cookie {cookie.get('name')}: {ce}")
+    
+    print("✅ Cookies loaded. Refreshing page...")
+    driver.refresh()
+
+def read_api_rows(driver, api_session):
+    if api_session:
+        bethero_api.sync_cookies(api_session, driver.get_cookies()) # Browser keeps the session fresh
+        payloads = [bethero_api.fetch(api_session, BETHERO_API_URL)]
+    else:
+        payloads = bethero_api.drain_json_responses(driver, BETHERO_API_FILTER)
+    return payloads, [r for p in payloads for r in bethero_api.rows_from_payload(p)]
+
+def read_observer_rows(driver):
+    raw_rows = bethero_observer.drain(driver)
+    if raw_rows is None:
+        state = bethero_observer.install(driver)
+        logger.info(f"👀 DOM observer: {state}")
+        if state != "missing":
+            raw_rows = bethero_observer.drain(driver)
+    return raw_rows
+
+def read_page(driver):
+    with PAGE_SOURCE_SECONDS.time():
+        return driver.title, driver.page_source
+
+# --- Parsing (CPU-bound, run in a worker thread) ---
+def scan_page(html, url, title):
+    # DEBUG: Print status
+    logger.info(f"Page: {title} | URL: {url} | HTML len: {len(html)}")
+    
+    with PARSE_SECONDS.time():
+        raw_rows = extract_rows(html) # Fast parser backend (surebet_parser.PARSER_BACKEND)
+    if not raw_rows:
+        # DEBUG: Analyze HTML structure only when something is wrong (loading? error?)
+        soup = BeautifulSoup(html, 'html.parser')
+        logger.info(f"DEBUG: Found {len(soup.select('table'))} tables in DOM.")
+        body = soup.select_one('body')
+        body_text = body.get_text(strip=True)[:200] if body else ""
+        logger.info(f"DEBUG NO ROWS: Body text start: {body_text}")
+
+    bets = build_new_bets(raw_rows)
+    
+    if not bets:
+        logger.info("No bets found (or parsing failed).")
+    else:
+        logger.info(f"✅ Found {len(bets)} bets on page.")
+    return bets
+
+def is_fatal_driver_error(e):
+    # Chrome is gone (Max retries exceeded) or the renderer died: the driver must be recreated
+    return "Max retries exceeded" in str(e) or "WinError" in str(e) or "tab crashed" in str(e)
+
+async def read_bets(browser, url, api_session=None):
+    """
+    One scrape tick on an already open surebets page. Returns only the new
+    bets (deduplicated against SEEN_BETS).
+    """
+    bets = None
+    if SCRAPE_MODE == "api":
+        # Structured JSON straight from the app's own requests, no HTML involved
+        payloads, raw_rows = await browser.run(read_api_rows, api_session)
+        observed = time.time()
+        if payloads and not raw_rows:
+            logger.warning("⚠️ JSON captured but no surebets recognised in it. Falling back to DOM parse.")
+        else:
+            bets = await asyncio.to_thread(build_new_bets, raw_rows) # Dedup store writes to SQLite
+            if bets:
+                logger.info(f"✅ API reported {len(raw_rows)} rows, {len(bets)} new bets.")
+
+    elif SCRAPE_MODE == "observer":
+        # Only rows added/changed since the last tick, no page_source
+        raw_rows = await browser.run(read_observer_rows)
+        observed = time.time()
+        if raw_rows is not None:
+            bets = await asyncio.to_thread(build_new_bets, raw_rows) # Dedup store writes to SQLite
+            if bets:
+                logger.info(f"✅ Observer reported {len(raw_rows)} changed rows, {len(bets)} new bets.")
+
+    if bets is None:
+        # Full DOM mode (or fallback while the table is not rendered)
+        title, html = await browser.run(read_page)
+        observed = time.time()
+        bets = await asyncio.to_thread(scan_page, html, url, title)
+
+    LAST_DOM.set(observed)
+    # Verified profit and stake split of the whole page in one batch (arbitrage.py)
+    arbitrage.annotate(bets)
+    # Latency trace carried with the bet up to the user delivery (latency.py)
+    for bet in bets:
+        bet['trace'] = LATENCY.stamp({'observed': observed}, 'parsed')
+    return bets
+
+async def main():
+    print("🚀 Starting BetHero Scraper...")
+    
+    # 1. Initialize Telegram
+    client = TelegramClient(StringSession(SESSION), API_ID, API_HASH)
+    await client.connect()
+    
+    if not await client.is_user_authorized():
+        logger.error("Telegram session invalid. Please log in again using the main bot logic first.")
+        return
+
+    # 2. Initialize Browser (owned by its own thread, every call is awaited)
+    browser = BrowserWorker("bethero")
+    driver = await browser.start(create_driver)
+    
+    # Initialize DB
+    await db.run(init_db)
 
     try:
-        driver.get("https://app.betherosports.com/surebets")
-        
-        # Check for cookies in ENV
-        # Check for cookies in ENV or File
-        cookies_env = os.environ.get("BETHERO_COOKIES")
-        cookies_file = "bethero_cookies.json"
-        
-        cookies = None
+        await browser.call(driver.get, SUREBETS_URL)
         
-        if cookies_env:
-             try:
-                 cookies = json.loads(cookies_env)
-                 print("🍪 Found cookies in environment (BETHERO_COOKIES). Loading...")
-             except: pass
-             
-        if not cookies and os.path.exists(cookies_file):
-             try:
-                 with open(cookies_file, 'r') as f:
-                     cookies = json.load(f)
-                 print(f"🍪 Found cookies in {cookies_file}. Loading...")
-             except: pass
+        cookies = load_cookies()
 
         if cookies:
             try:
-                for cookie in cookies:
-                    if 'expiry' in cookie:
-                        cookie['expiry'] = int(cookie['expiry'])
-                    try:
-                        driver.add_cookie(cookie)
-                    except Exception as ce:
-                        logger.warning(f"Could not add cookie {cookie.get('name')}: {ce}")
-                
-                print("✅ Cookies loaded. Refreshing page...")
-                driver.refresh()
+                await browser.call(inject_cookies, driver, cookies)
                 # Reduced sleep for speed
-                time.sleep(2)
+                await asyncio.sleep(2)
                 
                 # Activate Auto Refresh initially
-                ensure_auto_refresh()
+                await browser.run(ensure_auto_refresh)
                 
             except Exception as e:
                 print(f"❌ Error loading cookies: {e}")
         
         # Check if we should wait for manual login
         # If we loaded cookies, we might assume we are logged in.
-        # But let's verify or provide a flag.
         # If running in a cloud env, we definitely don't want to wait for input.
-        # We can check if we are "headless"-ish or just check if cookies were loaded.
         
         if not cookies:
             print("\n" + "="*50)
@@ -387,72 +503,47 @@ async def main():
             print("Please log in to BetHero in the browser window.")
             print("Then press Enter here to start scraping loop.")
             print("="*50 + "\n")
-            input("👉 Press Enter to START scraping...")
+            await asyncio.to_thread(input, "👉 Press Enter to START scraping...")
         else:
             print("🚀 Auto-login attempted via cookies. Starting loop immediately...")
             
         # Ensure we are on the correct page
-        if "/surebets" not in driver.current_url:
+        if "/surebets" not in await browser.attr("current_url"):
             print("🔄 Navigating to Surebets page...")
-            driver.get("https://app.betherosports.com/surebets")
-            time.sleep(2)
+            await browser.call(driver.get, SUREBETS_URL)
+            await asyncio.sleep(2)
             # Re-try auto refresh
-            ensure_auto_refresh()
+            await browser.run(ensure_auto_refresh)
+            
+        api_session = None
+        if SCRAPE_MODE == "api" and BETHERO_API_URL:
+            api_session = bethero_api.build_session(await browser.call(driver.get_cookies))
             
         print("✅ Scraping started! Press Ctrl+C to stop.")
         
         while True:
             try:
-                # Refresh or just read? 
-                # If SPA, maybe element updates automatically? 
-                # Safer to just read page_source every interval.
-                # Occasionally refresh if stagnant?
-                # For now: just parse current DOM.
-                
-                html = driver.page_source
-                url = driver.current_url
-                title = driver.title
-                
-                # DEBUG: Print status
-                logger.info(f"Page: {title} | URL: {url} | HTML len: {len(html)}")
+                url = await browser.attr("current_url")
                 
                 # ENFORCE NAVIGATION TO SUREBETS
                 if "surebets" not in url.lower():
                      logger.warning(f"⚠️ Incorrect URL ({url}). Redirecting to /surebets...")
-                     driver.get("https://app.betherosports.com/surebets")
-                     time.sleep(5)
-                     ensure_auto_refresh() # Try to click it again after redirect
+                     await browser.call(driver.get, SUREBETS_URL)
+                     await asyncio.sleep(5)
+                     await browser.run(ensure_auto_refresh) # Try to click it again after redirect
                      continue
 
                 # Check if we are stuck on login
                 if "login" in url.lower() or "signin" in url.lower():
                      logger.warning("⚠️  It seems we are on a LOGIN page. Cookies might be invalid or expired.")
 
-                # DEBUG: Analyze HTML structure
-                soup = BeautifulSoup(html, 'html.parser')
-                tables = soup.select('table')
-                logger.info(f"DEBUG: Found {len(tables)} tables in DOM.")
-                
-                rows = soup.select('table[role="table"] tbody[role="rowgroup"] tr[role="row"]')
-                if not rows:
-                    # Print some body text to see what is happening (loading? error?)
-                    body_text = soup.select_one('body').get_text(strip=True)[:200]
-                    logger.info(f"DEBUG NO ROWS: Body text start: {body_text}")
-
-                bets = parse_surebets(html)
-                
-                if not bets:
-                    logger.info("No bets found (or parsing failed).")
-
-
-                else:
-                    logger.info(f"✅ Found {len(bets)} bets on page.")
+                bets = await read_bets(browser, url, api_session)
                     
                 for bet in bets:
                     logger.info(f"Forwarding new surebet: {bet['event']} ({bet['profit']}%)")
                     
                     # Save to DB
-                    save_bet_to_db(bet)
+                    await db.run(save_bet_to_db, bet)
                     
                     
                     # 1. Send to Destination 1 (ROBINSURESHOOD) -- REMOVED by user request
@@ -464,8 +555,7 @@ async def main():
                     # if DEST_CHAT_2 != 0:
                     #     await send_to_telegram(client, DEST_CHAT_2, msg2)
                     
-                    # Small delay to avoid flood limits
-                    await asyncio.sleep(2)
+                    # No fixed delay here: send_to_telegram is flood-controlled by TELEGRAM_BUCKET
                 
                 # Check for "Auto Refresh" button? 
                 # The page has an "Auto Refresh" toggle. The user should enable it.
@@ -475,22 +565,19 @@ async def main():
             except Exception as loop_e:
                 logger.error(f"⚠️ Critical Loop Error: {loop_e}")
                 # If we lose connection to Chrome (Max retries exceeded), it's best to die and let Render restart us
-                if "Max retries exceeded" in str(loop_e) or "WinError" in str(loop_e) or "tab crashed" in str(loop_e):
+                if is_fatal_driver_error(loop_e):
                      print("💀 Fatal driver error. Exiting to trigger restart...")
                      # Close gracefully if possible
-                     try:
-                        driver.quit()
-                     except: 
-                        pass
+                     await browser.quit()
                      sys.exit(1)
                      
-            await asyncio.sleep(CHECK_INTERVAL)
+            await asyncio.sleep(POLL_INTERVALS.get(SCRAPE_MODE, CHECK_INTERVAL))
             
     except KeyboardInterrupt:
         print("Stopping...")
     finally:
         await client.disconnect()
-        driver.quit()
+        await browser.quit()
 
 if __name__ == "__main__":
     asyncio.run(main())
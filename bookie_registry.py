@@ -0,0 +1,128 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# --- Bookie registry ---
+# Every bookie name a feed can show (BetHero logo alt texts, channel posts,
+# user menus) resolves to one canonical entry of KNOWN_BOOKIES, whose position
+# is its integer id and its bit in a bookies mask. Users store the set of
+# bookies they hold as users.bookies_mask and every bet stores the bookies of
+# its legs as surebets.bookies_mask, so "the user has every bookie of this
+# bet" is one AND. Names are compared whole (after normalisation and the alias
+# table), never as substrings: "betfair" is not "betfair exchange".
+#
+# KNOWN_BOOKIES is append-only: positions are persisted in the masks.
+
+KNOWN_BOOKIES = [
+    "888sport", "Gran Madrid", "JOKERBET", "Pastón",
+    "Bet777", "betsson", "Casino Gran Via", "eBingo",
+    "PokerStars", "betfair exchange", "bwin", "Codere",
+    "Marca Apuestas", "Casumo", "LeoVegas", "paf",
+    "SpeedyBet", "YoSports", "Aupabet", "Juegging",
+    "KIROLBET", "Marathonbet", "Sportium", "Versus",
+    "TonyBet", "Casino Barcelona", "Winamax", "bet365",
+    "betfair", "Betway", "efbet", "interwetten",
+    "Luckia", "William Hill"
+]
+
+# Other spellings seen in the feeds -> entry of KNOWN_BOOKIES
+ALIASES = {
+    "888": "888sport",
+    "888 sport": "888sport",
+    "casino gran madrid": "Gran Madrid",
+    "gran madrid casino": "Gran Madrid",
+    "joker bet": "JOKERBET",
+    "bet 777": "Bet777",
+    "gran via": "Casino Gran Via",
+    "pokerstars sports": "PokerStars",
+    "pokerstars sport": "PokerStars",
+    "betfair ex": "betfair exchange",
+    "betfair sportsbook": "betfair",
+    "marca": "Marca Apuestas",
+    "leo vegas": "LeoVegas",
+    "speedy bet": "SpeedyBet",
+    "yo sports": "YoSports",
+    "aupa bet": "Aupabet",
+    "kirol bet": "KIROLBET",
+    "marathon bet": "Marathonbet",
+    "marathon": "Marathonbet",
+    "tony bet": "TonyBet",
+    "william hill es": "William Hill",
+}
+
+UNKNOWN = 1 << 62  # Set for a leg whose bookie is not registered: no user holds it
+ALL_MASK = (1 << len(KNOWN_BOOKIES)) - 1
+
+# Trailing words that do not change the bookie ("Bet365 ES", "bwin.es", "Betway Sports")
+_SUFFIXES = {"es", "com", "spain", "espana", "sport", "sports", "sportsbook", "apuestas"}
+_WORDS_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(name):
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode().lower()
+    return _WORDS_RE.findall(text)
+
+
+def _key(words):
+    return "".join(words)  # "Bet 365" and "bet365" are the same bookie
+
+
+def _build_ids():
+    ids = {_key(_words(name)): i for i, name in enumerate(KNOWN_BOOKIES)}
+    for alias, name in ALIASES.items():
+        ids[_key(_words(alias))] = KNOWN_BOOKIES.index(name)
+    return ids
+
+
+_IDS = _build_ids()
+
+
+@lru_cache(maxsize=4096)
+def bookie_id(name):
+    """
+    Integer id (position in KNOWN_BOOKIES) of a bookie name as shown by any
+    feed, or None if it is not registered.
+    """
+    words = _words(name)
+    while words:
+        bid = _IDS.get(_key(words))
+        if bid is not None:
+            return bid
+        if words[-1] not in _SUFFIXES:
+            return None
+        words = words[:-1]
+    return None
+
+
+def canonical_name(name):
+    bid = bookie_id(name)
+    return KNOWN_BOOKIES[bid] if bid is not None else str(name or "").strip()
+
+
+def mask_of(names):
+    """
+    Bitmask of a list of bookie names. Unregistered names set UNKNOWN.
+    """
+    mask = 0
+    for name in names:
+        bid = bookie_id(name)
+        mask |= UNKNOWN if bid is None else 1 << bid
+    return mask
+
+
+def legs_mask(legs):
+    return mask_of(leg.get('bookie') for leg in legs)
+
+
+def user_mask(bookies):
+    # users.bookies: JSON list of KNOWN_BOOKIES names, or 'ALL'
+    if bookies == 'ALL':
+        return ALL_MASK
+    return mask_of(bookies) & ALL_MASK
+
+
+def covers(user_bookies_mask, bet_bookies_mask):
+    """
+    True if the user holds every bookie of the bet.
+    """
+    return not bet_bookies_mask & ~user_bookies_mask
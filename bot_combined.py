@@ -4,7 +4,7 @@ import logging
 import sys
 import os
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
 # Configure Logging for Unified Output
 logging.basicConfig(
@@ -17,29 +17,62 @@ logger = logging.getLogger("CombinedBot")
 # Import Modules
 try:
     import bethero_scraper
+    import scraper_pool
     import filter_bot
 except ImportError as e:
     logger.error(f"Failed to import modules: {e}")
     sys.exit(1)
 
-# --- Dummy Web Server for Render ---
+import latency  # Registers the stage histograms in REGISTRY
+from metrics import REGISTRY, LAST_DOM
+
+STARTED_AT = time.time()
+HEALTHZ_INTERVALS = int(os.environ.get("HEALTHZ_INTERVALS", 6)) # Missed scrape ticks before /healthz fails
+HEALTHZ_GRACE = int(os.environ.get("HEALTHZ_GRACE", 180)) # Seconds for Chrome + login on startup
+
+def scraper_staleness():
+    """
+    Returns (seconds since the last DOM read, allowed maximum).
+    """
+    interval = bethero_scraper.POLL_INTERVALS.get(bethero_scraper.SCRAPE_MODE, bethero_scraper.CHECK_INTERVAL)
+    last = LAST_DOM.value() or STARTED_AT + HEALTHZ_GRACE
+    return time.time() - last, HEALTHZ_INTERVALS * interval
+
+# --- Web Server for Render: health, /healthz and /metrics ---
 class HealthCheckHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header("Content-type", "text/plain")
+    def _reply(self, code, body, content_type="text/plain"):
+        body = body.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        self.wfile.write(b"Bot is running!")
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            # Pipeline counters, gauges and histograms (Prometheus text format)
+            self._reply(200, REGISTRY.render(), "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/healthz":
+            age, limit = scraper_staleness()
+            if age > limit:
+                self._reply(503, f"stale: no DOM read for {age:.0f}s (limit {limit}s)\n")
+            else:
+                self._reply(200, f"ok: last DOM read {max(age, 0):.0f}s ago\n")
+        else:
+            self._reply(200, "Bot is running!")
 
     def log_message(self, format, *args):
         return  # Silence server logs
 
 def run_web_server():
     """
-    Starts a dummy web server to satisfy Render's requirement of binding to $PORT.
+    Starts a web server to satisfy Render's requirement of binding to $PORT.
     Without this, Render detects the app as 'failed' and kills it.
+    One thread per request, so a slow /metrics scrape never blocks the health check.
     """
     port = int(os.environ.get("PORT", 8080))
-    server = HTTPServer(("0.0.0.0", port), HealthCheckHandler)
+    server = ThreadingHTTPServer(("0.0.0.0", port), HealthCheckHandler)
     logger.info(f"🌍 Web server started on port {port} (satisfying Render requirements)")
     server.serve_forever()
 # -----------------------------------
@@ -52,8 +85,11 @@ def run_scraper_thread():
     while True:
         try:
             logger.info("🚀 Starting Scraper Logic...")
-            # Run the scraper's main function
-            asyncio.run(bethero_scraper.main())
+            # BETHERO_VIEWS set: one browser per view, restarted individually
+            if scraper_pool.BETHERO_VIEWS:
+                asyncio.run(scraper_pool.main())
+            else:
+                asyncio.run(bethero_scraper.main())
         except Exception as e:
             logger.error(f"❌ Scraper Thread Crashed: {e}")
             logger.info("🔄 Restarting Scraper in 10 seconds...")
@@ -62,7 +98,8 @@ def run_scraper_thread():
 def run_bot_main():
     logger.info("🤖 Starting Telegram Bot (Main Thread)...")
     try:
-        filter_bot.run_bot()
+        # Scraper and bot share this process: bets are pushed through the in-process bus
+        filter_bot.run_bot(push_mode=True)
     except Exception as e:
         logger.error(f"❌ Bot Crashed: {e}")
 
@@ -1,11 +1,19 @@
-import os, io, asyncio, logging, contextlib, re
+import os, io, time, asyncio, logging, contextlib
 from fastapi import FastAPI, Response
 from telethon import TelegramClient, events
-from telethon.errors import RPCError
+from telethon.errors import RPCError, ChatForwardsRestrictedError, FileReferenceExpiredError, MediaEmptyError
 from telethon.sessions import StringSession
 from telethon.utils import get_peer_id
 from datetime import datetime
 from dotenv import load_dotenv
+import routing
+# Formateadores de alertas (tokenizador de una pasada)
+from alert_tokenizer import modify_text, modify_sure_middle_text
+from metrics import REGISTRY, ALERTS_SENT, ALERTS_FAILED, SEND_SECONDS
+from alert_tokenizer import extract_surebets
+from odds_validator import ODDS_BOOK, should_drop, warning_line
+from canonical import surebet_key
+from dedup_store import DedupStore, make_key
 
 load_dotenv()
 
@@ -71,525 +79,159 @@ def _split_csv(s: str):
         return []
     return [x.strip() for x in s.split(",") if x.strip()]
 
-def calculate_profit_percentage(odds1, odds2):
-    try:
-        o1 = float(odds1)
-        o2 = float(odds2)
-        if o1 <= 1 or o2 <= 1:
-            return None  # Odds inválidas
-        surebet_pct = 1 / (1 / o1 + 1 / o2) * 100
-        return surebet_pct - 100  # Profit % = surebet % - 100%
-    except (ValueError, ZeroDivisionError):
-        return None
-
-def modify_text(text):
-    # Cambiar "SUREBETS25" a "SURESTABERA"
-    text = text.replace("SUREBETS25", "SURESTABERA")
-    
-    # Encabezado para split
-    header = "🔥 -- SURESTABERA -- 🔥"
-    parts = text.split(header)
-    if len(parts) < 2:
-        return text  # No hay bloques, devolver tal cual
-    
-    modified_parts = [parts[0]]  # Parte antes del primer header
-    for part in parts[1:]:
-        lines = part.strip().split('\n')
-        profit_line_idx = None
-        odds = []
-        for i, line in enumerate(lines):
-            if line.startswith("📈 PROFIT:"):
-                profit_line_idx = i
-            elif "🎯 @" in line:
-                # Extraer odds
-                match = re.search(r"🎯 @([\d.]+)", line)
-                if match:
-                    odds.append(match.group(1))
-                # Modificar la línea: quitar "💰...€ para ..." pero dejar "🎯 @odds"
-                new_line = re.sub(r" 💰.*$", "", line)
-                lines[i] = new_line
-        
-        # Si hay exactamente 2 odds y una línea PROFIT, calcular profit y reemplazar
-        if len(odds) == 2 and profit_line_idx is not None:
-            profit_pct = calculate_profit_percentage(odds[0], odds[1])
-            if profit_pct is not None:
-                lines[profit_line_idx] = f"📈 PROFIT: {profit_pct:.2f}%"
-        
-        modified_parts.append('\n'.join(lines))
-    
-    return header.join(modified_parts)
-
 # ─────────────────────────────────────────────────────────────────────────────
-# NUEVO: Helpers para parsear líneas de casas (sure/middle)
+# ENRUTADO
 # ─────────────────────────────────────────────────────────────────────────────
-def parse_book_line(line: str):
+TRANSFORMS = {
+    "dest2": modify_text,                  # Mensajes que van a DEST_CHAT_2
+    "sure_middle": modify_sure_middle_text # Orígenes de DEST_CHAT_1
+}
+
+def routing_from_env():
     """
-    Intenta extraer:
-      - nombre de casa
-      - mercado
-      - cuota
-      - stake (si aparece con 💰)
-      - sufijo (⚡, ❓, etc.)
-    Si algo falla, devuelve valores parciales sin romper.
+    Config de routing.py equivalente a las variables de entorno de siempre
+    (filtros Valuebets / bet365 / winamax sobre los orígenes de DEST_CHAT_1).
     """
-    # Normalizar: reemplazar 📕 por nada para parsear
-    original = line
-    line_wo_icon = line.replace("📕", "").replace("🏠", "").strip()
-
-    book_name = ""
-    market = ""
-    odds = ""
-    stake = ""
-    suffix = ""
-
-    # Separar casa y resto por 📍
-    if "📍" in line_wo_icon:
-        left, right = line_wo_icon.split("📍", 1)
-        book_name = left.strip()
-        right = right.strip()
-    else:
-        # Si no hay 📍, devolvemos casi todo como nombre
-        return original, "", "", "", ""
-
-    # Mercado: hasta 🎲
-    part_before_odd = right
-    part_after_odd = ""
-    if "🎲" in right:
-        part_before_odd, part_after_odd = right.split("🎲", 1)
-        market = part_before_odd.strip()
-        part_after_odd = part_after_odd.strip()
-    else:
-        market = right.strip()
-
-    # Cuota: después de @
-    m_odds = re.search(r"@\s*([\d.,]+)", part_after_odd)
-    if m_odds:
-        odds = m_odds.group(1)
-
-    # Stake y sufijo: después de 💰
-    if "💰" in part_after_odd:
-        stake_part = part_after_odd.split("💰", 1)[1]
-        # stake_part suele ser "14.01% ⚡️ Causa Surebet" o "85.99% ❓ ..."
-        # Intentamos separar valor y resto
-        m_stake = re.match(r"\s*([\d.,]+%?)\s*(.*)", stake_part)
-        if m_stake:
-            stake = m_stake.group(1)
-            suffix = m_stake.group(2).strip()
-
-    # Si algo está vacío, usamos el original como fallback parcial
-    return book_name, market, odds, stake, suffix
-
-# ─────────────────────────────────────────────────────────────────────────────
-# NUEVO: Formateo NUEVA SUREBET (💰 New surebet found!)
-# ─────────────────────────────────────────────────────────────────────────────
-def format_new_surebet(text: str) -> str:
-    try:
-        lines = text.splitlines()
-        data = {}
-        bookies = []
-        current_bookie = {}
-        
-        # Parsing header info
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Profit:"):
-                data['profit'] = line.replace("Profit:", "").strip().replace("%", "")
-            elif line.startswith("Sport:"):
-                data['sport'] = line.replace("Sport:", "").strip()
-            elif line.startswith("League:"):
-                data['league'] = line.replace("League:", "").strip()
-            elif line.startswith("Event:"):
-                data['event'] = line.replace("Event:", "").strip()
-            elif line.startswith("Start at :"):
-                data['start'] = line.replace("Start at :", "").strip()
-            elif line.endswith(":") and not line.startswith("Start at") and not line.startswith("Profit") and not line.startswith("Sport") and not line.startswith("League") and not line.startswith("Event"):
-                # New bookie
-                if current_bookie:
-                    bookies.append(current_bookie)
-                current_bookie = {'name': line.rstrip(":")}
-            elif "→" in line:
-                parts = line.split("→")
-                if len(parts) == 2:
-                    current_bookie['market'] = parts[0].replace("▫️", "").strip()
-                    current_bookie['odds'] = parts[1].strip()
-            elif "Stake:" in line:
-                # ▫️Stake: 35.62 $ Place Bet (url)
-                # Remove ▫️
-                s = line.replace("▫️", "").strip()
-                # Extract Stake - relaxed regex for any currency or formatting
-                m_stake = re.search(r"Stake:\s*([\d.,]+)", s)
-                if m_stake:
-                    current_bookie['stake'] = m_stake.group(1)
-                
-                # Url
-                m_url = re.search(r"\((http.*?)\)", s)
-                if m_url:
-                    current_bookie['url'] = m_url.group(1)
-
-        if current_bookie:
-            bookies.append(current_bookie)
-
-        # Formatting
-        out = []
-        out.append("📢 ALERTA DE SUREBETS (SIN RIESGO)")
-        out.append("")
-        out.append("1️⃣ 🔥 -- SURESTABERA -- 🔥")
-        out.append(f"📈 PROFIT: {data.get('profit', '0')}%")
-        out.append("")
-        
-        # Sport mapping (only emojis, no naming translation as requested)
-        sport_raw = data.get('sport', 'Unknown')
-        emoji = "🏆"
-        # Determine emoji based on raw string content
-        if "Basketball" in sport_raw or "Baloncesto" in sport_raw: 
-            emoji = "🏀"
-        elif "Football" in sport_raw or "Soccer" in sport_raw or "Fútbol" in sport_raw: 
-            emoji = "⚽️"
-        elif "Tennis" in sport_raw or "Tenis" in sport_raw: 
-            emoji = "🎾"
-        
-        out.append(f"{emoji} Deporte: {sport_raw}")
-        
-        # Date (raw as requested)
-        out.append(f"📆 Fecha: {data.get('start', '')}")
-             
-        out.append(f"🏆 Partido: {data.get('event', '')} ({data.get('league', '')})")
-        out.append("")
-        
-        for i, b in enumerate(bookies):
-            b_url = b.get("url", "")
-            b_link_str = f" ({b_url})" if b_url else ""
-            out.append(f"🏦 Casa {i+1}: {b.get('name', '')}{b_link_str}")
-            out.append(f"   🎯 Mercado: {b.get('market', '')}")
-            out.append(f"   📊 Cuota: {b.get('odds', '')}")
-            st = b.get('stake', '')
-            out.append(f"   💰 % Stake: {st}%")
-            if i < len(bookies) - 1:
-                out.append("")
-            
-        return "\n".join(out).strip()
-        
-    except Exception as e:
-        logging.exception("Error formatting new surebet")
-        return text
-
-# ─────────────────────────────────────────────────────────────────────────────
-# NUEVO: Formateo SUREBETS (Plantilla 1, múltiples)
-# ─────────────────────────────────────────────────────────────────────────────
-def format_surebets(text: str) -> str:
-    lines = text.splitlines()
-    blocks = []
-    current_lines = None
-
-    for line in lines:
-        stripped = line.strip()
-
-        # Saltar cabeceras globales que vienen del canal original
-        if stripped.startswith("💵 Rango Beneficio:"):
-            continue
-        if "📢 Alerta de Surebets" in stripped:
-            continue
-
-        # Inicio de una nueva sure
-        if stripped.startswith("💎 Profit"):
-            if current_lines is not None:
-                blocks.append(current_lines)
-            current_lines = [line]
-        else:
-            if current_lines is not None:
-                current_lines.append(line)
-            else:
-                # Antes de la primera sure, ignoramos
-                continue
-
-    if current_lines is not None:
-        blocks.append(current_lines)
-
-    if not blocks:
-        return text
-
-    out_lines = []
-    out_lines.append("📢 ALERTA DE SUREBETS (SIN RIESGO)")
-    out_lines.append("")
-
-    for idx, block in enumerate(blocks, start=1):
-        # Vars por defecto
-        profit_val = ""
-        sport_emoji = ""
-        sport_name = ""
-        date_val = ""
-        match_full = ""
-        comp_full = ""
-        book1 = None
-        book2 = None
-
-        try:
-            # Parseamos líneas del bloque
-            for bline in block:
-                s = bline.strip()
-                if s.startswith("💎 Profit"):
-                    # Ej: "💎 Profit: 5.08%"
-                    m = re.search(r"([\d.,]+)%", s)
-                    if m:
-                        profit_val = m.group(1)
-                elif s.startswith("⚽") or s.startswith("🏀") or s.startswith("🎾") or s.startswith("🏈") or s.startswith("🏀"):
-                    # Ej: "⚽️ Fútbol"
-                    parts = s.split(maxsplit=1)
-                    sport_emoji = parts[0]
-                    sport_name = parts[1] if len(parts) > 1 else ""
-                elif s.startswith("🗓") or s.startswith("📆"):
-                    # Ej: "🗓️ 06/12 21:00"
-                    parts = s.split(maxsplit=1)
-                    date_val = parts[1] if len(parts) > 1 else ""
-                elif s.startswith("🏆"):
-                    # Ej: "🏆 Athletic Bilbao – Atletico Madrid (To Spanish La Liga Primera)"
-                    raw = s[1:].strip()  # quitamos el emoji
-                    m = re.match(r"^(.*?)\s*\((.*)\)\s*$", raw)
-                    if m:
-                        match_full = m.group(1).strip()
-                        comp_full = m.group(2).strip()
-                    else:
-                        match_full = raw
-                        comp_full = ""
-                elif "📕" in s or "🏠" in s:
-                    # Líneas de casas
-                    if book1 is None:
-                        book1 = bline
-                    elif book2 is None:
-                        book2 = bline
-
-            out_lines.append(f"{idx}️⃣ 🔥 -- SURESTABERA -- 🔥")
-            if profit_val:
-                out_lines.append(f"📈 PROFIT: {profit_val}%")
-            else:
-                out_lines.append("📈 PROFIT:")
-
-            out_lines.append("")
-
-            # Deporte
-            if sport_emoji or sport_name:
-                out_lines.append(f"{sport_emoji} Deporte: {sport_name}".strip())
-            # Fecha
-            if date_val:
-                out_lines.append(f"📆 Fecha: {date_val}")
-            # Partido
-            if match_full:
-                if comp_full:
-                    out_lines.append(f"🏆 Partido: {match_full} ({comp_full})")
-                else:
-                    out_lines.append(f"🏆 Partido: {match_full}")
-
-            out_lines.append("")
-
-            # Casas
-            # Casa 1
-            if book1:
-                b1_name, b1_mkt, b1_odds, b1_stake, b1_suf = parse_book_line(book1)
-                out_lines.append(f"🏦 Casa 1: {b1_name}")
-                if b1_mkt:
-                    out_lines.append(f"   🎯 Mercado: {b1_mkt}")
-                if b1_odds:
-                    out_lines.append(f"   📊 Cuota: {b1_odds}")
-                if b1_stake or b1_suf:
-                    suf = f"  {b1_suf}" if b1_suf else ""
-                    out_lines.append(f"   💰 % Stake: {b1_stake}{suf}")
-            # Casa 2
-            if book2:
-                out_lines.append("")
-                b2_name, b2_mkt, b2_odds, b2_stake, b2_suf = parse_book_line(book2)
-                out_lines.append(f"🏦 Casa 2: {b2_name}")
-                if b2_mkt:
-                    out_lines.append(f"   🎯 Mercado: {b2_mkt}")
-                if b2_odds:
-                    out_lines.append(f"   📊 Cuota: {b2_odds}")
-                if b2_stake or b2_suf:
-                    suf = f"  {b2_suf}" if b2_suf else ""
-                    out_lines.append(f"   💰 % Stake: {b2_stake}{suf}")
-
-            if idx != len(blocks):
-                out_lines.append("")
-                out_lines.append("")
-
-        except Exception as e:
-            logging.exception("Error formateando surebet, devolviendo bloque original")
-            # Si algo falla, metemos el bloque original tal cual
-            out_lines.append("\n".join(block))
-            if idx != len(blocks):
-                out_lines.append("")
-                out_lines.append("")
-
-    return "\n".join(out_lines).strip()
+    routes = []
+    if DEST_CHAT_1:
+        rules = []
+        if DEST_CHAT_3:
+            rules.append({"when": {"keywords": [FILTER_KEYWORD], "case_sensitive": True}, "to": [DEST_CHAT_3], "only": True})
+        # winamax: solo el destino por defecto (anula también DEST_CHAT_4)
+        rules.append({"when": {"bookies": [FILTER_KEYWORD3]}, "to": [routing.DEFAULT_TOKEN], "only": True})
+        if DEST_CHAT_4:
+            rules.append({"unless": {"bookies": [FILTER_KEYWORD2]}, "to": [DEST_CHAT_4]})
+        if DEST_CHAT_5:
+            rules.append({"to": [DEST_CHAT_5]})
+        routes.append({
+            "origins": _split_csv(ORIGINS_DEST1) + ([ORIGIN_CHAT_1] if ORIGIN_CHAT_1 else []),
+            "default": DEST_CHAT_1,
+            "rules": rules,
+            "transforms": ["sure_middle"]
+        })
+    if DEST_CHAT_2:
+        routes.append({
+            "origins": _split_csv(ORIGINS_DEST2) + ([ORIGIN_CHAT_2] if ORIGIN_CHAT_2 else []),
+            "default": DEST_CHAT_2
+        })
+    return {"routes": routes, "dest_transforms": {DEST_CHAT_2: ["dest2"]} if DEST_CHAT_2 else {}}
 
 # ─────────────────────────────────────────────────────────────────────────────
-# NUEVO: Formateo MIDDLEBETS (Plantilla 1, múltiples)
+# FAN-OUT (un mensaje → varios destinos en paralelo)
 # ─────────────────────────────────────────────────────────────────────────────
-def format_middlebets(text: str) -> str:
-    lines = text.splitlines()
-    blocks = []
-    current_lines = None
-
-    for line in lines:
-        s = line.strip()
-
-        # Cabeceras originales fuera
-        if s.startswith("👑 Rango Valor Esperado"):
-            continue
-        if "📢 Alerta de Middlebets" in s:
-            continue
-
-        if s.startswith("💎 Valor esperado"):
-            if current_lines is not None:
-                blocks.append(current_lines)
-            current_lines = [line]
+# Media: primero se intenta reenviar la referencia del archivo del mensaje origen
+# (sin descargar nada). Si el origen tiene contenido protegido o la referencia
+# caducó, se descarga UNA vez, se sube al primer destino y el resto reutiliza la
+# referencia de ese envío. Cada destino falla por separado.
+FANOUT_STATS = {
+    "messages": 0,
+    "media_messages": 0,
+    "sends": 0,
+    "failures": 0,
+    "by_reference": 0,       # Media reenviada sin descargar
+    "downloads": 0,
+    "bytes_downloaded": 0,
+    "bytes_saved": 0,        # Descargas evitadas vs. una por destino
+    "latency_saved_s": 0.0,  # Tiempo de descarga evitado (estimado con las descargas medidas)
+    "fanout_latency_s": 0.0,
+}
+_DOWNLOAD_RATE = {"bytes": 0, "seconds": 0.0}
+
+def _media_size(msg):
+    f = getattr(msg, "file", None)
+    return (getattr(f, "size", None) or 0) if f else 0
+
+def _estimated_download_s(size):
+    if not _DOWNLOAD_RATE["bytes"]:
+        return 0.0
+    return size * _DOWNLOAD_RATE["seconds"] / _DOWNLOAD_RATE["bytes"]
+
+async def _timed_send(send, dest):
+    with SEND_SECONDS.time(sender="forwarder"):
+        return await send(dest)
+
+async def fan_out(src_id, msg_id, dests, send, kind, retryable=()):
+    """
+    send(dest) en paralelo para todos los destinos; un fallo no afecta al resto.
+    Los errores de `retryable` los reintenta quien llama y no cuentan como fallo en /metrics.
+    """
+    start = time.monotonic()
+    FANOUT_STATS["messages"] += 1
+    results = await asyncio.gather(*(_timed_send(send, dest) for dest in dests), return_exceptions=True)
+    for dest, res in zip(dests, results):
+        if isinstance(res, Exception):
+            FANOUT_STATS["failures"] += 1
+            if not isinstance(res, retryable):
+                ALERTS_FAILED.inc(destination=str(dest))
+            logging.error(f"Fallo reenviando {src_id}→{dest} | msg_id={msg_id} | {type(res).__name__}: {res}")
         else:
-            if current_lines is not None:
-                current_lines.append(line)
-            else:
-                continue
-
-    if current_lines is not None:
-        blocks.append(current_lines)
-
-    if not blocks:
-        return text
-
-    out_lines = []
-    out_lines.append("📢 ALERTA DE MIDDLEBETS")
-    out_lines.append("")
-
-    for idx, block in enumerate(blocks, start=1):
-        min_ev = ""
-        max_ev = ""
-        prob_middle = ""
-        sport_emoji = ""
-        sport_name = ""
-        date_val = ""
-        match_full = ""
-        comp_full = ""
-        book1 = None
-        book2 = None
-
-        try:
-            for bline in block:
-                s = bline.strip()
-                # Rango EV
-                if "📉 Mín." in s and "📈 Máx." in s:
-                    # Ej: "📉 Mín. 9.99% | 📈 Máx. 119.98%"
-                    m = re.search(r"Mín\.\s*([\d.,]+%)\s*\|\s*📈 Máx\.\s*([\d.,]+%)", s)
-                    if m:
-                        min_ev = m.group(1)
-                        max_ev = m.group(2)
-                # Prob middle
-                elif s.startswith("🍀"):
-                    # "🍀 Probabilidad de middle: 2.33%"
-                    m = re.search(r"([\d.,]+%)", s)
-                    if m:
-                        prob_middle = m.group(1)
-                # Deporte
-                elif s.startswith("⚽") or s.startswith("🏀") or s.startswith("🎾") or s.startswith("🏈"):
-                    parts = s.split(maxsplit=1)
-                    sport_emoji = parts[0]
-                    sport_name = parts[1] if len(parts) > 1 else ""
-                # Fecha
-                elif s.startswith("🗓") or s.startswith("📆"):
-                    parts = s.split(maxsplit=1)
-                    date_val = parts[1] if len(parts) > 1 else ""
-                # Partido
-                elif s.startswith("🏆"):
-                    raw = s[1:].strip()
-                    m = re.match(r"^(.*?)\s*\((.*)\)\s*$", raw)
-                    if m:
-                        match_full = m.group(1).strip()
-                        comp_full = m.group(2).strip()
-                    else:
-                        match_full = raw
-                        comp_full = ""
-                # Casas
-                elif "📕" in s or "🏠" in s:
-                    if book1 is None:
-                        book1 = bline
-                    elif book2 is None:
-                        book2 = bline
-
-            out_lines.append(f"{idx}️⃣ 🔥 -- SURESTABERA -- 🔥")
-
-            # Rango EV
-            if min_ev and max_ev:
-                out_lines.append(f"📉 Rango EV: {min_ev}  →  {max_ev}")
-            # Prob middle
-            if prob_middle:
-                out_lines.append(f"🍀 Probabilidad de middle: {prob_middle}")
-
-            out_lines.append("")
-
-            # Deporte
-            if sport_emoji or sport_name:
-                out_lines.append(f"{sport_emoji} Deporte: {sport_name}".strip())
-            # Fecha
-            if date_val:
-                out_lines.append(f"📆 Fecha: {date_val}")
-            # Partido
-            if match_full:
-                if comp_full:
-                    out_lines.append(f"🏆 Partido: {match_full} ({comp_full})")
-                else:
-                    out_lines.append(f"🏆 Partido: {match_full}")
-
-            out_lines.append("")
-            out_lines.append("🧩 Estructura del middle:")
-
-            # Casas
-            if book1:
-                out_lines.append("")
-                b1_name, b1_mkt, b1_odds, b1_stake, b1_suf = parse_book_line(book1)
-                out_lines.append(f"🏦 Casa 1: {b1_name}")
-                if b1_mkt:
-                    out_lines.append(f"   🎯 Mercado: {b1_mkt}")
-                if b1_odds:
-                    out_lines.append(f"   📊 Cuota: {b1_odds}")
-                if b1_stake or b1_suf:
-                    suf = f"  {b1_suf}" if b1_suf else ""
-                    out_lines.append(f"   💰 % Stake: {b1_stake}{suf}")
-
-            if book2:
-                out_lines.append("")
-                b2_name, b2_mkt, b2_odds, b2_stake, b2_suf = parse_book_line(book2)
-                out_lines.append(f"🏦 Casa 2: {b2_name}")
-                if b2_mkt:
-                    out_lines.append(f"   🎯 Mercado: {b2_mkt}")
-                if b2_odds:
-                    out_lines.append(f"   📊 Cuota: {b2_odds}")
-                if b2_stake or b2_suf:
-                    suf = f"  {b2_suf}" if b2_suf else ""
-                    out_lines.append(f"   💰 % Stake: {b2_stake}{suf}")
-
-            if idx != len(blocks):
-                out_lines.append("")
-                out_lines.append("")
-
-        except Exception:
-            logging.exception("Error formateando middlebet, devolviendo bloque original")
-            out_lines.append("\n".join(block))
-            if idx != len(blocks):
-                out_lines.append("")
-                out_lines.append("")
-
-    return "\n".join(out_lines).strip()
+            FANOUT_STATS["sends"] += 1
+            ALERTS_SENT.inc(destination=str(dest))
+            logging.info(f"{kind} {src_id} → {dest} | msg_id={msg_id}")
+    FANOUT_STATS["fanout_latency_s"] += time.monotonic() - start
+    return results
+
+async def fan_out_media(src_id, msg, dests, caption):
+    FANOUT_STATS["media_messages"] += 1
+    size = _media_size(msg)
+
+    def send_ref(media):
+        return lambda dest: client.send_file(dest, media, caption=caption, force_document=FORCE_DOCUMENT)
+
+    # 1) Reutilizar la referencia del origen: cero descargas
+    if not getattr(msg, "noforwards", False):
+        ref_errors = (ChatForwardsRestrictedError, FileReferenceExpiredError, MediaEmptyError)
+        results = await fan_out(src_id, msg.id, dests, send_ref(msg.media), "Media", retryable=ref_errors)
+        retry = [d for d, r in zip(dests, results) if isinstance(r, ref_errors)]
+        FANOUT_STATS["failures"] -= len(retry)  # Se reintentan abajo
+        ok = len(dests) - len([r for r in results if isinstance(r, Exception)])
+        if ok:
+            FANOUT_STATS["by_reference"] += 1
+            FANOUT_STATS["bytes_saved"] += size * ok
+            FANOUT_STATS["latency_saved_s"] += _estimated_download_s(size)
+        if not retry:
+            return
+        dests = retry
 
-# ─────────────────────────────────────────────────────────────────────────────
-# NUEVO: selector general Sure/Middle
-# ─────────────────────────────────────────────────────────────────────────────
-def modify_sure_middle_text(text: str) -> str:
-    t = text
-    # Nueva lógica para surebets formato "💰 New surebet found!"
-    if "💰 New surebet found!" in t:
-        return format_new_surebet(t)
-    
-    if "Alerta de Surebets" in t or "💵 Rango Beneficio" in t:
-        return format_surebets(t)
-    if "Alerta de Middlebets" in t or "👑 Rango Valor Esperado" in t:
-        return format_middlebets(t)
-    return text
+    # 2) Contenido protegido / referencia inválida: una sola descarga
+    buf = io.BytesIO()
+    # Nombre descriptivo si existe
+    buf.name = getattr(getattr(msg, "file", None), "name", None) or "file"
+    t0 = time.monotonic()
+    try:
+        # Puede fallar si el origen tiene contenido protegido
+        await client.download_media(msg, file=buf)
+    except RPCError as e:
+        FANOUT_STATS["failures"] += len(dests)
+        for dest in dests:
+            ALERTS_FAILED.inc(destination=str(dest))
+        logging.error(f"Fallo descargando media {src_id} | msg_id={msg.id} | {type(e).__name__}: {e}")
+        return
+    elapsed = time.monotonic() - t0
+    downloaded = buf.getbuffer().nbytes
+    FANOUT_STATS["downloads"] += 1
+    FANOUT_STATS["bytes_downloaded"] += downloaded
+    _DOWNLOAD_RATE["bytes"] += downloaded
+    _DOWNLOAD_RATE["seconds"] += elapsed
+
+    # Se sube al primer destino; los demás reutilizan la referencia de ese envío
+    buf.seek(0)
+    first, rest = dests[0], dests[1:]
+    results = await fan_out(src_id, msg.id, [first], send_ref(buf), "Media")
+    if not rest:
+        return
+    sent = results[0]
+    if isinstance(sent, Exception) or not getattr(sent, "media", None):
+        # Sin referencia reutilizable: se suben los mismos bytes (sin volver a descargar)
+        def send_copy(dest):
+            copy = io.BytesIO(buf.getvalue())
+            copy.name = buf.name
+            return client.send_file(dest, copy, caption=caption, force_document=FORCE_DOCUMENT)
+        await fan_out(src_id, msg.id, rest, send_copy, "Media")
+    else:
+        await fan_out(src_id, msg.id, rest, send_ref(sent.media), "Media")
+    FANOUT_STATS["bytes_saved"] += downloaded * len(rest)
+    FANOUT_STATS["latency_saved_s"] += elapsed * len(rest)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # TELETHON + FASTAPI
@@ -602,71 +244,47 @@ PAIRS = {}
 # Para status/diagnóstico
 LISTEN_IDS   = []  # peer ids
 LISTEN_PEERS = []  # entidades (Channel/Chat/User)
-# Orígenes que aplican filtrado (los de DEST_CHAT_1)
-FILTER_ORIGINS = []
-# Resuelto para comparación
-DEST_CHAT_2_RESOLVED = None
+# Reglas de enrutado (routing.Router), construidas en el arranque
+ROUTER = routing.Router({})
+# Surebets ya reenviadas por (destino, canonical.surebet_key), vengan del origen que vengan
+FORWARDED = DedupStore("forwarder")
 
 @app.on_event("startup")
 async def startup_event():
     await client.start()
 
-    # Construcción de especificaciones (lista de (origenes[], destino))
-    origin_dest_specs = []
+    # Rutas: ROUTING_CONFIG (JSON) o, si no existe, las equivalentes a las variables DEST_CHAT_*
+    config = routing.load_config(routing.ROUTING_CONFIG, fallback=routing_from_env)
+    router = routing.Router(config, normalize=_maybe_int)
 
-    # Bloque destino 1
-    if DEST_CHAT_1:
-        csv1 = _split_csv(ORIGINS_DEST1)
-        if csv1:
-            origin_dest_specs.append((csv1, DEST_CHAT_1))
-        if ORIGIN_CHAT_1:  # compatibilidad
-            origin_dest_specs.append(([ORIGIN_CHAT_1], DEST_CHAT_1))
-
-    # Bloque destino 2
-    if DEST_CHAT_2:
-        csv2 = _split_csv(ORIGINS_DEST2)
-        if csv2:
-            origin_dest_specs.append((csv2, DEST_CHAT_2))
-        if ORIGIN_CHAT_2:  # compatibilidad
-            origin_dest_specs.append(([ORIGIN_CHAT_2], DEST_CHAT_2))
-
-    if not origin_dest_specs:
+    if not router.routes:
         logging.warning("No hay pares configurados. Define ORIGINS_DEST1/2 y/o ORIGIN_CHAT_1/2 con sus DEST_CHAT_1/2.")
 
     # Resolver entidades y construir PAIRS / LISTEN_PEERS
     pairs_local = {}
     peers_local = []
     ids_local   = []
-    filter_origins_local = []
-
-    dest_chat_1_resolved = _maybe_int(DEST_CHAT_1) if DEST_CHAT_1 else None
-    global DEST_CHAT_2_RESOLVED
-    DEST_CHAT_2_RESOLVED = _maybe_int(DEST_CHAT_2) if DEST_CHAT_2 else None
 
-    for origins_list, dest_val in origin_dest_specs:
-        dest_target = _maybe_int(dest_val)  # se usa tal cual en send_*
+    for route in router.routes:
         # No hace falta resolver el destino (Telethon acepta @/id), resolvemos solo orígenes
-        for origin in origins_list:
+        for origin in route.origins:
             try:
                 origin_resolved = _maybe_int(origin)
                 ent_o = await client.get_entity(origin_resolved)  # User/Channel/Chat
                 o_peer = get_peer_id(ent_o)                      # int (p.ej. -100..., o id positivo en privados)
 
-                pairs_local[o_peer] = dest_target
+                router.bind(route, o_peer)
+                pairs_local[o_peer] = route.default
                 peers_local.append(ent_o)  # importante: ENTIDADES para que Telethon detecte privados/bots
                 ids_local.append(o_peer)
-
-                # Si este origen va a DEST_CHAT_1, agregarlo a filter_origins
-                if dest_target == dest_chat_1_resolved:
-                    filter_origins_local.append(o_peer)
             except Exception as e:
                 logging.error(f"Error resolviendo origen {origin}: {e}")
 
-    global PAIRS, LISTEN_PEERS, LISTEN_IDS, FILTER_ORIGINS
+    global PAIRS, LISTEN_PEERS, LISTEN_IDS, ROUTER
     PAIRS = pairs_local
     LISTEN_PEERS = peers_local
     LISTEN_IDS = ids_local
-    FILTER_ORIGINS = filter_origins_local
+    ROUTER = router
 
     logging.info(f"Pares configurados (peer ids): { {str(k): str(v) for k,v in PAIRS.items()} }")
     logging.info(f"Escuchando orígenes (peer ids): {LISTEN_IDS}")
@@ -676,14 +294,13 @@ async def startup_event():
     async def handler(event):
         # Aceptamos canales, grupos y privados (incluye bots en privado)
         src_id = event.chat_id  # peer id numérico
-        dest_default = PAIRS.get(src_id)
 
         logging.debug(
             f"NewMessage | chat_id={src_id} sender_id={event.sender_id} "
             f"is_channel={event.is_channel} is_group={event.is_group} is_private={event.is_private}"
         )
 
-        if not dest_default:
+        if ROUTER.route_for(src_id) is None:
             logging.warning(f"Origen no emparejado: {src_id} | known={LISTEN_IDS}")
             return
 
@@ -694,58 +311,43 @@ async def startup_event():
         msg = event.message
         text = (msg.text or "").strip()
 
-        # Determinar destinos basado en filtrado (solo para orígenes en FILTER_ORIGINS)
-        dests = [dest_default]
-        if src_id in FILTER_ORIGINS:
-            if FILTER_KEYWORD in text and DEST_CHAT_3:
-                dests = [_maybe_int(DEST_CHAT_3)]
-                logging.debug(f"Filtrado 1 aplicado: {src_id} → {dests}")
-            else:
-                # Filtrado 2: bet365
-                if FILTER_KEYWORD2.lower() in text.lower():
-                    dests = [dest_default]
-                else:
-                    if DEST_CHAT_4:
-                        dests.append(_maybe_int(DEST_CHAT_4))
-                
-                # Filtrado 3: winamax (similar al 2)
-                if FILTER_KEYWORD3.lower() in text.lower():
-                    dests = [dest_default]
-                else:
-                    if DEST_CHAT_5:
-                        dests.append(_maybe_int(DEST_CHAT_5))
-
-        # Modificar si alguno de los destinos es DEST_CHAT_2
-        modified_text = text
-        if any(dest == DEST_CHAT_2_RESOLVED for dest in dests) and text:
-            modified_text = modify_text(text)
-
-        # NUEVO SURE/MIDDLE: solo para orígenes de ORIGIN1 (FILTER_ORIGINS)
-        if src_id in FILTER_ORIGINS and modified_text:
-            new_text = modify_sure_middle_text(modified_text)
-            if new_text != modified_text:
-                modified_text = new_text
+        # Destinos y transformaciones según las reglas de la ruta del origen
+        dests, transforms = ROUTER.route(src_id, text)
+        logging.debug(f"Ruta {src_id} → {dests} | transforms={transforms}")
 
-        try:
-            for dest in dests:
-                if msg.media:
-                    buf = io.BytesIO()
-                    # Nombre descriptivo si existe
-                    buf.name = getattr(getattr(msg, "file", None), "name", None) or "file"
-                    # Puede fallar si el origen tiene contenido protegido
-                    await client.download_media(msg, file=buf)
-                    buf.seek(0)
-                    caption = modified_text if modified_text else ""
-                    await client.send_file(dest, buf, caption=caption, force_document=FORCE_DOCUMENT)
-                    logging.info(f"Media {src_id} → {dest} | msg_id={msg.id}")
-                else:
-                    if modified_text:
-                        await client.send_message(dest, modified_text)
-                        logging.info(f"Texto {src_id} → {dest} | msg_id={msg.id}")
-                    else:
-                        logging.info(f"Skip empty text | msg_id={msg.id}")
-        except RPCError as e:
-            logging.error(f"Fallo reenviando {src_id}→{dests} | msg_id={msg.id} | {type(e).__name__}: {e}")
+        # Re-precio con las cuotas más recientes de todos los orígenes (odds_validator)
+        surebets = extract_surebets(text)
+        verdicts = [ODDS_BOOK.check(match, legs, f"tg:{src_id}", msg.date.timestamp())
+                    for match, legs in surebets]
+        if verdicts and all(should_drop(v) for v in verdicts):
+            logging.info(f"💀 Surebet sin beneficio con cuotas actuales, no se reenvía | {src_id} msg_id={msg.id}")
+            return
+        warnings = [f"{i}️⃣ {w}" if len(verdicts) > 1 else w
+                    for i, w in enumerate(map(warning_line, verdicts), start=1) if w]
+
+        # La misma surebet publicada por varios orígenes llega una sola vez a cada destino
+        if surebets:
+            keys = [surebet_key(match, legs) for match, legs in surebets]
+            dests = [d for d in dests if any([FORWARDED.check_and_add(make_key(d, k)) for k in keys])]
+            if not dests:
+                logging.info(f"♻️ Surebet ya reenviada desde otro origen | {src_id} msg_id={msg.id}")
+                return
+
+        # Cada transformación se renderiza una vez por mensaje (no por destino)
+        modified_text = text
+        for name in transforms:
+            if not modified_text:
+                break
+            modified_text = TRANSFORMS[name](modified_text)
+        if warnings and modified_text:
+            modified_text = "\n".join(warnings) + "\n\n" + modified_text
+
+        if msg.media:
+            await fan_out_media(src_id, msg, dests, modified_text or "")
+        elif modified_text:
+            await fan_out(src_id, msg.id, dests, lambda dest: client.send_message(dest, modified_text), "Texto")
+        else:
+            logging.info(f"Skip empty text | msg_id={msg.id}")
 
     # Mantener el cliente vivo
     app.state.client_task = asyncio.create_task(client.run_until_disconnected())
@@ -776,4 +378,10 @@ def status():
         "connected": client.is_connected(),
         "pairs": {str(k): str(v) for k, v in PAIRS.items()},
         "listening_ids": [str(x) for x in LISTEN_IDS],
+        "fanout": FANOUT_STATS,
     }
+
+@app.get("/metrics")
+def metrics():
+    # Formato de texto de Prometheus (metrics.REGISTRY)
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
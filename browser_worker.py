@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# --- Browser Worker ---
+# Selenium calls (page_source, get, find_elements, execute_script...) block for
+# tens or hundreds of ms and a driver must not be used from two threads at once.
+# BrowserWorker owns one driver on one dedicated thread and exposes it to the
+# asyncio side through awaitables, so the Telethon client sharing the loop keeps
+# running while the browser works.
+
+
+class BrowserWorker:
+    def __init__(self, name="browser"):
+        self.name = name
+        self.driver = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+
+    async def call(self, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) on the browser thread.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def start(self, factory):
+        self.driver = await self.call(factory)
+        return self.driver
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Runs fn(driver, *args, **kwargs) on the browser thread.
+        """
+        return await self.call(fn, self.driver, *args, **kwargs)
+
+    async def attr(self, name):
+        # driver.current_url / driver.title / driver.page_source are blocking properties
+        return await self.call(getattr, self.driver, name)
+
+    async def quit(self):
+        if self.driver is not None:
+            try:
+                await self.call(self.driver.quit)
+            except Exception as e:
+                logger.warning(f"⚠️ Error closing browser '{self.name}': {e}")
+            self.driver = None
+        self._executor.shutdown(wait=False)
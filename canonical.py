@@ -0,0 +1,340 @@
+import os
+import re
+import json
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+
+from arbitrage import parse_odds
+from bookie_registry import canonical_name
+
+logger = logging.getLogger(__name__)
+
+# --- Canonical event / league / market names ---
+# The same match comes as "Athletic Bilbao – Atletico Madrid (To Spanish La
+# Liga Primera)" from a channel and as "Athletic Club - Atl. Madrid" plus a
+# league from BetHero. Names are normalised (case, accents, punctuation,
+# "FC"/"CF"... noise), looked up in an alias table and otherwise matched
+# against the names already seen with a trigram index (Jaccard similarity),
+# so the first spelling seen becomes the canonical one for the later ones.
+# Qualifiers (B, II, W/women, U21, reserves...) must agree for a fuzzy match:
+# "Real Madrid B" is never "Real Madrid", whichever was seen first.
+# Resolved strings are kept in an LRU, feeds repeat the same names all day.
+# Names and spellings learned from the feeds are LRU-bounded too (MAX_LEARNED),
+# the alias tables are never evicted.
+#
+# Extra aliases: ALIASES_FILE (JSON {"teams"|"leagues": {canonical: [aliases]}}).
+
+ALIASES_FILE = os.environ.get("ALIASES_FILE", "aliases.json")
+MATCH_THRESHOLD = 0.7   # Trigram Jaccard needed to merge two names
+CACHE_SIZE = 20000      # Resolved names kept per index
+MAX_LEARNED = int(os.environ.get("MAX_LEARNED_NAMES", 20000))  # Learned names + spellings kept per index
+
+TEAM_ALIASES = {
+    "athletic bilbao": ["athletic club", "ath bilbao", "athletic"],
+    "atletico madrid": ["atl madrid", "atletico de madrid", "atl de madrid", "club atletico de madrid"],
+    "real madrid": ["r madrid", "real madrid cf"],
+    "barcelona": ["fc barcelona", "barca", "fc barca"],
+    "real sociedad": ["r sociedad"],
+    "real betis": ["betis", "real betis balompie"],
+    "manchester united": ["man utd", "man united", "manchester utd"],
+    "manchester city": ["man city"],
+    "paris saint germain": ["psg", "paris sg", "paris st germain"],
+    "inter": ["inter milan", "internazionale", "fc internazionale milano"],
+    "bayern munich": ["bayern munchen", "fc bayern", "bayern"],
+    "los angeles lakers": ["la lakers", "lakers"],
+    "los angeles clippers": ["la clippers", "clippers"],
+}
+
+LEAGUE_ALIASES = {
+    "laliga": ["la liga", "spanish la liga primera", "to spanish la liga primera", "spain laliga",
+               "spain la liga", "primera division", "laliga ea sports"],
+    "laliga 2": ["segunda division", "spain laliga 2", "laliga hypermotion"],
+    "premier league": ["english premier league", "england premier league", "epl"],
+    "serie a": ["italy serie a", "italian serie a"],
+    "bundesliga": ["germany bundesliga", "german bundesliga"],
+    "ligue 1": ["france ligue 1", "french ligue 1"],
+    "champions league": ["uefa champions league", "ucl"],
+    "europa league": ["uefa europa league", "uel"],
+    "nba": ["usa nba"],
+    "euroleague": ["euroliga", "turkish airlines euroleague"],
+    "acb": ["liga acb", "spain acb", "liga endesa"],
+}
+
+# Words that never tell two teams apart
+_NOISE = {"fc", "cf", "cd", "sc", "ac", "afc", "ud", "sd", "rc", "club", "de", "the", "calcio"}
+
+# Words after the first one that make another team of the same club -> one form
+_QUALIFIER_WORDS = {
+    "b": "b", "c": "c", "ii": "ii", "iii": "iii",
+    "w": "women", "women": "women", "womens": "women", "ladies": "women",
+    "fem": "women", "femenino": "women", "femenina": "women", "feminino": "women",
+    "reserves": "reserves", "reserve": "reserves", "res": "reserves",
+    "youth": "youth", "juvenil": "youth", "academy": "youth",
+    "amateur": "amateur", "am": "amateur",
+}
+_AGE_RE = re.compile(r"\b(?:u|sub)\s?-?(\d{2})\b")  # "U21", "U-19", "Sub 23" -> "u21"
+
+# Spanish / English market vocabulary -> one wording
+_MARKET_TERMS = (
+    (re.compile(r"\bmas de\b|\bmore than\b|\bover\b|\bo(?=\s?\d)"), "over"),
+    (re.compile(r"\bmenos de\b|\bless than\b|\bunder\b|\bu(?=\s?\d)"), "under"),
+    (re.compile(r"\bhandicap asiatico\b|\basian handicap\b|\bah\b"), "ah"),
+    (re.compile(r"\bhandicap\b|\bhcp\b|\bspread\b"), "handicap"),
+    (re.compile(r"\bganador\b|\bgana\b|\bwinner\b|\bto win\b|\bwin\b"), "winner"),
+    (re.compile(r"\bempate\b|\bdraw\b"), "draw"),
+    # Units are kept, "over 4.5 goals" and "over 4.5 corners" are different markets
+    (re.compile(r"\bgoles\b|\bgoals?\b"), "goals"),
+    (re.compile(r"\bpuntos\b|\bpoints?\b"), "points"),
+    (re.compile(r"\bjuegos\b|\bgames?\b"), "games"),
+    (re.compile(r"\bsets?\b"), "sets"),
+    (re.compile(r"\bcorners?\b|\bcorneres\b"), "corners"),
+    (re.compile(r"\btarjetas\b|\bcards?\b"), "cards"),
+)
+
+# Letters glued to a line or a number ("o2.5", "ah-1", "2.5goals") -> one space
+_GLUED_RE = re.compile(r"(?<=[a-z])(?=[+-]?\d)|(?<=\d)(?=[a-z])")
+
+_PUNCT_RE = re.compile(r"[^\w\s+.-]|(?<!\d)\.|\.(?!\d)|[+-](?!\d)|_")
+_SPACES_RE = re.compile(r"\s+")
+_DECIMAL_COMMA_RE = re.compile(r"(\d),(\d)")
+_EVENT_SEP_RE = re.compile(r"\s+(?:vs\.?|v\.?|-|–|—|@)\s+", re.I)
+_COMPETITION_RE = re.compile(r"^(.*?)\s*\((.*)\)\s*$")
+
+
+def normalize(text):
+    """
+    Lowercase ASCII words separated by single spaces ("Atlético  Madrid," ->
+    "atletico madrid"). Decimal numbers and +/- signs are kept.
+    """
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode().lower()
+    text = _PUNCT_RE.sub(" ", _DECIMAL_COMMA_RE.sub(r"\1.\2", text))
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+def _strip_noise(name):
+    words = [w for w in name.split(" ") if w not in _NOISE]
+    return " ".join(words) or name
+
+
+def _clean(raw):
+    # normalize + noise words out + one spelling per qualifier ("Femenino" -> "women")
+    name = _AGE_RE.sub(r"u\1", _strip_noise(normalize(raw)))
+    first, *rest = name.split(" ")
+    return " ".join([first] + [_QUALIFIER_WORDS.get(w, w) for w in rest])
+
+
+def _trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _qualifiers(name):
+    # Of a _clean() name. First word excluded: "c alcaraz" is an initial, not a C team
+    words = name.split(" ")[1:]
+    return frozenset(w for w in words if w in _QUALIFIER_WORDS or _AGE_RE.fullmatch(w))
+
+
+def _initials_match(a, b):
+    # "c alcaraz" ~ "carlos alcaraz": same words, an initial stands for its word
+    wa, wb = a.split(" "), b.split(" ")
+    if len(wa) != len(wb) or a == b:
+        return False
+    return all(x == y or (len(x) == 1 and y.startswith(x)) or (len(y) == 1 and x.startswith(y))
+               for x, y in zip(wa, wb))
+
+
+class NameIndex:
+    def __init__(self, aliases=None, threshold=MATCH_THRESHOLD, cache_size=CACHE_SIZE, max_learned=MAX_LEARNED):
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.max_learned = max_learned
+        self._aliases = {}                 # normalized alias -> canonical
+        self._grams = defaultdict(set)     # trigram -> canonical names
+        self._sizes = {}                   # canonical -> trigram count
+        self._by_surname = defaultdict(set)  # last word -> canonical names (initials match)
+        self._cache = OrderedDict()        # raw string -> canonical (LRU)
+        self._learned = OrderedDict()      # learned name or spelling -> canonical (LRU, evictable)
+        self._lock = threading.Lock()      # Scraper thread and bot loop share the indexes
+        for canonical, names in (aliases or {}).items():
+            self.add(canonical, names)
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def add(self, canonical, aliases=()):
+        canonical = _clean(canonical)
+        with self._lock:
+            self._add(canonical)
+            self._learned.pop(canonical, None)  # Pinned from now on
+            for alias in aliases:
+                alias = _clean(alias)
+                self._aliases[alias] = canonical
+                self._learned.pop(alias, None)
+            self._cache.clear()
+        return canonical
+
+    def _add(self, canonical):
+        self._aliases.setdefault(canonical, canonical)
+        if canonical in self._sizes:
+            return
+        grams = _trigrams(canonical)
+        for g in grams:
+            self._grams[g].add(canonical)
+        self._sizes[canonical] = len(grams)
+        self._by_surname[canonical.rsplit(" ", 1)[-1]].add(canonical)
+
+    def _remove(self, canonical):
+        for g in _trigrams(canonical):
+            names = self._grams.get(g)
+            if names is not None:
+                names.discard(canonical)
+                if not names:
+                    del self._grams[g]
+        self._sizes.pop(canonical, None)
+        surname = canonical.rsplit(" ", 1)[-1]
+        names = self._by_surname.get(surname)
+        if names is not None:
+            names.discard(canonical)
+            if not names:
+                del self._by_surname[surname]
+
+    def _learn(self, name, canonical):
+        # New entry in the LRU of learned names; the least recently resolved goes first
+        self._learned[name] = canonical
+        while len(self._learned) > self.max_learned:
+            old, old_canonical = self._learned.popitem(last=False)
+            if self._aliases.get(old) == old_canonical:
+                del self._aliases[old]
+            if old == old_canonical:
+                self._remove(old)
+
+    def _touch(self, *names):
+        for name in names:
+            if name in self._learned:
+                self._learned.move_to_end(name)
+
+    def _fuzzy(self, name):
+        grams = _trigrams(name)
+        qualifiers = _qualifiers(name)
+        overlap = defaultdict(int)
+        for g in grams:
+            for candidate in self._grams.get(g, ()):
+                overlap[candidate] += 1
+        best, best_score = None, 0.0
+        for candidate, shared in overlap.items():
+            score = shared / (len(grams) + self._sizes[candidate] - shared)
+            if score > best_score and _qualifiers(candidate) == qualifiers:
+                best, best_score = candidate, score
+        if best_score >= self.threshold:
+            return best
+        for candidate in self._by_surname.get(name.rsplit(" ", 1)[-1], ()):
+            if _initials_match(name, candidate) and _qualifiers(candidate) == qualifiers:
+                return candidate
+        return None
+
+    def resolve(self, raw, learn=True):
+        """
+        Canonical name of `raw`. Unknown names become canonical themselves
+        (learn=True) so later spellings of the same team resolve to them.
+        """
+        with self._lock:
+            hit = self._cache.get(raw)
+            if hit is not None and hit in self._sizes:
+                self._cache.move_to_end(raw)
+                self._touch(hit)
+                return hit
+            name = _clean(raw)
+            canonical = self._aliases.get(name)
+            if canonical is not None and canonical not in self._sizes:
+                canonical = None  # Spelling of an evicted name
+            canonical = canonical or self._fuzzy(name)
+            if canonical is None:
+                canonical = name
+                if learn and name:
+                    self._add(name)
+                    self._aliases[name] = name  # Over a stale spelling of an evicted name
+                    self._learn(name, name)
+            elif name not in self._aliases or self._aliases[name] != canonical:
+                self._aliases[name] = canonical  # Next time an exact hit
+                self._learn(name, canonical)
+            self._touch(name, canonical)
+            self._cache[raw] = canonical
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return canonical
+
+
+def _load_aliases_file(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"❌ Could not read {path}: {e}")
+        return {}
+    logger.info(f"📚 Aliases loaded from {path}")
+    return data
+
+
+_EXTRA = _load_aliases_file(ALIASES_FILE)
+TEAMS = NameIndex({**TEAM_ALIASES, **_EXTRA.get("teams", {})})
+LEAGUES = NameIndex({**LEAGUE_ALIASES, **_EXTRA.get("leagues", {})})
+
+
+# --- Keys ---
+def split_event(event):
+    """
+    "Home – Away (Competition)" -> (home, away, competition). away is "" when
+    the text has no recognisable separator.
+    """
+    event = str(event or "").strip()
+    competition = ""
+    m = _COMPETITION_RE.match(event)
+    if m:
+        event, competition = m.group(1), m.group(2)
+    parts = _EVENT_SEP_RE.split(event, maxsplit=1)
+    home, away = (parts[0], parts[1]) if len(parts) == 2 else (event, "")
+    return home.strip(), away.strip(), competition.strip()
+
+
+def event_key(event):
+    home, away, _ = split_event(event)
+    if not away:
+        return TEAMS.resolve(home)
+    return f"{TEAMS.resolve(home)} - {TEAMS.resolve(away)}"
+
+
+def league_key(league):
+    return LEAGUES.resolve(league)
+
+
+def market_key(market):
+    text = _GLUED_RE.sub(" ", normalize(market))
+    for pattern, replacement in _MARKET_TERMS:
+        text = pattern.sub(replacement, text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+def bookie_key(bookie):
+    # "Bet365 ES" and "bet365" are one bookie, "betfair" and "betfair exchange" two
+    return normalize(canonical_name(bookie))
+
+
+def _odds_key(odds):
+    odds = parse_odds(odds)
+    return f"{odds:.2f}" if odds == odds else ""  # "2,1" and "2.10" agree, NaN -> ""
+
+
+def surebet_key(event, legs):
+    """
+    Same string for the same surebet whatever feed reported it: canonical
+    event plus the sorted (market, bookie, odds) legs. Odds are part of the
+    key, so a surebet that comes back at other prices is a new alert. The
+    reported profit is left out, every feed computes it its own way.
+    """
+    legs = sorted(f"{market_key(leg.get('market'))}@{bookie_key(leg.get('bookie'))}={_odds_key(leg.get('odds'))}"
+                  for leg in legs)
+    return event_key(event) + "|" + ";".join(legs)
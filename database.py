@@ -0,0 +1,115 @@
+import os
+import asyncio
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# --- Shared Data Access for surebets.db ---
+# One long-lived connection per thread (scraper thread, bot loop, DB executor
+# workers) instead of connect/close on every helper call. Each connection keeps
+# sqlite3's prepared-statement cache warm, so the fixed SQL strings used by the
+# helpers are compiled once per thread.
+
+DB_NAME = os.path.abspath("surebets.db")
+
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 5000
+DB_WORKERS = 4
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",      # Safe with WAL, avoids an fsync per commit
+    "PRAGMA mmap_size=268435456",     # 256 MB memory-mapped reads
+    "PRAGMA cache_size=-20000",       # ~20 MB page cache per connection
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+def _connect():
+    conn = sqlite3.connect(
+        DB_NAME,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
+
+
+def get_connection():
+    """
+    Returns this thread's connection, opening it on first use.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != DB_NAME:
+        conn = _connect()
+        _local.conn = conn
+        _local.path = DB_NAME
+    return conn
+
+
+def close_all():
+    with _connections_lock:
+        for conn in _connections:
+            try: conn.close()
+            except Exception: pass
+        _connections.clear()
+    _local.__dict__.clear()
+
+
+# --- Helpers ---
+def fetchone(sql, params=()):
+    return get_connection().execute(sql, params).fetchone()
+
+
+def fetchall(sql, params=()):
+    return get_connection().execute(sql, params).fetchall()
+
+
+def execute(sql, params=()):
+    """
+    Runs one write statement in its own transaction. Returns the cursor
+    (lastrowid / rowcount).
+    """
+    conn = get_connection()
+    with conn:
+        return conn.execute(sql, params)
+
+
+def executemany(sql, seq):
+    conn = get_connection()
+    with conn:
+        return conn.executemany(sql, seq)
+
+
+@contextmanager
+def transaction():
+    """
+    Groups several statements in one commit: `with transaction() as conn: ...`
+    """
+    conn = get_connection()
+    with conn:
+        yield conn
+
+
+# --- Async Facade ---
+async def run(fn, *args, **kwargs):
+    """
+    Runs a blocking DB helper on the DB worker threads so PTB/Telethon
+    handlers don't stall the event loop: `row = await database.run(get_user, uid)`.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, lambda: fn(*args, **kwargs))
@@ -0,0 +1,193 @@
+import re
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# --- Bounded, time-expiring dedup store ---
+# Replaces the ever-growing SEEN_BETS set. Keys are 64-bit hashes of the bet
+# signature (8 bytes instead of a long f-string), each one expires a while after
+# the event starts (a surebet can't come back after the match is over), the
+# total size is capped, and entries can be mirrored to SQLite so a crash-restart
+# does not re-send everything that is still on the page.
+
+DEFAULT_TTL = 6 * 3600        # Seconds, when the start time is unknown
+AFTER_START_GRACE = 3 * 3600  # Keep keys this long after kick-off (live markets)
+MAX_ENTRIES = 50000
+PURGE_EVERY = 500             # Adds between two expiry sweeps
+
+
+def make_key(*parts):
+    """
+    64-bit signed hash of the signature parts (fits an SQLite INTEGER).
+    """
+    raw = "\x1f".join(str(p) for p in parts).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big", signed=True)
+
+
+_REL_DAY = {"today": 0, "hoy": 0, "tomorrow": 1, "mañana": 1}
+_TIME_RE = re.compile(r"(\d{1,2}):(\d{2})")
+_DATE_RE = re.compile(r"(\d{1,2})[/.-](\d{1,2})(?:[/.-](\d{2,4}))?")
+_IN_RE = re.compile(r"in\s+(\d+)\s*(min|minute|minutes|h|hour|hours)", re.I)
+
+
+def parse_start_time(text, now=None):
+    """
+    Best effort parse of the start times shown by the feeds ("Tomorrow at 18:00",
+    "06/12 21:00", "In 15 minutes", ISO). Returns a datetime or None.
+    """
+    if not text:
+        return None
+    now = now or datetime.now()
+    t = str(text).strip()
+
+    try:
+        return datetime.fromisoformat(t.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        pass
+
+    m = _IN_RE.search(t)
+    if m:
+        n = int(m.group(1))
+        unit = m.group(2).lower()
+        return now + (timedelta(minutes=n) if unit.startswith("m") else timedelta(hours=n))
+
+    tm = _TIME_RE.search(t)
+    hour, minute = (int(tm.group(1)), int(tm.group(2))) if tm else (0, 0)
+    if hour > 23 or minute > 59:
+        return None
+
+    low = t.lower()
+    for word, offset in _REL_DAY.items():
+        if word in low:
+            day = now + timedelta(days=offset)
+            return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    dm = _DATE_RE.search(t)
+    if dm:
+        day, month = int(dm.group(1)), int(dm.group(2))
+        year = dm.group(3)
+        year = int(year) + (2000 if year and len(year) == 2 else 0) if year else now.year
+        try:
+            start = datetime(year, month, day, hour, minute)
+        except ValueError:
+            return None
+        # "06/01" seen in late December is next year's match
+        if not dm.group(3) and start < now - timedelta(days=180):
+            start = start.replace(year=year + 1)
+        return start
+
+    if tm:
+        # Only a time: today, or tomorrow if that time already passed long ago
+        start = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if start < now - timedelta(hours=12):
+            start += timedelta(days=1)
+        return start
+    return None
+
+
+class DedupStore:
+    def __init__(self, namespace, max_entries=MAX_ENTRIES, default_ttl=DEFAULT_TTL, persist=False):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.persist = persist
+        self._entries = {}  # key -> expires_at (epoch). Insertion order = age
+        self._lock = threading.RLock()  # Re-entrant: check_and_add holds it across seen() + _record()
+        self._loaded = not persist
+        self._adds = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.seen(key)
+
+    # --- Persistence ---
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            # seen_bets is created by migrations.migrate(), run at startup by the scraper and the bot
+            db.execute("DELETE FROM seen_bets WHERE expires_at < ?", (time.time(),))
+            rows = db.fetchall(
+                "SELECT key, expires_at FROM seen_bets WHERE namespace = ? ORDER BY expires_at DESC LIMIT ?",
+                (self.namespace, self.max_entries)
+            )
+            for row in reversed(rows):
+                self._entries[row[0]] = row[1]
+            logger.info(f"♻️ Dedup store '{self.namespace}' restored {len(rows)} keys.")
+        except Exception as e:
+            logger.error(f"❌ Could not load dedup store '{self.namespace}': {e}")
+
+    # --- API ---
+    def expiry_for(self, start_time=None):
+        start = parse_start_time(start_time) if start_time else None
+        if start:
+            return max(start.timestamp() + AFTER_START_GRACE, time.time() + 60)
+        return time.time() + self.default_ttl
+
+    def seen(self, key):
+        with self._lock:
+            self._ensure_loaded()
+            exp = self._entries.get(key)
+            if exp is None:
+                return False
+            if exp < time.time():
+                del self._entries[key]
+                return False
+            return True
+
+    def _record(self, key, expires_at):
+        # In memory only, caller holds the lock. Returns True when a purge is due
+        self._entries.pop(key, None)
+        self._entries[key] = expires_at
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._adds += 1
+        if self._adds % PURGE_EVERY:
+            return False
+        now = time.time()
+        for k in [k for k, exp in self._entries.items() if exp < now]:
+            del self._entries[k]
+        return True
+
+    def _persist(self, key, expires_at, purge):
+        # SQLite writes happen outside the lock: other workers keep checking keys meanwhile
+        if not self.persist:
+            return
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO seen_bets (namespace, key, expires_at) VALUES (?, ?, ?)",
+                (self.namespace, key, expires_at)
+            )
+            if purge:
+                db.execute("DELETE FROM seen_bets WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time()))
+        except Exception as e:
+            logger.error(f"❌ Could not persist dedup key: {e}")
+
+    def add(self, key, start_time=None):
+        expires_at = self.expiry_for(start_time)
+        with self._lock:
+            self._ensure_loaded()
+            purge = self._record(key, expires_at)
+        self._persist(key, expires_at, purge)
+
+    def check_and_add(self, key, start_time=None):
+        """
+        True if the key is new (and records it), False if it is a duplicate.
+        Atomic, so several scraper workers can share one store.
+        """
+        expires_at = self.expiry_for(start_time)
+        with self._lock:
+            if self.seen(key):
+                return False
+            purge = self._record(key, expires_at)
+        self._persist(key, expires_at, purge)
+        return True
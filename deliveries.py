@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# --- Alert delivery checkpoints ---
+# deliveries holds one row per (surebet, user). The bot plans a bet by writing
+# its rows as 'pending' in the same transaction that advances
+# last_processed_id, and flips each row to 'sent' / 'failed' once the
+# dispatcher is done with it. After a crash, the pending rows are exactly the
+# alerts still owed (at-least-once), and the primary key keeps a (user, bet)
+# pair from ever being planned twice.
+#
+# Outcomes (status, sent_at, latency_ms, Telegram message_id) go through
+# DeliveryLog: buffered in memory and written with one executemany per flush
+# on the DB executor, so a send never waits on SQLite. A crash loses at most
+# one flush interval of outcomes; those rows stay pending and are re-sent.
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+EXPIRED = "expired"
+
+FLUSH_INTERVAL = 0.5  # Seconds between two writes of the outcome buffer
+FLUSH_BATCH = 500     # Outcomes that trigger an early write
+
+
+def plan(conn, surebet_id, user_ids):
+    """
+    Records the recipients of a bet and returns the ones still pending
+    (new rows, or rows left pending by a previous run). Runs on the caller's
+    transaction.
+    """
+    conn.executemany(
+        "INSERT OR IGNORE INTO deliveries (surebet_id, user_id) VALUES (?, ?)",
+        [(surebet_id, uid) for uid in user_ids]
+    )
+    rows = conn.execute(
+        "SELECT user_id FROM deliveries WHERE surebet_id = ? AND status = 'pending'",
+        (surebet_id,)
+    )
+    return [row[0] for row in rows]
+
+
+def fail_pending(conn, surebet_id):
+    """
+    Gives up on the still pending deliveries of a bet that could not be
+    alerted, so a restart does not resume it. Runs on the caller's transaction.
+    """
+    conn.execute("UPDATE deliveries SET status = 'failed' WHERE surebet_id = ? AND status = 'pending'", (surebet_id,))
+
+
+def write_outcomes(rows):
+    """
+    rows: [(status, sent_at, latency_ms, message_id, surebet_id, user_id)], one commit.
+    """
+    db.executemany(
+        "UPDATE deliveries SET status = ?, sent_at = ?, latency_ms = ?, message_id = ? WHERE surebet_id = ? AND user_id = ?",
+        rows
+    )
+
+
+def pending():
+    """
+    {surebet_id: [user_id]} of the unconfirmed deliveries, oldest bet first.
+    """
+    out = {}
+    rows = db.fetchall("SELECT surebet_id, user_id FROM deliveries WHERE status = 'pending' ORDER BY surebet_id")
+    for row in rows:
+        out.setdefault(row[0], []).append(row[1])
+    return out
+
+
+def expire_stale(max_age):
+    """
+    Gives up on the pending deliveries of bets found more than `max_age`
+    seconds ago (not worth sending after a long outage). Returns how many.
+    """
+    cur = db.execute(
+        '''UPDATE deliveries SET status = 'expired'
+           WHERE status = 'pending'
+             AND EXISTS (SELECT 1 FROM surebets s
+                         WHERE s.id = deliveries.surebet_id AND s.found_at < datetime('now', ?))''',
+        (f"-{int(max_age)} seconds",)
+    )
+    return cur.rowcount
+
+
+def pending_count():
+    return db.fetchone("SELECT COUNT(*) FROM deliveries WHERE status = 'pending'")[0]
+
+
+def lookup(user_id, surebet_id):
+    """
+    The delivery row of one (user, bet) pair, or None if it was never planned.
+    """
+    return db.fetchone(
+        "SELECT status, queued_at, sent_at, latency_ms, message_id FROM deliveries WHERE surebet_id = ? AND user_id = ?",
+        (surebet_id, user_id)
+    )
+
+
+def for_user(user_id, limit=10):
+    return db.fetchall(
+        '''SELECT surebet_id, status, sent_at, latency_ms, message_id FROM deliveries
+           WHERE user_id = ? ORDER BY surebet_id DESC LIMIT ?''',
+        (user_id, limit)
+    )
+
+
+def summary(hours=24):
+    """
+    {status: (count, avg latency ms, max latency ms)} for the bets found in the
+    last `hours`. Ranges on the primary key instead of scanning the log.
+    """
+    rows = db.fetchall(
+        '''SELECT status, COUNT(*), AVG(latency_ms), MAX(latency_ms) FROM deliveries
+           WHERE surebet_id >= (SELECT COALESCE(MIN(id), 1 << 62) FROM surebets WHERE found_at >= datetime('now', ?))
+           GROUP BY status''',
+        (f"-{int(hours)} hours",)
+    )
+    return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+
+class DeliveryLog:
+    """
+    Async, batched writer of delivery outcomes. record() only appends to a
+    buffer; a background task flushes it every FLUSH_INTERVAL (or as soon as
+    FLUSH_BATCH outcomes are waiting).
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, batch=FLUSH_BATCH):
+        self.flush_interval = flush_interval
+        self.batch = batch
+        self._buffer = []
+        self._wake = asyncio.Event()
+        self._task = None
+        self.written = 0
+        self.flushes = 0
+
+    def __len__(self):
+        return len(self._buffer)
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    # --- API ---
+    def record(self, surebet_id, user_id, status, latency_ms=None, message_id=None):
+        sent_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")  # Same format as CURRENT_TIMESTAMP
+        self._buffer.append((status, sent_at, latency_ms, message_id, surebet_id, user_id))
+        if len(self._buffer) >= self.batch:
+            self._wake.set()
+
+    async def flush(self):
+        rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        try:
+            await db.run(write_outcomes, rows)
+        except Exception:
+            self._buffer[:0] = rows  # Keep them for the next flush
+            raise
+        self.written += len(rows)
+        self.flushes += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Could not write {len(self._buffer)} delivery outcomes: {e}")
@@ -1,12 +1,26 @@
 import logging
 import asyncio
-import sqlite3
 import os
 import json
+import sqlite3
+import database as db
+import migrations
+import deliveries
 from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ForceReply
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
 from dotenv import load_dotenv
+from subscriber_index import SubscriberIndex
+from bet_bus import BET_BUS
+from telegram_dispatcher import AlertDispatcher
+from dedup_store import DedupStore, make_key
+from latency import LATENCY, trace_from_found_at
+import arbitrage
+from odds_validator import ODDS_BOOK, should_drop, warning_line
+from canonical import surebet_key
+from sport_classifier import KNOWN_SPORTS, SPORTS_STRUCTURE, SPORT_EMOJIS, bet_sport, sport_emoji
+from bookie_registry import KNOWN_BOOKIES, legs_mask, user_mask
+from metrics import REGISTRY, ALERTS_SENT, ALERTS_FAILED
 
 # Load environment variables
 load_dotenv()
@@ -20,192 +34,76 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Config
-DB_NAME = os.path.abspath("surebets.db")
 CHECK_INTERVAL = 5 # Seconds to check for new bets
 
-# List of known bookmakers to filter (from User request)
-KNOWN_BOOKIES = [
-    "888sport", "Gran Madrid", "JOKERBET", "Pastón", 
-    "Bet777", "betsson", "Casino Gran Via", "eBingo", 
-    "PokerStars", "betfair exchange", "bwin", "Codere", 
-    "Marca Apuestas", "Casumo", "LeoVegas", "paf", 
-    "SpeedyBet", "YoSports", "Aupabet", "Juegging", 
-    "KIROLBET", "Marathonbet", "Sportium", "Versus", 
-    "TonyBet", "Casino Barcelona", "Winamax", "bet365", 
-    "betfair", "Betway", "efbet", "interwetten", 
-    "Luckia", "William Hill"
-]
-
-# Sports Configuration
-KNOWN_SPORTS = {
-    "Soccer": ["soccer", "football", "fútbol", "laliga", "premier", "serie a", "bundesliga", "ligue 1", "uefa", "champions", "europa"],
-    "Basketball": ["basketball", "baloncesto", "nba", "ncaa", "euroleague", "acb"],
-    "Tennis": ["tennis", "tenis", "atp", "wta", "itf", "davis", "open"],
-    "Baseball": ["baseball", "mlb"],
-    "American Football": ["american football", "nfl", "super bowl"],
-    "Ice Hockey": ["ice hockey", "hockey", "nhl"],
-    "Rugby": ["rugby", "union", "league", "six nations"],
-    "Cricket": ["cricket", "ipl", "test"],
-    "MMA": ["mma", "ufc", "bellator"],
-    "Boxing": ["boxing", "boxeo"],
-    "Darts": ["darts", "dardos"],
-    "e-Sports": ["esport", "e-sport", "lol", "dota", "cs:go", "valorant"],
-    "Badminton": ["badminton"],
-    "Netball": ["netball"],
-    "Futsal": ["futsal"],
-    "Snooker": ["snooker"],
-    "Table Tennis": ["table tennis", "ping pong"],
-    "Volleyball": ["volleyball", "voleibol"],
-    "Handball": ["handball", "balonmano"],
-    "Floorball": ["floorball"],
-    "Waterpolo": ["waterpolo"]
-}
-
-SPORT_EMOJIS = {
-    "Soccer": "⚽", "Basketball": "🏀", "Tennis": "🎾", "Baseball": "⚾",
-    "American Football": "🏈", "Ice Hockey": "🏒", "Rugby": "🏉", "Cricket": "🏏",
-    "MMA": "🤼", "Boxing": "🥊", "Darts": "🎯", "e-Sports": "🎮",
-    "Badminton": "🏸", "Netball": "🏐", "Futsal": "⚽", "Snooker": "🎱",
-    "Table Tennis": "🏓", "Volleyball": "🏐", "Handball": "🤾", "Floorball": "🏑", "Waterpolo": "🤽"
-}
-
-# Sports Configuration
-KNOWN_SPORTS = {
-    "Soccer": ["soccer", "football", "fútbol", "laliga", "premier", "serie a", "bundesliga", "ligue 1", "uefa", "champions", "europa"],
-    "Basketball": ["basketball", "baloncesto", "nba", "ncaa", "euroleague", "acb"],
-    "Tennis": ["tennis", "tenis", "atp", "wta", "itf", "davis", "open"],
-    "Baseball": ["baseball", "mlb"],
-    "American Football": ["american football", "nfl", "super bowl"],
-    "Ice Hockey": ["ice hockey", "hockey", "nhl"],
-    "Rugby": ["rugby", "union", "league", "six nations"],
-    "Cricket": ["cricket", "ipl", "test"],
-    "MMA": ["mma", "ufc", "bellator"],
-    "Boxing": ["boxing", "boxeo"],
-    "Darts": ["darts", "dardos"],
-    "e-Sports": ["esport", "e-sport", "lol", "dota", "cs:go", "valorant"],
-    "Badminton": ["badminton"],
-    "Netball": ["netball"],
-    "Futsal": ["futsal"],
-    "Snooker": ["snooker"],
-    "Table Tennis": ["table tennis", "ping pong"],
-    "Volleyball": ["volleyball", "voleibol"],
-    "Handball": ["handball", "balonmano"],
-    "Floorball": ["floorball"],
-    "Waterpolo": ["waterpolo"]
-}
-
-SPORT_EMOJIS = {
-    "Soccer": "⚽", "Basketball": "🏀", "Tennis": "🎾", "Baseball": "⚾",
-    "American Football": "🏈", "Ice Hockey": "🏒", "Rugby": "🏉", "Cricket": "🏏",
-    "MMA": "🤼", "Boxing": "🥊", "Darts": "🎯", "e-Sports": "🎮",
-    "Badminton": "🏸", "Netball": "🏐", "Futsal": "⚽", "Snooker": "🎱",
-    "Table Tennis": "🏓", "Volleyball": "🏐", "Handball": "🤾", "Floorball": "🏑", "Waterpolo": "🤽"
-}
-
-SPORTS_STRUCTURE = {
-    "Soccer": [
-        "Premier League", "La Liga", "Serie A", "Bundesliga", "Ligue 1", 
-        "UEFA Champions League", "UEFA Europa League", "UEFA Conference League", "UEFA Nations League",
-        "MLS", "Eredivisie", "Primeira Liga", "Copa del Rey", "FA Cup", "EFL Cup", 
-        "DFB-Pokal", "Coppa Italia", "Coupe de France", "Copa Libertadores", "Copa Sudamericana", 
-        "Liga MX", "Jupiler Pro League", "World Cup", "Friendlies", "Others"
-    ],
-    "Basketball": [
-        "NBA", "WNBA", "NCAA", "WNCAA", "EuroLeague", "EuroBasket", "EuroCup", 
-        "ACB", "CBA", "NBL", "LNB Pro B", "Others"
-    ],
-    "Tennis": [
-        "ATP", "WTA", "ITF", "ITF Women", "US Open", "Wimbledon", "Roland Garros", 
-        "Australian Open", "Six Kings Slam", "Davis Cup", "Billie Jean King Cup", "Challenger", "Others"
-    ],
-    "Baseball": [
-        "MLB", "NPB", "KBO", "AAA", "CPBL", "LMB", "NCAA", "MiLB", "Double-A", "Triple-A", "Others"
-    ],
-    "American Football": ["NFL", "NCAA", "CFL", "XFL", "USFL", "Others"],
-    "Ice Hockey": ["NHL", "KHL", "SHL", "AHL", "Others"],
-    "Rugby": ["Top 14", "Super League", "NRL", "World Cup", "Others"],
-    "Cricket": ["IPL", "BBL", "CPL", "The Hundred", "PSL", "Test Matches", "ODI", "T20I", "Others"],
-    "MMA": ["UFC", "Bellator", "PFL", "ONE Championship", "KSW", "Others"]
-}
-
 # --- Database Management ---
 def init_bot_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA journal_mode=WAL;")
-    
-    # Create Table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER UNIQUE,
-            min_profit REAL DEFAULT 1.0,
-            bookies TEXT DEFAULT '[]',
-            sports TEXT DEFAULT '[]',
-            leagues TEXT DEFAULT '{}',
-            active INTEGER DEFAULT 1,
-            expiration_date TEXT DEFAULT NULL
-        )
-    ''')
-    
-    # Migrations (Ignored if column exists)
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN sports TEXT DEFAULT '[]'")
-        print("⚠️ Added 'sports' column to users table.")
-    except sqlite3.OperationalError:
-        pass
-        
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN expiration_date TEXT DEFAULT NULL")
-    except sqlite3.OperationalError:
-        pass
-        
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN leagues TEXT DEFAULT '{}'")
-        print("⚠️ Added 'leagues' column to users table.")
-    except sqlite3.OperationalError:
-        pass
+    # users, user_bets, bot_state... and their indexes are versioned in migrations.py
+    migrations.migrate()
+
+# --- Subscriber Index ---
+# Built once from the users table, then kept in sync by every helper that writes a user row.
+SUBSCRIBERS = SubscriberIndex()
+
+def _index_user_row(row):
+    if not row['active']:
+        SUBSCRIBERS.remove(row['user_id'])
+        return
+    bookies_mask = row['bookies_mask']
+    if bookies_mask is None:
+        bookies_mask = user_mask(get_user_bookies(row))
+    SUBSCRIBERS.upsert(
+        row['user_id'],
+        row['min_profit'],
+        bookies_mask,
+        get_user_sports(row),
+        get_user_leagues(row),
+        row['expiration_date']
+    )
+
+def load_subscriber_index():
+    rows = db.fetchall("SELECT * FROM users WHERE active = 1")
 
-    conn.commit()
-    conn.close()
+    SUBSCRIBERS.clear()
+    for row in rows:
+        _index_user_row(row)
+    logger.info(f"📇 Subscriber index built with {len(SUBSCRIBERS)} active users.")
+
+def refresh_subscriber(user_id):
+    row = get_user(user_id)
+    if row:
+        _index_user_row(row)
+    else:
+        SUBSCRIBERS.remove(user_id)
 
 def get_user(user_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-    row = cursor.fetchone()
-    conn.close()
-    return row
+    return db.fetchone("SELECT * FROM users WHERE user_id = ?", (user_id,))
 
 def register_user(user_id):
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
         # Default expiration None (Free/Inactive) unless we want a trial? 
         # Let's start with NO access until paid.
-        cursor.execute("INSERT OR IGNORE INTO users (user_id, expiration_date) VALUES (?, NULL)", (user_id,))
-        conn.commit()
+        cursor = db.execute("INSERT OR IGNORE INTO users (user_id, expiration_date) VALUES (?, NULL)", (user_id,))
+        inserted = cursor.rowcount > 0
     except Exception as e:
         print(f"ERROR in register_user: {e}")
-    finally:
-        try: conn.close()
-        except: pass
+        inserted = False
+    if inserted:
+        refresh_subscriber(user_id)
 
 def update_user_field(user_id, field, value):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(f"UPDATE users SET {field} = ? WHERE user_id = ?", (value, user_id))
-    conn.commit()
-    conn.close()
+    db.execute(f"UPDATE users SET {field} = ? WHERE user_id = ?", (value, user_id))
+    refresh_subscriber(user_id)
     
-def extend_subscription(user_id, days):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+def save_user_bookies(user_id, bookies):
+    # Names for the menus, mask for the fan-out (bookie_registry)
+    db.execute("UPDATE users SET bookies = ?, bookies_mask = ? WHERE user_id = ?",
+               (json.dumps(bookies), user_mask(bookies), user_id))
+    refresh_subscriber(user_id)
     
+def extend_subscription(user_id, days):
     # Check current expiration
-    cursor.execute("SELECT expiration_date FROM users WHERE user_id = ?", (user_id,))
-    row = cursor.fetchone()
+    row = db.fetchone("SELECT expiration_date FROM users WHERE user_id = ?", (user_id,))
     
     current_exp = None
     if row and row[0]:
@@ -223,9 +121,8 @@ def extend_subscription(user_id, days):
     new_exp = start_date + timedelta(days=days)
     new_exp_str = new_exp.strftime("%Y-%m-%d %H:%M:%S")
     
-    cursor.execute("UPDATE users SET expiration_date = ? WHERE user_id = ?", (new_exp_str, user_id))
-    conn.commit()
-    conn.close()
+    db.execute("UPDATE users SET expiration_date = ? WHERE user_id = ?", (new_exp_str, user_id))
+    refresh_subscriber(user_id)
     return new_exp_str
 
 def is_subscription_active(expiration_str):
@@ -264,18 +161,6 @@ def get_user_leagues(user_row):
     except:
         return {}
 
-def classify_sport(text):
-    text = text.lower()
-    for sport, keywords in KNOWN_SPORTS.items():
-        for kw in keywords:
-            if kw in text:
-                return sport
-    return "Other"
-    
-def get_sport_emoji(league_name):
-    sport = classify_sport(league_name)
-    return SPORT_EMOJIS.get(sport, "🏆")
-
 def build_sports_keyboard(selected_sports):
     keyboard = []
     # Controls
@@ -375,7 +260,7 @@ def build_bookie_keyboard(enabled_bookies):
 # --- Bot Commands ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    register_user(user.id)
+    await db.run(register_user, user.id)
     
     # Inline Menu
     keyboard = [
@@ -428,15 +313,15 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def set_profit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         val = float(context.args[0])
-        update_user_field(update.effective_user.id, "min_profit", val)
+        await db.run(update_user_field, update.effective_user.id, "min_profit", val)
         await update.message.reply_text(f"✅ Guardado: Mínimo {val}% profit.")
     except (IndexError, ValueError):
         await update.message.reply_text("❌ Ejemplo: `/profit 5`")
 
 async def cmd_bookies(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    register_user(user_id) # Ensure exists
-    row = get_user(user_id)
+    await db.run(register_user, user_id) # Ensure exists
+    row = await db.run(get_user, user_id)
     
     current_bookies = get_user_bookies(row)
     kb = build_bookie_keyboard(current_bookies)
@@ -445,8 +330,8 @@ async def cmd_bookies(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_sports(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    register_user(user_id)
-    row = get_user(user_id)
+    await db.run(register_user, user_id)
+    row = await db.run(get_user, user_id)
     current = get_user_sports(row)
     kb = build_sports_keyboard(current)
     try:
@@ -476,7 +361,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif data == "menu_bookies":
         # ... existing ...
         # (Shortened for brevity in tool call, just ensure existing logic remains)
-        row = get_user(user_id)
+        row = await db.run(get_user, user_id)
         current_bookies = get_user_bookies(row)
         kb = build_bookie_keyboard(current_bookies)
         try: await query.message.reply_text("🏦 Configura tus Casas de Apuestas:", reply_markup=kb)
@@ -484,7 +369,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
         
     elif data == "menu_sports":
-        row = get_user(user_id)
+        row = await db.run(get_user, user_id)
         current_sports = get_user_sports(row)
         kb = build_sports_keyboard(current_sports)
         try: await query.message.reply_text("🏆 Filtra tus Deportes:", reply_markup=kb)
@@ -506,7 +391,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # --- Bookie Toggles ---
     
-    row = get_user(user_id)
+    row = await db.run(get_user, user_id)
     current_bookies = get_user_bookies(row)
     
     new_bookies = list(current_bookies)
@@ -526,7 +411,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if bookie in new_bookies: new_bookies.remove(bookie)
             else: new_bookies.append(bookie)
         
-        update_user_field(user_id, "bookies", json.dumps(new_bookies))
+        await db.run(save_user_bookies, user_id, new_bookies)
         kb = build_bookie_keyboard(new_bookies)
         try: await query.edit_message_reply_markup(reply_markup=kb)
         except: pass
@@ -535,7 +420,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # --- Sports Toggles ---
     # Need to handle sports logic similarly
     elif "sport_" in data or data == "close_sports_menu":
-        row = get_user(user_id)
+        row = await db.run(get_user, user_id)
         current_sports = get_user_sports(row)
         # If empty, it means ALL. To toggle one OFF, we must first populate with ALL, then remove.
         if not current_sports: 
@@ -576,7 +461,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if len(new_sports) == len(KNOWN_SPORTS):
                 new_sports = []
                 
-        update_user_field(user_id, "sports", json.dumps(new_sports))
+        await db.run(update_user_field, user_id, "sports", json.dumps(new_sports))
         kb = build_sports_keyboard(new_sports)
         try: await query.edit_message_reply_markup(reply_markup=kb)
         except: pass
@@ -585,7 +470,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # --- League Menu & Toggles ---
     elif data.startswith("open_leagues_"):
         sport = data.replace("open_leagues_", "")
-        row = get_user(user_id)
+        row = await db.run(get_user, user_id)
         user_leagues = get_user_leagues(row) # Dict
         sport_leagues = user_leagues.get(sport, []) # List
         
@@ -606,7 +491,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Determine remaining parts for league name (might contain spaces)
         # e.g. league_toggle_Soccer_La Liga -> parts[0]=league, [1]=toggle, [2]=Soccer, [3:]="La Liga"
         
-        row = get_user(user_id)
+        row = await db.run(get_user, user_id)
         all_leagues_dict = get_user_leagues(row)
         current_list = all_leagues_dict.get(sport, [])
         
@@ -640,7 +525,7 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
              all_leagues_dict[sport] = current_list
              
-        update_user_field(user_id, "leagues", json.dumps(all_leagues_dict))
+        await db.run(update_user_field, user_id, "leagues", json.dumps(all_leagues_dict))
         
         # Refresh
         kb = build_leagues_keyboard(sport, current_list)
@@ -651,12 +536,8 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        
         # Total Bets
-        cursor.execute("SELECT COUNT(*), SUM(stake), SUM(real_profit) FROM user_bets WHERE user_id = ?", (user_id,))
-        res = cursor.fetchone()
+        res = await db.run(db.fetchone, "SELECT COUNT(*), SUM(stake), SUM(real_profit) FROM user_bets WHERE user_id = ?", (user_id,))
         count = res[0] if res[0] else 0
         volume = res[1] if res[1] else 0.0
         profit = res[2] if res[2] else 0.0
@@ -672,7 +553,6 @@ async def cmd_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"{emoji_p} **Beneficio Real:** `{profit:.2f}€`\n"
             f"⚡ ROI: `{roi:.2f}%`"
         )
-        conn.close()
         await update.message.reply_text(msg, parse_mode='Markdown')
     except Exception as e:
         await update.message.reply_text("❌ Error al calcular estadísticas.")
@@ -699,7 +579,7 @@ async def cmd_add_promo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         target_id = int(context.args[0])
         days = int(context.args[1])
         
-        new_date = extend_subscription(target_id, days)
+        new_date = await db.run(extend_subscription, target_id, days)
         
         await update.message.reply_text(f"✅ Usuario {target_id} renovado hasta: {new_date}")
         
@@ -712,8 +592,66 @@ async def cmd_add_promo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         await update.message.reply_text("❌ Uso: `/add <ID> <DIAS>`")
 
+async def cmd_dispatcher(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    admin_id = os.getenv("ADMIN_ID")
+    if admin_id and str(update.effective_user.id) != admin_id:
+        await update.message.reply_text("⛔ Comando solo para administradores.")
+        return
+    if not DISPATCHER:
+        await update.message.reply_text("❌ Dispatcher no iniciado.")
+        return
+
+    st = DISPATCHER.stats()
+    day = await db.run(deliveries.summary, 24)
+    sent_24h = day.get(deliveries.SENT, (0, None, None))
+    age = LATENCY.stats()['age'] # Scrape -> delivery (latency.py)
+    await update.message.reply_text(
+        f"📨 Dispatcher\n"
+        f"Cola: {st['queue_depth']} | Pendientes: {st['pending']} | Workers: {st['workers']}\n"
+        f"Enviados: {st['sent']} | Fallidos: {st['failed']} | Reintentos: {st['retried']}\n"
+        f"Latencia p50: {st['latency_p50']:.2f}s | p95: {st['latency_p95']:.2f}s | max: {st['latency_max']:.2f}s\n"
+        f"Entregas 24h: " + " | ".join(f"{s}: {v[0]}" for s, v in sorted(day.items())) + "\n"
+        f"Latencia media 24h: {(sent_24h[1] or 0) / 1000:.2f}s | Buffer log: {len(DELIVERY_LOG)}\n"
+        f"Edad al entregar p50: {age[0.5]:.2f}s | p95: {age[0.95]:.2f}s | p99: {age[0.99]:.2f}s"
+    )
+
+async def cmd_deliveries(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    admin_id = os.getenv("ADMIN_ID")
+    if admin_id and str(update.effective_user.id) != admin_id:
+        await update.message.reply_text("⛔ Comando solo para administradores.")
+        return
+    try:
+        # /entregas 123456 [bet_id]
+        target_id = int(context.args[0])
+        bet_id = int(context.args[1]) if len(context.args) > 1 else None
+    except (IndexError, ValueError):
+        await update.message.reply_text("❌ Uso: `/entregas <ID> [BET_ID]`")
+        return
+
+    if bet_id is not None:
+        row = await db.run(deliveries.lookup, target_id, bet_id)
+        if not row:
+            await update.message.reply_text(f"📭 La apuesta {bet_id} no se planificó para {target_id}.")
+            return
+        await update.message.reply_text(
+            f"📨 Apuesta {bet_id} → {target_id}\n"
+            f"Estado: {row['status']} | Enviada: {row['sent_at'] or '-'}\n"
+            f"Latencia: {row['latency_ms'] if row['latency_ms'] is not None else '-'} ms | Mensaje: {row['message_id'] or '-'}"
+        )
+        return
+
+    rows = await db.run(deliveries.for_user, target_id)
+    if not rows:
+        await update.message.reply_text(f"📭 Sin entregas para {target_id}.")
+        return
+    lines = [f"📨 Últimas entregas a {target_id}:"]
+    for r in rows:
+        lat = f"{r['latency_ms']} ms" if r['latency_ms'] is not None else "-"
+        lines.append(f"#{r['surebet_id']} {r['status']} {r['sent_at'] or ''} ({lat})")
+    await update.message.reply_text("\n".join(lines))
+
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    row = get_user(update.effective_user.id)
+    row = await db.run(get_user, update.effective_user.id)
     if row:
         min_p = row['min_profit']
         active = row['active']
@@ -752,26 +690,20 @@ async def handle_stake_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
         sb_id = context.user_data.pop("track_sb_id")
         
         # Get Profit % from DB
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT profit FROM surebets WHERE id = ?", (sb_id,))
-        res = cursor.fetchone()
+        res = await db.run(db.fetchone, "SELECT profit FROM surebets WHERE id = ?", (sb_id,))
         
         if not res:
             await update.message.reply_text("❌ Error: No encuentro esa apuesta (¿es muy antigua?).")
-            conn.close()
             return
             
         profit_percent = res[0]
         real_profit = stake * (profit_percent / 100)
         
         # Save to user_bets
-        cursor.execute("""
+        await db.run(db.execute, """
             INSERT INTO user_bets (user_id, surebet_id, profit_percent, stake, real_profit)
             VALUES (?, ?, ?, ?, ?)
         """, (update.effective_user.id, sb_id, profit_percent, stake, real_profit))
-        conn.commit()
-        conn.close()
         
         await update.message.reply_text(f"✅ Apuesta registrada.\nInversión: {stake}€\nBeneficio Estimado: +{real_profit:.2f}€")
         
@@ -779,181 +711,266 @@ async def handle_stake_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text("❌ Por favor, escribe un número válido (ej: 50).")
 
 # --- Background Worker ---
-async def check_new_bets(context: ContextTypes.DEFAULT_TYPE):
-    last_id = context.bot_data.get('last_processed_id', 0)
-    
-    # Init last_id from DB if 0 (start fresh)
-    if last_id == 0:
-        try:
-            conn = sqlite3.connect(DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("SELECT MAX(id) FROM surebets")
-            res = cursor.fetchone()
-            start_id = res[0] if res[0] else 0
-            conn.close()
-            context.bot_data['last_processed_id'] = start_id
-            return
-        except: return
+# One long-running dispatcher task reads new bets in id order and fans them out.
+# It wakes up on a bet pushed through the in-process bus (combined deployment)
+# or every CHECK_INTERVAL otherwise; SQLite stays the source of truth, so a
+# missed push is just read on the next pass. Each bet is checkpointed on its
+# own: its recipients are written to `deliveries` as pending in the same
+# transaction that advances last_processed_id, and every row is flipped to
+# sent / failed by the dispatcher. A restart resumes the pending rows and never
+# plans a (user, bet) pair twice. The loop stops reading bets while the
+# dispatcher backlog is above MAX_PENDING_SENDS.
+PUSH_MODE = False
+DISPATCHER = None # AlertDispatcher, created in post_init once the bot exists
+FALLBACK_CHECK_INTERVAL = 60 # Seconds between safety-net polls when bets are pushed
+BET_BATCH = 50 # Bets read per pass while catching up
+MAX_PENDING_SENDS = 2000 # Dispatcher backlog above which no new bets are read
+RESUME_MAX_AGE = 30 * 60 # Seconds; older unconfirmed alerts are not re-sent after a restart
+ALERTED_BETS = DedupStore("alerts", persist=True) # Same store as the scraper, own namespace
+DELIVERY_LOG = deliveries.DeliveryLog() # Batched writer of delivery outcomes
+REGISTRY.gauge("dispatcher_queue_depth", "Alerts waiting in the filter bot dispatcher.", fn=lambda: DISPATCHER.queue_depth())
 
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get NEW bets
-        cursor.execute("SELECT * FROM surebets WHERE id > ? ORDER BY id ASC", (last_id,))
-        new_bets = cursor.fetchall()
-        
-        # Get Active Users
-        cursor.execute("SELECT * FROM users WHERE active = 1")
-        users = cursor.fetchall()
-        
-        conn.close()
-        
-        if not new_bets: return
+def load_last_processed_id():
+    row = db.fetchone("SELECT value FROM bot_state WHERE key = 'last_processed_id'")
+    if row:
+        return int(row[0])
+    # First run ever: start fresh instead of replaying the whole history
+    res = db.fetchone("SELECT MAX(id) FROM surebets")
+    return res[0] if res and res[0] else 0
 
-        logger.info(f"🔍 Found {len(new_bets)} NEW bets (IDs: {[b['id'] for b in new_bets]}) > Last ID {last_id}")
-        
-        if not users:
-            logger.warning("⚠️ No active users found in DB!")
-            context.bot_data['last_processed_id'] = new_bets[-1]['id'] # Skip them anyway
-            return
-            
-        logger.info(f"Checking {len(new_bets)} bets against {len(users)} users...")
-        
-        
-        for bet in new_bets:
-            profit = bet['profit']
-            bet_bookies_json = bet['bookies_json'] 
-            
-            # Parse bet bookies names
-            try:
-                bet_bookies_data = json.loads(bet_bookies_json)
-                bet_bookie_names = [b['bookie'] for b in bet_bookies_data]
-            except:
-                bet_bookie_names = []
-            
-            # Format message (Standard Style)
-            emoji = get_sport_emoji(bet['league'])
-            
-            lines = []
-            lines.append("🏹 ALERTA DE SUREBETS (SIN RIESGO)")
-            lines.append("")
-            lines.append(f"1️⃣ 🔥 -- ROBINSURESHOOD PREMIUM -- 🔥")
-            lines.append(f"📈 PROFIT: {profit}%")
-            lines.append("")
-            lines.append(f"{emoji} Liga: {bet['league']}")
-            lines.append(f"📆 Fecha: {bet['found_at']}") # or start_time if available in DB... wait DB has found_at, start_time is inside...
-            # Actually DB schema: id, found_at, event, league, profit, bookies_json
-            # We don't have start_time in DB explicitly? 
-            # Wait, let me check init_db in scraper.
-            # Scraper init_db: event, league, profit, bookies_json. 
-            # It seems start_time was NOT saved to DB! 
-            # I will use found_at as a proxy or just omit date if strictly following format.
-            # But the user wants "Same format".
-            # Let's use found_at for now.
-            lines.append(f"🏆 Partido: {bet['event']}")
+def save_last_processed_id(bet_id, conn=None):
+    sql = "INSERT OR REPLACE INTO bot_state (key, value) VALUES ('last_processed_id', ?)"
+    if conn is None:
+        db.execute(sql, (str(bet_id),))
+    else:
+        conn.execute(sql, (str(bet_id),))
+
+def fetch_bets_after(last_id, limit=None):
+    # Bets plus their legs (surebet_legs JOIN bookies) in two range queries, no JSON decoding
+    sql = "SELECT * FROM surebets WHERE id > ? ORDER BY id ASC" + (" LIMIT ?" if limit else "")
+    bets = [dict(row) for row in db.fetchall(sql, (last_id, limit) if limit else (last_id,))]
+    if bets:
+        legs = migrations.fetch_legs(db.get_connection(), bets[0]['id'], bets[-1]['id'])
+        for bet in bets:
+            bet['legs'] = legs.get(bet['id'], [])
+    return bets
+
+def fetch_bets_by_id(ids):
+    ids = sorted(ids)
+    if not ids:
+        return {}
+    bets = {row['id']: dict(row) for row in db.fetchall(
+        f"SELECT * FROM surebets WHERE id IN ({','.join('?' * len(ids))})", ids)}
+    legs = migrations.fetch_legs(db.get_connection(), ids[0], ids[-1])
+    for bet_id, bet in bets.items():
+        bet['legs'] = legs.get(bet_id, [])
+    return bets
+
+def skip_bet(bet_id):
+    # A bet that could not be alerted: its planned deliveries fail, the checkpoint moves past it
+    with db.transaction() as conn:
+        deliveries.fail_pending(conn, bet_id)
+        save_last_processed_id(bet_id, conn)
+
+def plan_deliveries(bet_id, user_ids):
+    # Recipients + checkpoint in one commit. Returns the users still owed this bet.
+    with db.transaction() as conn:
+        pending = deliveries.plan(conn, bet_id, user_ids)
+        save_last_processed_id(bet_id, conn)
+    return pending
+
+def render_alert(bet, branding="ROBINSURESHOOD"):
+    # Format message (Standard Style)
+    emoji = sport_emoji(bet_sport(bet))
+    legs = bet['legs']
+    arb = bet.get('arb') or arbitrage.evaluate_bets([bet], legs_key='legs')[0]
+    warning = warning_line(bet['verdict']) if bet.get('verdict') else ""
+    
+    lines = []
+    if warning:
+        lines.append(warning)
+        lines.append("")
+    lines.append("🏹 ALERTA DE SUREBETS (SIN RIESGO)")
+    lines.append("")
+    lines.append(f"1️⃣ 🔥 -- {branding} PREMIUM -- 🔥")
+    lines.append(f"📈 PROFIT: {arbitrage.profit_label(bet['profit'], arb)}")
+    lines.append("")
+    lines.append(f"{emoji} Liga: {bet['league']}")
+    lines.append(f"📆 Fecha: {bet['start_time'] or bet['found_at']}") # found_at for rows stored before start_time existed
+    lines.append(f"🏆 Partido: {bet['event']}")
+    lines.append("")
+    
+    # Reconstruct bookies loop
+    for i, b in enumerate(legs):
+        lines.append(f"🏦 Casa {i+1}: {b.get('bookie', 'Unknown')}")
+        lines.append(f"   🎯 Mercado: {b.get('market', '-')}")
+        lines.append(f"   📊 Cuota: {b.get('odds', '-')}")
+        if arb['profit'] is not None:
+            lines.append(f"   💰 Stake: {arb['stakes'][i]:g}€ ({arb['stake_pct'][i]:.2f}%)")
+        if i < len(legs) - 1:
             lines.append("")
-            
-            # Reconstruct bookies loop
-            # bookies_json is list of dicts: market, bookie, odds
-            try:
-                b_data = json.loads(bet_bookies_json)
-                for i, b in enumerate(b_data):
-                    lines.append(f"🏦 Casa {i+1}: {b.get('bookie', 'Unknown')}")
-                    lines.append(f"   🎯 Mercado: {b.get('market', '-')}")
-                    lines.append(f"   📊 Cuota: {b.get('odds', '-')}")
-                    if i < len(b_data) - 1:
-                        lines.append("")
-            except:
-                pass
-            
-            msg = "\n".join(lines)
-            
-            for user in users:
-                user_id = user['user_id']
-                user_min_profit = user['min_profit']
-                user_bookies = get_user_bookies(user)
-                expiration = user['expiration_date']
-
-                # Check 0: Subscription Active? (Monetization)
-                # If expiration is None or in the past -> SKIP
-                if not is_subscription_active(expiration):
-                    continue
-
-                # Check 0: Subscription Active?
-                if not is_subscription_active(expiration):
-                    continue
-
-                # Check 1: Profit
-                if profit < user_min_profit:
-                    continue
-                    
-                # Check 2: Sports
-                # Classify bet
-                bet_sport = classify_sport(bet['league'] + " " + bet['event'])
-                user_sports = get_user_sports(user)
-                
-                # If user_sports is empty -> ALL allowed
-                # If user_sports has "__NONE__" -> NONE allowed (skip)
-                if user_sports and "__NONE__" in user_sports:
-                    continue
-                
-                if user_sports and bet_sport not in user_sports:
-                     # Filter blocked!
-                     # logger.info(f"User {user_id} filtered out sport {bet_sport}")
-                     continue
-                
-                # Check 2.5: Leagues (Granular)
-                user_leagues_dict = get_user_leagues(user)
-                allowed_leagues = user_leagues_dict.get(bet_sport, [])
-                
-                if allowed_leagues:
-                    if "__NONE__" in allowed_leagues:
-                        continue
-                        
-                    found_league = False
-                    for allowed in allowed_leagues:
-                        if allowed.lower() in bet['league'].lower() or bet['league'].lower() in allowed.lower():
-                            found_league = True
-                            break
-                    
-                    if not found_league:
-                        continue
-                     
-                # Check 3: Bookies
-                has_all_bookies = True
-                for required_bookie in bet_bookie_names:
-                    found = False
-                    for allowed in user_bookies:
-                        if allowed.lower() in required_bookie.lower() or required_bookie.lower() in allowed.lower():
-                            found = True
-                            break
-                    if not found:
-                        has_all_bookies = False
-                        break
-                
-                # Debug logging
-                # logger.info(f"Checking user {user_id}: Sub={is_subscription_active(expiration)}, Profit={profit}>={user_min_profit}, Bookies={has_all_bookies}")
-                
-                if has_all_bookies:
-                    try:
-                        await context.bot.send_message(chat_id=user_id, text=msg, protect_content=True)
-                        await asyncio.sleep(0.05)
-                    except Exception as e:
-                        logger.warning(f"Failed to send to {user_id}: {e}")
+    
+    return "\n".join(lines)
+
+def bet_trace(bet):
+    # Stage timestamps pushed with the bet, or just its commit time when read back from SQLite
+    if not bet.get('trace'):
+        bet['trace'] = trace_from_found_at(bet.get('found_at'))
+    return bet['trace']
 
+def validate_bet(bet):
+    # Re-prices the legs with odds seen after the bet was scraped (odds_validator)
+    trace = bet_trace(bet)
+    bet['verdict'] = ODDS_BOOK.validate(bet['event'], bet['legs'], min(trace.values()) if trace else None)
+    return bet['verdict']
+
+def submit_alert(bet, user_ids):
+    # Built once per bet, shared by every recipient
+    msg = render_alert(bet)
+    trace = LATENCY.stamp(bet_trace(bet), 'rendered')
+    # Hand off to the rate-limited dispatcher (best profit goes out first)
+    for user_id in user_ids:
+        DISPATCHER.submit(user_id, msg, priority=bet['profit'], key=(user_id, bet['id']), context=trace, protect_content=True)
+
+async def queue_bet_alerts(bet):
+    profit = bet['profit']
+    LATENCY.stamp(bet_trace(bet), 'picked')
+    
+    # Legs come from surebet_legs (DB replay) or straight from the scraper (bus): [{market, bookie, odds}]
+    bet_bookies_data = bet['legs']
+    # Bookie ids mapped at ingest (surebets.bookies_mask), from the legs for pushed / older rows
+    bookies_mask = bet.get('bookies_mask')
+    if bookies_mask is None:
+        bookies_mask = legs_mask(bet_bookies_data)
+    
+    # The edge may be gone already (odds moved since the scrape): not worth a fan-out
+    if should_drop(validate_bet(bet)):
+        logger.info(f"💀 Bet {bet['id']} no longer profitable at current odds, not alerted.")
+        await db.run(save_last_processed_id, bet['id'])
+        return
+    
+    # The same surebet stored twice (scraper restart, several scraper workers, other
+    # spellings of the match or market) is alerted once: canonical.surebet_key.
+    # Moved odds make a new key, the surebet is alerted again at its new prices.
+    # Recorded only after the bet is planned, so a crash in between can't lose it.
+    alert_key = make_key(surebet_key(bet['event'], bet_bookies_data))
+    if await db.run(ALERTED_BETS.seen, alert_key):
+        logger.info(f"♻️ Bet {bet['id']} already alerted, skipping.")
+        await db.run(save_last_processed_id, bet['id'])
+        return
+    
+    # Resolve recipients through the index (sports, leagues, bookies, profit, subscription)
+    # Sport classified once at ingest (surebets.sport)
+    recipients = SUBSCRIBERS.match(profit, bet_sport(bet), bet['league'], bookies_mask)
+    
+    pending = await db.run(plan_deliveries, bet['id'], recipients)
+    await db.run(ALERTED_BETS.add, alert_key)
+    submit_alert(bet, pending)
+
+async def dispatch_bets(bot_data, bets):
+    # Bets must be ordered by id
+    last_id = bot_data.get('last_processed_id', 0)
+    bets = [b for b in bets if b['id'] > last_id]
+    if not bets: return
+
+    logger.info(f"🔍 Found {len(bets)} NEW bets (IDs: {[b['id'] for b in bets]}) > Last ID {last_id}")
+    if not len(SUBSCRIBERS):
+        logger.warning("⚠️ No active users found in DB!") # Planned anyway, nobody to send to
+
+    # Verified profit and stakes of the whole batch in one NumPy pass, used by render_alert
+    try:
+        arbitrage.annotate(bets, legs_key='legs')
     except Exception as e:
-        logger.error(f"Worker Error: {e}")
+        logger.error(f"❌ Batch evaluation failed, bets evaluated one by one: {e}")
+    for bet in bets:
+        try:
+            await queue_bet_alerts(bet)
+        except (asyncio.CancelledError, sqlite3.OperationalError):
+            raise # Shutdown / DB busy: the loop retries the batch from the checkpoint
+        except Exception as e:
+            # One malformed bet must not stall every later alert behind it
+            logger.exception(f"❌ Bet {bet['id']} could not be alerted, skipped: {e}")
+            await db.run(skip_bet, bet['id'])
+        bot_data['last_processed_id'] = bet['id']
+        # Back-pressure: a burst waits in SQLite, not in the dispatcher queue
+        await DISPATCHER.wait_for_room(MAX_PENDING_SENDS)
+
+async def resume_deliveries():
+    # Alerts planned by a previous run and never confirmed (crash / restart mid fan-out)
+    expired = await db.run(deliveries.expire_stale, RESUME_MAX_AGE)
+    if expired:
+        logger.warning(f"⌛ {expired} unconfirmed alerts older than {RESUME_MAX_AGE // 60} min dropped.")
+    owed = await db.run(deliveries.pending)
+    if not owed:
+        return
+    bets = await db.run(fetch_bets_by_id, list(owed))
+    for bet_id, user_ids in owed.items():
+        if bet_id not in bets:
+            continue
+        if should_drop(validate_bet(bets[bet_id])):
+            for user_id in user_ids:
+                DELIVERY_LOG.record(bet_id, user_id, deliveries.EXPIRED)
+            continue
+        submit_alert(bets[bet_id], user_ids)
+    logger.info(f"♻️ Resuming {sum(len(u) for u in owed.values())} unconfirmed alerts of {len(owed)} bets.")
 
-def format_bookies(json_str):
+async def record_delivery(job, ok):
+    # AlertDispatcher.on_result: checkpoint one (user, bet) delivery. Buffered, never waits on SQLite.
+    if job['key'] is None:
+        return
+    user_id, bet_id = job['key']
+    if ok:
+        DELIVERY_LOG.record(bet_id, user_id, deliveries.SENT, round(job['latency'] * 1000), job['message_id'])
+        LATENCY.delivered(job['context'])
+        ALERTS_SENT.inc(destination="filter_bot")
+    else:
+        DELIVERY_LOG.record(bet_id, user_id, deliveries.FAILED)
+        ALERTS_FAILED.inc(destination="filter_bot")
+
+async def wait_for_pushed_bets(timeout):
+    # Next wake-up of the dispatcher loop: bets pushed meanwhile, or [] on timeout
+    if not PUSH_MODE:
+        await asyncio.sleep(timeout)
+        return []
     try:
-        data = json.loads(json_str)
-        # Included Market info as requested
-        # Format: "Bookie (Market) @ Odd"
-        return "\n".join([f"🏦 {b['bookie']} ({b['market']}) ➡️ @{b['odds']}" for b in data])
-    except:
-        return ""
+        first = await asyncio.wait_for(BET_BUS.get(), timeout)
+    except asyncio.TimeoutError:
+        return []
+    return [first] + BET_BUS.drain()
+
+async def bet_dispatcher_loop(application):
+    bot_data = application.bot_data
+    interval = FALLBACK_CHECK_INTERVAL if PUSH_MODE else CHECK_INTERVAL
+    try:
+        await resume_deliveries()
+    except Exception as e:
+        logger.error(f"Could not resume pending alerts: {e}")
+
+    pushed = []
+    while True:
+        try:
+            await DISPATCHER.wait_for_room(MAX_PENDING_SENDS)
+            last_id = bot_data.get('last_processed_id', 0)
+            pushed = sorted((b for b in pushed if b['id'] > last_id), key=lambda b: b['id'])
+            if pushed and [b['id'] for b in pushed] == list(range(last_id + 1, last_id + 1 + len(pushed))):
+                bets = pushed # Pushed right after the commit, nothing missed: no DB read
+            else:
+                # Poll, or a gap (bus overflow, bets saved before the bus was attached): read the DB log
+                bets = await db.run(fetch_bets_after, last_id, BET_BATCH)
+            await dispatch_bets(bot_data, bets)
+            if len(bets) >= BET_BATCH:
+                pushed = []
+                continue # Still catching up: next batch straight away
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Dispatcher Loop Error: {e}")
+        pushed = await wait_for_pushed_bets(interval)
+
+def format_bookies(legs):
+    # Included Market info as requested
+    # Format: "Bookie (Market) @ Odd"
+    return "\n".join([f"🏦 {b['bookie']} ({b['market']}) ➡️ @{b['odds']}" for b in legs])
 
 
 
@@ -971,14 +988,31 @@ async def post_init(application):
     ]
     await application.bot.set_my_commands(commands)
 
+    global DISPATCHER
+    DISPATCHER = AlertDispatcher(application.bot, on_result=record_delivery)
+    DISPATCHER.start()
+    DELIVERY_LOG.start()
+
+    # Resume from the last bet we fanned out; the first pass replays anything newer
+    application.bot_data['last_processed_id'] = await db.run(load_last_processed_id)
+    if PUSH_MODE:
+        BET_BUS.attach()
+    application.create_task(bet_dispatcher_loop(application))
+
+async def post_shutdown(application):
+    if DISPATCHER:
+        await DISPATCHER.stop()
+    await DELIVERY_LOG.stop() # Last flush of the outcomes
+
 if __name__ == '__main__':
     if not TOKEN:
         print("❌ Error: FILTER_BOT_TOKEN not found in .env")
         exit(1)
         
     init_bot_db()
+    load_subscriber_index()
     
-    app = ApplicationBuilder().token(TOKEN).post_init(post_init).build()
+    app = ApplicationBuilder().token(TOKEN).post_init(post_init).post_shutdown(post_shutdown).build()
     
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("profit", set_profit))
@@ -988,30 +1022,33 @@ if __name__ == '__main__':
     app.add_handler(CommandHandler("stats", cmd_stats))
     app.add_handler(CommandHandler("id", cmd_id))
     app.add_handler(CommandHandler("add", cmd_add_promo)) # Admin Command
+    app.add_handler(CommandHandler("dispatcher", cmd_dispatcher)) # Admin Command
+    app.add_handler(CommandHandler("entregas", cmd_deliveries)) # Admin Command
     app.add_handler(CommandHandler("ayuda", cmd_help))
     app.add_handler(CommandHandler("help", cmd_help))
     
     app.add_handler(CallbackQueryHandler(handle_callback))
     app.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_stake_input))
     
-    job_queue = app.job_queue
-    job_queue.run_repeating(check_new_bets, interval=CHECK_INTERVAL, first=1)
-    
     print("🤖 Bot Iniciado y Esperando...")
     app.run_polling()
     
-def run_bot():
+def run_bot(push_mode=False):
+    global PUSH_MODE
+    PUSH_MODE = push_mode
+
     if not TOKEN:
         print("❌ Error: FILTER_BOT_TOKEN not found in .env")
         return
         
     init_bot_db()
+    load_subscriber_index()
     
     global app # Global app required for handlers? No, it's local scope but handlers use closures?
     # Actually handlers are defined at module level, so they are fine.
     # The app variable is local to this func.
     
-    app = ApplicationBuilder().token(TOKEN).post_init(post_init).build()
+    app = ApplicationBuilder().token(TOKEN).post_init(post_init).post_shutdown(post_shutdown).build()
     
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("profit", set_profit))
@@ -1021,14 +1058,13 @@ def run_bot():
     app.add_handler(CommandHandler("stats", cmd_stats))
     app.add_handler(CommandHandler("id", cmd_id))
     app.add_handler(CommandHandler("add", cmd_add_promo)) # Admin Command
+    app.add_handler(CommandHandler("dispatcher", cmd_dispatcher)) # Admin Command
+    app.add_handler(CommandHandler("entregas", cmd_deliveries)) # Admin Command
     app.add_handler(CommandHandler("ayuda", cmd_help))
     app.add_handler(CommandHandler("help", cmd_help))
     
     app.add_handler(CallbackQueryHandler(handle_callback))
     app.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_stake_input))
     
-    job_queue = app.job_queue
-    job_queue.run_repeating(check_new_bets, interval=CHECK_INTERVAL, first=1)
-    
     print("🤖 Bot Iniciado y Esperando (Modo Combinado)...")
     app.run_polling()
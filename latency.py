@@ -0,0 +1,147 @@
+import time
+import calendar
+import threading
+from collections import deque
+
+from metrics import REGISTRY
+
+# --- End-to-end latency of a surebet, from scrape to user delivery ---
+# Every bet carries a trace: {stage: epoch seconds}, stamped as it moves
+#   observed  -> rows / DOM read from the browser
+#   parsed    -> turned into new bet objects
+#   persisted -> committed to surebets.db
+#   picked    -> taken by the filter bot dispatcher loop
+#   rendered  -> alert text built
+#   sent      -> accepted by Telegram (per recipient, not stored in the trace)
+# Each stamp observes the time since the previous stamped stage, and every
+# delivery also observes the total age since the first stage. Histograms keep
+# a sliding window of samples for p50/p95/p99 and are rendered in the
+# Prometheus text format, as part of metrics.REGISTRY.
+#
+# Wall-clock time, so scraper and bot may live in different processes. Bets
+# replayed from SQLite (poll / restart) only know found_at, so their trace
+# starts at "persisted" with one-second resolution.
+
+STAGES = ("observed", "parsed", "persisted", "picked", "rendered", "sent")
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 2000  # Samples kept per histogram
+
+
+class Histogram:
+    def __init__(self, window=WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+            self.sum += value
+
+    def percentiles(self, quantiles=QUANTILES):
+        with self._lock:
+            values = sorted(self._samples)
+        if not values:
+            return {q: 0.0 for q in quantiles}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in quantiles}
+
+
+class LatencyTracker:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._stages = {}  # (from, to) -> Histogram
+        self._age = Histogram(window)  # first stage -> sent
+        self._lock = threading.Lock()
+
+    def _histogram(self, start, end):
+        with self._lock:
+            h = self._stages.get((start, end))
+            if h is None:
+                h = self._stages[(start, end)] = Histogram(self.window)
+            return h
+
+    def _observe_from_previous(self, trace, stage, t):
+        for prev in reversed(STAGES[:STAGES.index(stage)]):
+            if prev in trace:
+                self._histogram(prev, stage).observe(max(0.0, t - trace[prev]))
+                return
+
+    # --- Stamping ---
+    def stamp(self, trace, stage, t=None):
+        """
+        Records `stage` in the trace (a dict carried with the bet) and observes
+        the time since the previous stage. Returns the trace.
+        """
+        if trace is None:
+            return None
+        t = time.time() if t is None else t
+        self._observe_from_previous(trace, stage, t)
+        trace[stage] = t
+        return trace
+
+    def delivered(self, trace, t=None):
+        """
+        One recipient got the alert: observes the last stage -> sent and the
+        total age of the bet. The shared trace is left untouched.
+        """
+        if not trace:
+            return
+        t = time.time() if t is None else t
+        self._observe_from_previous(trace, "sent", t)
+        first = min(trace.values())
+        self._age.observe(max(0.0, t - first))
+
+    # --- Reporting ---
+    def _sorted_stages(self):
+        # Snapshot under the lock: scraper threads and the bot loop add stages while /metrics reads
+        with self._lock:
+            stages = list(self._stages.items())
+        return sorted(stages, key=lambda kv: STAGES.index(kv[0][1]))
+
+    def stats(self):
+        out = {f"{a}->{b}": h.percentiles() for (a, b), h in self._sorted_stages()}
+        out["age"] = self._age.percentiles()
+        return out
+
+    def render_metrics(self):
+        """
+        Prometheus text exposition: one summary per stage transition plus the
+        end-to-end age at delivery.
+        """
+        lines = [
+            "# HELP surebet_stage_seconds Time between two consecutive stages of a surebet.",
+            "# TYPE surebet_stage_seconds summary",
+        ]
+        for (a, b), h in self._sorted_stages():
+            labels = f'from="{a}",to="{b}"'
+            for q, v in h.percentiles().items():
+                lines.append(f'surebet_stage_seconds{{{labels},quantile="{q}"}} {v:.6f}')
+            lines.append(f"surebet_stage_seconds_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"surebet_stage_seconds_count{{{labels}}} {h.count}")
+        lines += [
+            "# HELP surebet_age_seconds Age of a surebet (since its first stage) when delivered to a user.",
+            "# TYPE surebet_age_seconds summary",
+        ]
+        for q, v in self._age.percentiles().items():
+            lines.append(f'surebet_age_seconds{{quantile="{q}"}} {v:.6f}')
+        lines.append(f"surebet_age_seconds_sum {self._age.sum:.6f}")
+        lines.append(f"surebet_age_seconds_count {self._age.count}")
+        return "\n".join(lines) + "\n"
+
+
+def trace_from_found_at(found_at):
+    """
+    Trace of a bet read back from SQLite: only its commit time is known.
+    """
+    try:
+        t = calendar.timegm(time.strptime(str(found_at)[:19], "%Y-%m-%d %H:%M:%S"))  # found_at is UTC
+    except (TypeError, ValueError):
+        return {}
+    return {"persisted": t}
+
+
+# Shared by scraper and bot in the combined deployment
+LATENCY = LatencyTracker()
+REGISTRY.add_collector(LATENCY.render_metrics)
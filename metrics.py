@@ -0,0 +1,211 @@
+import os
+import time
+import bisect
+import threading
+
+# --- Prometheus-style metrics ---
+# Minimal in-process registry rendered in the Prometheus text format (no
+# client library needed). Counters and histograms are updated from any thread
+# (scraper, browser workers, DB executor, bot loop); gauges can be plain values
+# or callbacks evaluated at scrape time. Other modules can also register a
+# collector: a function returning ready-made exposition text (latency.py).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, fn=None, labels=()):
+        super().__init__(name, help, labels)
+        self.fn = fn  # Callback read at scrape time (no labels)
+        self._values = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        if self.fn:
+            return self.fn()
+        return self._values.get(self._key(labels))
+
+    def render(self):
+        if self.fn:
+            try:
+                value = self.fn()
+            except Exception:
+                return []  # Owner not ready (e.g. bot not started): omit the sample
+            return self.header() + [f"{self.name} {_fmt(value)}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            series = {k: list(v) for k, v in sorted(self._series.items())}
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for key, s in series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, s):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_fmt(float(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {s[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {s[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {s[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_add(self, cls, name, *args, **kwargs):
+        # Idempotent by name, so re-imported modules get the existing metric
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get_or_add(Counter, name, help, labels)
+
+    def gauge(self, name, help, fn=None, labels=()):
+        gauge = self._get_or_add(Gauge, name, help, labels=labels)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_add(Histogram, name, help, labels, buckets)
+
+    def add_collector(self, fn):
+        if fn not in self._collectors:
+            self._collectors.append(fn)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.extend(metric.render())
+        text = "\n".join(lines) + "\n"
+        for fn in collectors:
+            text += fn()
+        return text
+
+
+REGISTRY = Registry()
+
+
+def db_size():
+    # surebets.db plus its WAL, which holds every commit since the last checkpoint
+    import database as db
+    return sum(os.path.getsize(p) for p in (db.DB_NAME, db.DB_NAME + "-wal") if os.path.exists(p))
+
+
+# --- Pipeline metrics (shared by scraper, bot and health server) ---
+BETS_SCRAPED = REGISTRY.counter("surebets_scraped_total", "Surebet rows read from BetHero.")
+BETS_DEDUPED = REGISTRY.counter("surebets_deduped_total", "Surebets dropped as already seen.", ("stage",))
+BETS_PERSISTED = REGISTRY.counter("surebets_persisted_total", "Surebets stored in surebets.db.")
+ALERTS_SENT = REGISTRY.counter("alerts_sent_total", "Alerts accepted by Telegram.", ("destination",))
+ALERTS_FAILED = REGISTRY.counter("alerts_failed_total", "Alerts given up.", ("destination",))
+
+PARSE_SECONDS = REGISTRY.histogram("surebet_parse_seconds", "HTML parse time of one surebets page.")
+PAGE_SOURCE_SECONDS = REGISTRY.histogram("selenium_page_source_seconds", "Time to read driver.page_source.")
+SEND_SECONDS = REGISTRY.histogram("telegram_send_seconds", "Duration of one Telegram send call.", ("sender",))
+
+LAST_DOM = REGISTRY.gauge("scraper_last_dom_timestamp_seconds", "When the scraper last read the page (epoch).")
+DB_SIZE = REGISTRY.gauge("sqlite_db_bytes", "Size of surebets.db plus its WAL.", fn=db_size)
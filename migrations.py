@@ -0,0 +1,354 @@
+import json
+import logging
+import threading
+from datetime import datetime
+
+import database as db
+from dedup_store import make_key, parse_start_time
+from sport_classifier import classify_sport
+from bookie_registry import legs_mask, user_mask
+
+logger = logging.getLogger(__name__)
+
+# --- Versioned schema for surebets.db ---
+# PRAGMA user_version holds the last applied migration. Scraper and bot both
+# call migrate() at startup; each step runs in its own BEGIN IMMEDIATE
+# transaction and re-checks the version inside it, so two processes starting
+# together apply every step exactly once. Append new steps, never edit old ones.
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table, name, decl):
+    if name not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def bet_signature(event, profit, first_odds):
+    """
+    Content hash of a surebet as one feed reported it (event, profit, first
+    odds): surebets.content_hash and the scraper's SEEN_BETS key. The bot's
+    alert dedup is a different, cross-feed key (canonical.surebet_key).
+    """
+    try:
+        profit = float(profit)  # "3.20" and 3.2 are the same bet
+    except (TypeError, ValueError):
+        pass
+    return make_key(event, profit, first_odds)
+
+
+def odds_summary(legs):
+    """
+    (leg_count, implied_prob, max_odds) from the bookies_json legs. implied_prob
+    is sum(1/odds): below 1.0 means a real arbitrage.
+    """
+    odds = []
+    for leg in legs:
+        try:
+            o = float(str(leg.get('odds', '')).replace(',', '.'))
+        except ValueError:
+            continue
+        if o > 0:
+            odds.append(o)
+    if not odds:
+        return len(legs), None, None
+    return len(legs), sum(1 / o for o in odds), max(odds)
+
+
+def start_timestamp(start_time, found_at=None):
+    # Relative texts ("Tomorrow at 18:00") are resolved against when the bet was found
+    now = None
+    if found_at:
+        try:
+            now = datetime.strptime(str(found_at)[:19], "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            pass
+    start = parse_start_time(start_time, now)
+    return int(start.timestamp()) if start else None
+
+
+def _odds_value(odds):
+    try:
+        o = float(str(odds).replace(',', '.'))
+    except ValueError:
+        return None
+    return o if o > 0 else None
+
+
+def bookie_ids(conn, names):
+    """
+    {name: id} for the bookies dimension, inserting the new names.
+    """
+    names = {n for n in names if n}
+    conn.executemany("INSERT OR IGNORE INTO bookies (name) VALUES (?)", [(n,) for n in names])
+    ids = {}
+    for n in names:
+        ids[n] = conn.execute("SELECT id FROM bookies WHERE name = ?", (n,)).fetchone()[0]
+    return ids
+
+
+def insert_legs(conn, surebet_id, legs):
+    """
+    Writes the legs of one surebet ([{bookie, market, odds}]) in bulk.
+    """
+    ids = bookie_ids(conn, [leg.get('bookie') or "Unknown" for leg in legs])
+    conn.executemany(
+        "INSERT OR IGNORE INTO surebet_legs (surebet_id, leg_no, bookie_id, market, odds, odds_text) VALUES (?, ?, ?, ?, ?, ?)",
+        [(surebet_id, i, ids[leg.get('bookie') or "Unknown"], leg.get('market'),
+          _odds_value(leg.get('odds', '')), str(leg.get('odds', ''))) for i, leg in enumerate(legs)]
+    )
+
+
+def fetch_legs(conn, first_id, last_id=None):
+    """
+    {surebet_id: [{bookie, market, odds}]} for a range of surebets, in leg order.
+    odds is the text as shown by the feed (alerts print it unchanged).
+    """
+    sql = '''
+        SELECT l.surebet_id, b.name, l.market, l.odds_text
+        FROM surebet_legs l JOIN bookies b ON b.id = l.bookie_id
+        WHERE l.surebet_id >= ?''' + (" AND l.surebet_id <= ?" if last_id is not None else "") + '''
+        ORDER BY l.surebet_id, l.leg_no
+    '''
+    params = (first_id,) if last_id is None else (first_id, last_id)
+    legs = {}
+    for row in conn.execute(sql, params):
+        legs.setdefault(row[0], []).append({'market': row[2], 'bookie': row[1], 'odds': row[3]})
+    return legs
+
+
+# --- Steps ---
+def _v1_base_tables(conn):
+    # Everything the scripts used to create ad hoc (and user_bets, which nothing created)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS surebets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            event TEXT,
+            league TEXT,
+            profit REAL,
+            bookies_json TEXT, -- Stores JSON list of bookmakers/markets
+            raw_id TEXT UNIQUE -- To prevent duplicates in DB if needed
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER UNIQUE,
+            min_profit REAL DEFAULT 1.0,
+            bookies TEXT DEFAULT '[]',
+            sports TEXT DEFAULT '[]',
+            leagues TEXT DEFAULT '{}',
+            active INTEGER DEFAULT 1,
+            expiration_date TEXT DEFAULT NULL
+        )
+    ''')
+    # Databases created before these columns existed
+    _add_column(conn, "users", "sports", "TEXT DEFAULT '[]'")
+    _add_column(conn, "users", "expiration_date", "TEXT DEFAULT NULL")
+    _add_column(conn, "users", "leagues", "TEXT DEFAULT '{}'")
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_bets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            surebet_id INTEGER,
+            profit_percent REAL,
+            stake REAL,
+            real_profit REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS seen_bets (
+            namespace TEXT NOT NULL,
+            key INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _v2_surebet_columns(conn):
+    _add_column(conn, "surebets", "content_hash", "INTEGER")
+    _add_column(conn, "surebets", "start_time", "TEXT")       # As shown by the feed
+    _add_column(conn, "surebets", "start_ts", "INTEGER")      # Epoch seconds, NULL if unparseable
+    _add_column(conn, "surebets", "leg_count", "INTEGER")
+    _add_column(conn, "surebets", "implied_prob", "REAL")     # sum(1/odds)
+    _add_column(conn, "surebets", "max_odds", "REAL")
+
+    # Backfill. Older duplicates keep a NULL hash so the unique index can be built.
+    seen = set()
+    updates = []
+    for row in conn.execute("SELECT id, event, profit, bookies_json FROM surebets ORDER BY id"):
+        try:
+            legs = json.loads(row[3] or "[]")
+        except ValueError:
+            legs = []
+        first_odds = legs[0].get('odds', '') if legs else ''
+        h = bet_signature(row[1], row[2], first_odds)
+        if h in seen:
+            h = None
+        else:
+            seen.add(h)
+        updates.append((h, *odds_summary(legs), row[0]))
+    conn.executemany(
+        "UPDATE surebets SET content_hash = ?, leg_count = ?, implied_prob = ?, max_odds = ? WHERE id = ?",
+        updates
+    )
+
+
+def _v3_indexes(conn):
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_surebets_content_hash ON surebets(content_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_surebets_found_at ON surebets(found_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_surebets_start_ts ON surebets(start_ts)")
+    # Covering index: /stats sums straight from the index, never touching the table
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_bets_user ON user_bets(user_id, stake, real_profit)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_active_exp ON users(active, expiration_date)")
+
+
+def _v4_surebet_legs(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bookies (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS surebet_legs (
+            surebet_id INTEGER NOT NULL REFERENCES surebets(id),
+            leg_no INTEGER NOT NULL,
+            bookie_id INTEGER NOT NULL REFERENCES bookies(id),
+            market TEXT,
+            odds REAL,
+            odds_text TEXT, -- As shown by the feed ("2.10")
+            PRIMARY KEY (surebet_id, leg_no)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_surebet_legs_bookie ON surebet_legs(bookie_id, surebet_id)")
+
+    for row in conn.execute("SELECT id, bookies_json FROM surebets ORDER BY id").fetchall():
+        try:
+            legs = [leg for leg in json.loads(row[1] or "[]") if isinstance(leg, dict)]
+        except ValueError:
+            continue
+        insert_legs(conn, row[0], legs)
+
+
+def _v5_deliveries(conn):
+    # One row per (bet, user) alert: written as 'pending' before the send, so a
+    # restart resumes exactly what was not confirmed and never re-plans the rest
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS deliveries (
+            surebet_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending', -- pending / sent / failed / expired
+            queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP,
+            PRIMARY KEY (surebet_id, user_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_deliveries_pending ON deliveries(surebet_id) WHERE status = 'pending'")
+
+
+def _v6_delivery_log(conn):
+    _add_column(conn, "deliveries", "latency_ms", "INTEGER")   # Queued -> accepted by Telegram
+    _add_column(conn, "deliveries", "message_id", "INTEGER")   # Telegram message id, NULL unless sent
+    # Per-user history ("did user X get bet Y" is the primary key)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_deliveries_user ON deliveries(user_id, surebet_id)")
+
+
+def _v7_surebet_sport(conn):
+    # Classified once at ingest (sport_classifier) instead of per user at fan-out
+    _add_column(conn, "surebets", "sport", "TEXT")
+    rows = conn.execute("SELECT id, league, event FROM surebets WHERE sport IS NULL").fetchall()
+    conn.executemany("UPDATE surebets SET sport = ? WHERE id = ?",
+                     [(classify_sport(row[1] or "", row[2] or ""), row[0]) for row in rows])
+
+
+def _v8_bookie_masks(conn):
+    # Bookie ids as bitmasks (bookie_registry): user holds every bookie of a bet = one AND
+    _add_column(conn, "users", "bookies_mask", "INTEGER") # NULL: derived from users.bookies when indexed
+    _add_column(conn, "surebets", "bookies_mask", "INTEGER")
+
+    updates = []
+    for row in conn.execute("SELECT user_id, bookies FROM users").fetchall():
+        try:
+            bookies = row[1] if row[1] == 'ALL' else json.loads(row[1] or "[]")
+        except ValueError:
+            bookies = []
+        updates.append((user_mask(bookies), row[0]))
+    conn.executemany("UPDATE users SET bookies_mask = ? WHERE user_id = ?", updates)
+
+    updates = []
+    for row in conn.execute("SELECT id, bookies_json FROM surebets").fetchall():
+        try:
+            legs = [leg for leg in json.loads(row[1] or "[]") if isinstance(leg, dict)]
+        except ValueError:
+            legs = []
+        updates.append((legs_mask(legs), row[0]))
+    conn.executemany("UPDATE surebets SET bookies_mask = ? WHERE id = ?", updates)
+
+
+def _v9_reclassify_ncaa(conn):
+    # "ncaa" used to be a Basketball keyword: college football/baseball rows stored as Basketball
+    rows = conn.execute("SELECT id, league, event FROM surebets "
+                        "WHERE (league LIKE '%ncaa%' OR event LIKE '%ncaa%')").fetchall()
+    conn.executemany("UPDATE surebets SET sport = ? WHERE id = ?",
+                     [(classify_sport(row[1] or "", row[2] or ""), row[0]) for row in rows])
+
+
+MIGRATIONS = [
+    (1, "base tables", _v1_base_tables),
+    (2, "surebets content hash, start time and odds columns", _v2_surebet_columns),
+    (3, "hot query indexes", _v3_indexes),
+    (4, "surebet_legs and bookies tables", _v4_surebet_legs),
+    (5, "deliveries table", _v5_deliveries),
+    (6, "delivery latency and message id", _v6_delivery_log),
+    (7, "surebets sport column", _v7_surebet_sport),
+    (8, "user and surebet bookie masks", _v8_bookie_masks),
+    (9, "reclassify NCAA surebets", _v9_reclassify_ncaa),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_lock = threading.Lock()
+
+
+def current_version(conn=None):
+    conn = conn or db.get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate():
+    """
+    Brings surebets.db up to SCHEMA_VERSION. Safe to call from every process.
+    """
+    with _lock:
+        conn = db.get_connection()
+        if current_version(conn) >= SCHEMA_VERSION:
+            return SCHEMA_VERSION
+        for version, description, step in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if current_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                logger.error(f"❌ Migration {version} ({description}) failed.")
+                raise
+            logger.info(f"🧱 Migration {version} applied: {description}")
+        conn.execute("ANALYZE")  # Fresh stats so the planner picks the new indexes
+        return current_version(conn)
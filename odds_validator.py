@@ -0,0 +1,148 @@
+import os
+import time
+import logging
+import threading
+from collections import namedtuple
+
+from arbitrage import profit_percentage, commission_for, parse_odds
+from canonical import event_key, market_key, bookie_key
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# --- Cross-source odds book and stale-surebet validation ---
+# Every source (BetHero rows, forwarded channel alerts) reports the odds it
+# sees per (event, market, bookie) into one in-memory book, newest observation
+# wins (names go through canonical.py, so feeds spelling a match or a market
+# differently share the entry). Before an alert fans out, its legs are
+# re-priced with any odds newer than the alert and the profit is recomputed:
+#   ok       -> nothing newer is known, profit as reported
+#   changed  -> some leg moved, still a surebet above MIN_EDGE
+#   dead     -> some leg moved and the edge is gone (or the new price is invalid)
+#   no_edge  -> nothing moved, but the reported odds give no profit above
+#               MIN_EDGE once exchange commission is paid
+# ODDS_VALIDATION decides what happens to dead alerts: "drop" (not sent),
+# "flag" (sent with a warning) or "off". no_edge alerts are only flagged. The book lives in the process: in the
+# combined deployment the scraper feeds the filter bot, the forwarder
+# (bot_sures) keeps its own book fed by its channels.
+
+ODDS_VALIDATION = os.environ.get("ODDS_VALIDATION", "flag").strip().lower()
+ODDS_TTL = int(os.environ.get("ODDS_TTL", 900))        # Seconds an observed price is trusted
+MIN_EDGE = float(os.environ.get("MIN_EDGE", 0.0))      # Profit % at or below which a surebet is dead
+MAX_ENTRIES = 100000
+PRUNE_EVERY = 1000                                     # Observations between two expiry sweeps
+
+OK = "ok"
+CHANGED = "changed"
+DEAD = "dead"
+NO_EDGE = "no_edge"
+
+Verdict = namedtuple("Verdict", "status profit changed")  # changed: [(leg index, old odds, new odds, source)]
+
+VALIDATED = REGISTRY.counter("surebets_validated_total", "Surebets re-priced against the odds book.", ("status",))
+
+
+def leg_key(event, leg):
+    return event_key(event), market_key(leg.get("market")), bookie_key(leg.get("bookie"))
+
+
+class OddsBook:
+    def __init__(self, ttl=ODDS_TTL, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._odds = {}  # (event, market, bookie) -> (odds, seen_at, source)
+        self._lock = threading.Lock()  # Scraper thread writes, bot loop reads
+        self._since_prune = 0
+
+    def __len__(self):
+        return len(self._odds)
+
+    def observe(self, event, legs, source, t=None):
+        """
+        Records the odds of every leg ({'market', 'bookie', 'odds'}) seen by
+        `source` at time t. An older observation never replaces a newer one.
+        """
+        t = time.time() if t is None else t
+        with self._lock:
+            for leg in legs:
+                odds = parse_odds(leg.get("odds"))
+                if odds != odds:  # NaN: no readable price
+                    continue
+                key = leg_key(event, leg)
+                current = self._odds.get(key)
+                if current is None or current[1] <= t:
+                    self._odds[key] = (odds, t, source)
+            self._since_prune += len(legs)
+            if self._since_prune >= PRUNE_EVERY or len(self._odds) > self.max_entries:
+                self._prune(time.time())
+
+    def _prune(self, now):
+        self._since_prune = 0
+        cutoff = now - self.ttl
+        self._odds = {k: v for k, v in self._odds.items() if v[1] >= cutoff}
+        if len(self._odds) > self.max_entries:
+            newest = sorted(self._odds.items(), key=lambda kv: kv[1][1])[-self.max_entries:]
+            self._odds = dict(newest)
+
+    def latest(self, event, leg, now=None):
+        now = time.time() if now is None else now
+        entry = self._odds.get(leg_key(event, leg))
+        if entry is None or entry[1] < now - self.ttl:
+            return None
+        return entry
+
+    def validate(self, event, legs, t=None):
+        """
+        Re-prices the legs of a surebet reported at time t with the odds the
+        book learned after t, and recomputes the profit.
+        """
+        t = time.time() if t is None else t
+        now = time.time()
+        odds, changed = [], []
+        with self._lock:
+            for i, leg in enumerate(legs):
+                alert_odds = parse_odds(leg.get("odds"))
+                entry = self.latest(event, leg, now)
+                if entry is not None and entry[1] > t and entry[0] != alert_odds:
+                    changed.append((i, alert_odds, entry[0], entry[2]))
+                    odds.append(entry[0])
+                else:
+                    odds.append(alert_odds)
+
+        profit = profit_percentage(odds, [commission_for(leg.get("bookie")) for leg in legs])
+        edge = profit is not None and profit > MIN_EDGE
+        if changed:
+            status = CHANGED if edge else DEAD
+        elif profit is None or edge:
+            status = OK  # Nothing newer (an unreadable alert has nothing to compare)
+        else:
+            status = NO_EDGE
+        VALIDATED.inc(status=status)
+        return Verdict(status, profit, changed)
+
+    def check(self, event, legs, source, t=None):
+        # validate() against what other observations said, then record this one
+        verdict = self.validate(event, legs, t)
+        self.observe(event, legs, source, t)
+        return verdict
+
+
+def should_drop(verdict):
+    return ODDS_VALIDATION == "drop" and verdict.status == DEAD
+
+
+def warning_line(verdict):
+    """
+    Line prepended to flagged alerts, or "" when there is nothing to say.
+    """
+    if ODDS_VALIDATION == "off" or verdict.status == OK:
+        return ""
+    if verdict.status == DEAD:
+        return "⚠️ CUOTAS CAMBIADAS: esta surebet ya no tiene beneficio."
+    if verdict.status == NO_EDGE:
+        return f"⚠️ Beneficio tras comisiones: {verdict.profit:.2f}%"
+    return f"⚠️ Cuotas actualizadas: profit actual {verdict.profit:.2f}%"
+
+
+ODDS_BOOK = OddsBook()
+REGISTRY.gauge("odds_book_entries", "Prices held in the cross-source odds book.", fn=lambda: len(ODDS_BOOK))
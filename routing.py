@@ -0,0 +1,185 @@
+import os
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# --- Declarative routing for the forwarder ---
+# origin -> rules (keywords / regexes / bookie names) -> destinations + transforms,
+# loaded from a JSON file (ROUTING_CONFIG) instead of if/else in the handler.
+#
+# {
+#   "routes": [
+#     {
+#       "origins": ["@canalA", "-1001234567890"],
+#       "default": "-1009876543210",
+#       "transforms": ["sure_middle"],
+#       "rules": [
+#         {"when": {"keywords": ["Valuebets"], "case_sensitive": true}, "to": ["@valuebets"], "only": true},
+#         {"when": {"bookies": ["winamax"]}, "to": ["$default"], "only": true},
+#         {"unless": {"bookies": ["bet365"]}, "to": ["@sin_bet365"]},
+#         {"to": ["@sin_winamax"]}
+#       ]
+#     }
+#   ],
+#   "dest_transforms": {"-1005555555555": ["dest2"]}
+# }
+#
+# Destinations start as [default]. Rules run in order: a matching rule adds its
+# "to" destinations, or with "only" replaces them and stops. "when" matches if
+# any of its keywords / regexes / bookies is in the text (empty = always),
+# "unless" vetoes the rule the same way. "$default" is the route's default.
+# Transforms of any chosen destination (dest_transforms) run first, then the
+# route's own transforms.
+#
+# Every keyword of every rule goes into one combined regex (one per case mode),
+# so a message is scanned once whatever the number of rules and channels.
+
+ROUTING_CONFIG = os.environ.get("ROUTING_CONFIG", "routing.json").strip()
+DEFAULT_TOKEN = "$default"
+
+
+class KeywordMatcher:
+    """
+    All keywords in one pass. A zero-width lookahead at every position finds
+    the longest keyword starting there; shorter keywords that are substrings
+    of it are implied, so overlapping keywords are all reported.
+    """
+
+    def __init__(self, keywords, case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        norm = {self._norm(k) for k in keywords if k}
+        self._keywords = sorted(norm, key=len, reverse=True)
+        self._implied = {k: {o for o in self._keywords if o in k} for k in self._keywords}
+        self._regex = None
+        if self._keywords:
+            flags = 0 if case_sensitive else re.IGNORECASE
+            self._regex = re.compile("(?=(" + "|".join(map(re.escape, self._keywords)) + "))", flags)
+
+    def _norm(self, keyword):
+        return keyword if self.case_sensitive else keyword.lower()
+
+    def hits(self, text):
+        found = set()
+        if self._regex is None or not text:
+            return found
+        for m in self._regex.finditer(text):
+            k = self._norm(m.group(1))
+            if k not in found:
+                found |= self._implied[k]
+        return found
+
+
+class Condition:
+    def __init__(self, spec):
+        spec = spec or {}
+        self.case_sensitive = bool(spec.get("case_sensitive", False))
+        words = list(spec.get("keywords", [])) + list(spec.get("bookies", []))
+        self.keywords = {w if self.case_sensitive else w.lower() for w in words if w}
+        self.regexes = [re.compile(r, re.IGNORECASE if not self.case_sensitive else 0) for r in spec.get("regexes", [])]
+
+    def __bool__(self):
+        return bool(self.keywords or self.regexes)
+
+    def matches(self, text, hits_cs, hits_ci):
+        hits = hits_cs if self.case_sensitive else hits_ci
+        if not self.keywords.isdisjoint(hits):
+            return True
+        return any(r.search(text) for r in self.regexes)
+
+
+class Rule:
+    def __init__(self, spec):
+        self.when = Condition(spec.get("when"))
+        self.unless = Condition(spec.get("unless"))
+        self.to = list(spec.get("to", []))
+        self.only = bool(spec.get("only", False))
+
+    def applies(self, text, hits_cs, hits_ci):
+        if self.when and not self.when.matches(text, hits_cs, hits_ci):
+            return False
+        if self.unless and self.unless.matches(text, hits_cs, hits_ci):
+            return False
+        return True
+
+
+class Route:
+    def __init__(self, spec, normalize):
+        self.origins = [str(o) for o in spec.get("origins", []) if str(o).strip()]
+        self.default = normalize(spec["default"])
+        self.rules = [Rule(r) for r in spec.get("rules", [])]
+        self.transforms = list(spec.get("transforms", []))
+        self._normalize = normalize
+
+    def resolve(self, dest):
+        return self.default if dest == DEFAULT_TOKEN else self._normalize(dest)
+
+
+class Router:
+    def __init__(self, config, normalize=lambda d: d):
+        self.routes = [Route(r, normalize) for r in config.get("routes", []) if r.get("default")]
+        self.dest_transforms = {normalize(d): list(t) for d, t in config.get("dest_transforms", {}).items()}
+        self._by_origin = {}  # peer id -> Route
+
+        conditions = [c for route in self.routes for rule in route.rules for c in (rule.when, rule.unless)]
+        self._matcher_cs = KeywordMatcher([k for c in conditions if c.case_sensitive for k in c.keywords], True)
+        self._matcher_ci = KeywordMatcher([k for c in conditions if not c.case_sensitive for k in c.keywords])
+
+    # --- Origins ---
+    def bind(self, route, peer_id):
+        """
+        Maps a resolved origin (numeric peer id) to its route.
+        """
+        self._by_origin[peer_id] = route
+
+    def route_for(self, peer_id):
+        return self._by_origin.get(peer_id)
+
+    @property
+    def origins(self):
+        return self._by_origin
+
+    # --- Routing ---
+    def route(self, peer_id, text):
+        """
+        Returns (destinations, transform names) for a message, or (None, [])
+        if the origin has no route.
+        """
+        route = self._by_origin.get(peer_id)
+        if route is None:
+            return None, []
+
+        dests = [route.default]
+        if route.rules:
+            hits_cs = self._matcher_cs.hits(text)
+            hits_ci = self._matcher_ci.hits(text)
+            for rule in route.rules:
+                if not rule.applies(text, hits_cs, hits_ci):
+                    continue
+                targets = [route.resolve(d) for d in rule.to]
+                if rule.only:
+                    dests = targets
+                    break
+                dests.extend(d for d in targets if d not in dests)
+
+        transforms = []
+        for d in dests:
+            for t in self.dest_transforms.get(d, []):
+                if t not in transforms:
+                    transforms.append(t)
+        transforms.extend(t for t in route.transforms if t not in transforms)
+        return dests, transforms
+
+
+def load_config(path=ROUTING_CONFIG, fallback=None):
+    """
+    Reads the JSON routing config. Without the file, `fallback()` builds it
+    (the forwarder derives one from its DEST_CHAT_* env vars).
+    """
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        logger.info(f"🧭 Routing config loaded from {path} ({len(config.get('routes', []))} routes)")
+        return config
+    return fallback() if fallback else {"routes": []}
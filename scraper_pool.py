@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+import logging
+from functools import partial
+from urllib.parse import urljoin, urlparse
+
+import database as db
+import bethero_scraper as scraper
+from browser_worker import BrowserWorker
+
+logger = logging.getLogger(__name__)
+
+# --- BetHero Scraper Pool ---
+# One browser per BetHero view (sport, profit band, any filtered /surebets URL)
+# so every view gets its own refresh cycle instead of sharing one page. Each
+# worker owns its driver on its own thread (BrowserWorker), injects the cookies,
+# enables auto refresh and pushes its new bets into one shared queue. Dedup is
+# shared too (scraper.SEEN_BETS), so a surebet visible in two views is saved
+# once. A crashed worker is torn down and restarted alone, with backoff.
+#
+# BETHERO_VIEWS="football=/surebets?sport=football,high=/surebets?minProfit=3"
+# (entries can also be bare paths / URLs; the name is only used in logs)
+
+BETHERO_VIEWS = os.environ.get("BETHERO_VIEWS", "").strip()
+BASE_DEBUG_PORT = 9222
+RESTART_BACKOFF_MAX = 300   # Seconds
+HEALTHY_AFTER = 600         # A worker that lived this long restarts with the minimum backoff
+QUEUE_SIZE = 1000
+
+
+def parse_views(spec=BETHERO_VIEWS):
+    """
+    Returns [(name, url)]. Defaults to the plain surebets page.
+    """
+    views = []
+    for i, item in enumerate(p.strip() for p in spec.split(",")):
+        if not item:
+            continue
+        name, sep, url = item.partition("=")
+        if not sep or name.startswith(("http", "/")):
+            name, url = f"view{i + 1}", item
+        views.append((name.strip(), urljoin(scraper.SUREBETS_URL, url.strip())))
+    return views or [("surebets", scraper.SUREBETS_URL)]
+
+
+class ScraperPool:
+    def __init__(self, views, cookies=None):
+        self.views = views
+        self.cookies = cookies
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.restarts = {name: 0 for name, _ in views}
+        self.saved = 0
+        self._tasks = []
+
+    # --- Lifecycle ---
+    async def run(self):
+        self._tasks = [asyncio.create_task(self._writer())]
+        for i, (name, url) in enumerate(self.views):
+            self._tasks.append(asyncio.create_task(self._supervise(i, name, url)))
+        logger.info(f"🧭 Scraper pool started with {len(self.views)} views: {', '.join(n for n, _ in self.views)}")
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # --- Workers ---
+    async def _supervise(self, i, name, url):
+        backoff = 5
+        while True:
+            started = time.monotonic()
+            try:
+                await self._run_worker(i, name, url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Scraper worker '{name}' crashed: {e}")
+            if time.monotonic() - started > HEALTHY_AFTER:
+                backoff = 5
+            self.restarts[name] += 1
+            logger.info(f"🔄 Restarting worker '{name}' in {backoff}s...")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+
+    async def _open_view(self, browser, url):
+        await browser.call(browser.driver.get, url)
+        if self.cookies:
+            await browser.call(scraper.inject_cookies, browser.driver, self.cookies)
+            await asyncio.sleep(2)
+        if urlparse(url).path not in await browser.attr("current_url"):
+            await browser.call(browser.driver.get, url)
+            await asyncio.sleep(2)
+        await browser.run(scraper.ensure_auto_refresh)
+
+    async def _run_worker(self, i, name, url):
+        browser = BrowserWorker(f"bethero-{name}")
+        try:
+            await browser.start(partial(scraper.create_driver, debug_port=BASE_DEBUG_PORT + i))
+            await self._open_view(browser, url)
+
+            api_session = None
+            if scraper.SCRAPE_MODE == "api" and scraper.BETHERO_API_URL:
+                api_session = scraper.bethero_api.build_session(await browser.call(browser.driver.get_cookies))
+
+            logger.info(f"✅ Worker '{name}' scraping {url}")
+            interval = scraper.POLL_INTERVALS.get(scraper.SCRAPE_MODE, scraper.CHECK_INTERVAL)
+            path = urlparse(url).path
+
+            while True:
+                try:
+                    current = await browser.attr("current_url")
+                    if path not in current:
+                        logger.warning(f"⚠️ [{name}] Incorrect URL ({current}). Redirecting...")
+                        await self._open_view(browser, url)
+                        continue
+                    for bet in await scraper.read_bets(browser, current, api_session):
+                        await self.queue.put(bet)
+                except Exception as e:
+                    if scraper.is_fatal_driver_error(e):
+                        raise
+                    logger.error(f"⚠️ [{name}] Loop error: {e}")
+                await asyncio.sleep(interval)
+        finally:
+            await browser.quit()
+
+    async def _writer(self):
+        while True:
+            bet = await self.queue.get()
+            try:
+                logger.info(f"Forwarding new surebet: {bet['event']} ({bet['profit']}%)")
+                if await db.run(scraper.save_bet_to_db, bet):
+                    self.saved += 1
+            finally:
+                self.queue.task_done()
+
+    # --- Metrics ---
+    def stats(self):
+        return {
+            'views': len(self.views),
+            'queue_depth': self.queue.qsize(),
+            'saved': self.saved,
+            'restarts': dict(self.restarts)
+        }
+
+
+async def main():
+    print("🚀 Starting BetHero Scraper Pool...")
+    await db.run(scraper.init_db)
+    cookies = scraper.load_cookies()
+    if not cookies:
+        logger.warning("⚠️ No BetHero cookies found: pooled browsers can't log in interactively.")
+    await ScraperPool(parse_views(), cookies).run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
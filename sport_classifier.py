@@ -0,0 +1,110 @@
+import re
+from functools import lru_cache
+
+# --- Sport classification of a surebet ---
+# One compiled pattern holds every sport keyword plus every league name of
+# SPORTS_STRUCTURE, matched on whole words only ("open" no longer hits
+# "Copenhagen", nor "test" "contest"). The leftmost match in "league event"
+# wins, longest alternative first ("ncaa football" before "football"). Bare
+# "NCAA" names no sport and matches nothing on its own. The sport
+# is computed once when the scraper stores the bet (surebets.sport); rows
+# stored before that column existed are classified on read, memoized.
+
+KNOWN_SPORTS = {
+    "Soccer": ["soccer", "football", "fútbol", "laliga", "premier", "serie a", "bundesliga", "ligue 1", "uefa", "champions", "europa"],
+    "Basketball": ["basketball", "baloncesto", "nba", "ncaa basketball", "ncaab", "euroleague", "acb"],
+    "Tennis": ["tennis", "tenis", "atp", "wta", "itf", "davis"],
+    "Baseball": ["baseball", "mlb", "ncaa baseball"],
+    "American Football": ["american football", "nfl", "super bowl", "ncaa football", "ncaaf"],
+    "Ice Hockey": ["ice hockey", "hockey", "nhl"],
+    "Rugby": ["rugby", "rugby union", "rugby league", "six nations"],
+    "Cricket": ["cricket", "ipl", "test match"],
+    "MMA": ["mma", "ufc", "bellator"],
+    "Boxing": ["boxing", "boxeo"],
+    "Darts": ["darts", "dardos"],
+    "e-Sports": ["esport", "esports", "e-sport", "lol", "dota", "cs:go", "valorant"],
+    "Badminton": ["badminton"],
+    "Netball": ["netball"],
+    "Futsal": ["futsal"],
+    "Snooker": ["snooker"],
+    "Table Tennis": ["table tennis", "ping pong"],
+    "Volleyball": ["volleyball", "voleibol"],
+    "Handball": ["handball", "balonmano"],
+    "Floorball": ["floorball"],
+    "Waterpolo": ["waterpolo"]
+}
+
+SPORT_EMOJIS = {
+    "Soccer": "⚽", "Basketball": "🏀", "Tennis": "🎾", "Baseball": "⚾",
+    "American Football": "🏈", "Ice Hockey": "🏒", "Rugby": "🏉", "Cricket": "🏏",
+    "MMA": "🤼", "Boxing": "🥊", "Darts": "🎯", "e-Sports": "🎮",
+    "Badminton": "🏸", "Netball": "🏐", "Futsal": "⚽", "Snooker": "🎱",
+    "Table Tennis": "🏓", "Volleyball": "🏐", "Handball": "🤾", "Floorball": "🏑", "Waterpolo": "🤽"
+}
+
+SPORTS_STRUCTURE = {
+    "Soccer": [
+        "Premier League", "La Liga", "Serie A", "Bundesliga", "Ligue 1",
+        "UEFA Champions League", "UEFA Europa League", "UEFA Conference League", "UEFA Nations League",
+        "MLS", "Eredivisie", "Primeira Liga", "Copa del Rey", "FA Cup", "EFL Cup",
+        "DFB-Pokal", "Coppa Italia", "Coupe de France", "Copa Libertadores", "Copa Sudamericana",
+        "Liga MX", "Jupiler Pro League", "World Cup", "Friendlies", "Others"
+    ],
+    "Basketball": [
+        "NBA", "WNBA", "NCAA", "WNCAA", "EuroLeague", "EuroBasket", "EuroCup",
+        "ACB", "CBA", "NBL", "LNB Pro B", "Others"
+    ],
+    "Tennis": [
+        "ATP", "WTA", "ITF", "ITF Women", "US Open", "Wimbledon", "Roland Garros",
+        "Australian Open", "Six Kings Slam", "Davis Cup", "Billie Jean King Cup", "Challenger", "Others"
+    ],
+    "Baseball": [
+        "MLB", "NPB", "KBO", "AAA", "CPBL", "LMB", "NCAA", "MiLB", "Double-A", "Triple-A", "Others"
+    ],
+    "American Football": ["NFL", "NCAA", "CFL", "XFL", "USFL", "Others"],
+    "Ice Hockey": ["NHL", "KHL", "SHL", "AHL", "Others"],
+    "Rugby": ["Top 14", "Super League", "NRL", "World Cup", "Others"],
+    "Cricket": ["IPL", "BBL", "CPL", "The Hundred", "PSL", "Test Matches", "ODI", "T20I", "Others"],
+    "MMA": ["UFC", "Bellator", "PFL", "ONE Championship", "KSW", "Others"]
+}
+
+OTHER = "Other"
+
+
+def _league_table():
+    """
+    League name (lowercase) -> sport, from SPORTS_STRUCTURE. Names listed under
+    several sports ("NCAA", "World Cup", "Others") tell nothing and are left out.
+    """
+    sports = {}
+    for sport, leagues in SPORTS_STRUCTURE.items():
+        for league in leagues:
+            sports.setdefault(league.lower(), set()).add(sport)
+    return {name: next(iter(s)) for name, s in sports.items() if len(s) == 1}
+
+
+LEAGUE_SPORTS = _league_table()
+
+# Keywords win over league names if both list the same term
+_TERMS = {**LEAGUE_SPORTS, **{kw: sport for sport, kws in KNOWN_SPORTS.items() for kw in kws}}
+_TERMS_RE = re.compile(
+    r"(?<!\w)(?:" + "|".join(re.escape(t) for t in sorted(_TERMS, key=len, reverse=True)) + r")(?!\w)"
+)
+
+
+@lru_cache(maxsize=8192)
+def classify_sport(league, event=""):
+    """
+    Sport of a bet from its league (and event) text, "Other" if nothing matches.
+    """
+    m = _TERMS_RE.search(f"{league or ''} {event or ''}".lower())
+    return _TERMS[m.group(0)] if m else OTHER
+
+
+def bet_sport(bet):
+    # Stored at ingest (surebets.sport), or classified now for older rows
+    return bet.get('sport') or classify_sport(bet.get('league', ''), bet.get('event', ''))
+
+
+def sport_emoji(sport):
+    return SPORT_EMOJIS.get(sport, "🏆")
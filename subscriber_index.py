@@ -0,0 +1,166 @@
+import threading
+from datetime import datetime
+
+from bookie_registry import covers
+from canonical import league_key
+
+# --- Subscriber Filter Index ---
+# In-memory inverted index over the `users` table so that the alert fan-out can
+# resolve "which users want this bet" with a handful of big-int bitwise ops
+# instead of re-parsing every user's JSON preferences for every bet.
+#
+# Every indexed user gets a slot (bit position). Each filter dimension keeps a
+# map {value: bitset of slots}. A bet is matched by intersecting the bitsets,
+# and only the survivors are checked for profit / expiration and bookies (the
+# user's bookie mask must cover the bet's, bookie_registry.py). League names
+# are compared in their canonical form (canonical.league_key), so the menu's
+# "La Liga" matches a bet listed under "Spain - LaLiga".
+
+NONE_MARKER = "__NONE__"
+
+
+def _bits(mask):
+    # Yields the positions of the set bits of an int
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SubscriberIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._slots = {}        # user_id -> slot
+        self._users = {}        # slot -> (user_id, min_profit, expiration datetime | None, bookies mask)
+        self._keys = {}         # slot -> list of (map, key) the slot is registered in
+        self._free = []
+        self._next_slot = 0
+        self._all = 0
+
+        self._sports_all = 0            # users without sport restriction
+        self._by_sport = {}             # sport -> bitset
+        self._league_restricted = {}    # sport -> bitset of users with a league list
+        self._by_league = {}            # (sport, league_key) -> bitset
+        self._league_names = {}         # sport -> set of league keys in use
+
+    def __len__(self):
+        return len(self._slots)
+
+    # --- Maintenance ---
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def upsert(self, user_id, min_profit, bookies_mask, sports, leagues, expiration):
+        """
+        (Re)indexes one user. `bookies_mask` is users.bookies_mask, `sports` and
+        `leagues` the already decoded preferences (list, dict).
+        """
+        with self._lock:
+            self._remove(user_id)
+
+            slot = self._free.pop() if self._free else self._alloc()
+            bit = 1 << slot
+            keys = []
+
+            def add(mapping, key):
+                mapping[key] = mapping.get(key, 0) | bit
+                keys.append((mapping, key))
+
+            if not sports:
+                self._sports_all |= bit
+            elif NONE_MARKER not in sports:
+                for s in sports:
+                    add(self._by_sport, s)
+
+            for sport, allowed in (leagues or {}).items():
+                if not allowed:
+                    continue
+                add(self._league_restricted, sport)
+                if NONE_MARKER in allowed:
+                    continue
+                for league in allowed:
+                    name = league_key(league)
+                    add(self._by_league, (sport, name))
+                    self._league_names.setdefault(sport, set()).add(name)
+
+            exp = None
+            if expiration:
+                try:
+                    exp = datetime.strptime(expiration, "%Y-%m-%d %H:%M:%S")
+                except ValueError:
+                    exp = None
+
+            self._slots[user_id] = slot
+            self._users[slot] = (user_id, float(min_profit or 0), exp, bookies_mask or 0)
+            self._keys[slot] = keys
+            self._all |= bit
+
+    def remove(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+
+    def _alloc(self):
+        slot = self._next_slot
+        self._next_slot += 1
+        return slot
+
+    def _remove(self, user_id):
+        slot = self._slots.pop(user_id, None)
+        if slot is None:
+            return
+        clear = ~(1 << slot)
+        for mapping, key in self._keys.pop(slot):
+            if key not in mapping:
+                continue  # Same value listed twice in the user's prefs
+            remaining = mapping[key] & clear
+            if remaining:
+                mapping[key] = remaining
+            else:
+                del mapping[key]
+                if mapping is self._by_league:
+                    names = self._league_names.get(key[0])
+                    if names:
+                        names.discard(key[1])
+        self._sports_all &= clear
+        self._all &= clear
+        del self._users[slot]
+        self._free.append(slot)
+
+    # --- Lookup ---
+    def match(self, profit, sport, league, bookies_mask, now=None):
+        """
+        Returns the user_ids whose filters accept a bet with the given profit,
+        sport, league and bookies (surebets.bookies_mask of its legs).
+        """
+        now = now or datetime.now()
+        league_k = league_key(league)
+
+        with self._lock:
+            # Sports: unrestricted users plus those who picked this sport
+            candidates = self._sports_all | self._by_sport.get(sport, 0)
+
+            # Leagues: users restricting this sport must list a matching league
+            restricted = self._league_restricted.get(sport, 0)
+            if restricted & candidates:
+                allowed = 0
+                for name in self._league_names.get(sport, ()):
+                    if name in league_k or league_k in name:
+                        allowed |= self._by_league[(sport, name)]
+                candidates &= ~restricted | allowed
+
+            matched = []
+            for slot in _bits(candidates & self._all):
+                user_id, min_profit, exp, user_bookies = self._users[slot]
+                if exp is None or exp <= now:
+                    continue
+                if profit < min_profit:
+                    continue
+                # Bookies: the user must hold every bookie of the bet (one AND)
+                if not covers(user_bookies, bookies_mask):
+                    continue
+                matched.append(user_id)
+            return matched
@@ -0,0 +1,292 @@
+import os
+import logging
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# --- Pluggable surebets table parser ---
+# Every backend returns the same raw rows as the original BeautifulSoup code:
+#   {profit, league, event, markets, bookmakers[{name, odds}], start_time}
+# (all strings, text joined like get_text(strip=True)).
+#   "lxml"       - libxml2 tree + XPath expressions compiled once at import
+#   "selectolax" - lexbor C parser with CSS selectors (optional dependency)
+#   "bs4"        - the original html.parser + soupsieve code, always available
+# PARSER_BACKEND=auto picks the fastest one installed. bench_parser.py checks
+# that the fast paths give exactly the bs4 output and measures them.
+
+ROW_SELECTOR = 'table[role="table"] tbody[role="rowgroup"] tr[role="row"]'
+
+PARSER_BACKEND = os.environ.get("PARSER_BACKEND", "auto").strip().lower()
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+
+def _row(profit, league, event, markets, bookmakers, start_time):
+    return {
+        'profit': profit,
+        'league': league,
+        'event': event,
+        'markets': markets,
+        'bookmakers': bookmakers,
+        'start_time': start_time
+    }
+
+
+def _bookie_name(alt):
+    return alt.replace(' logo', '').strip()
+
+
+# --- bs4 (reference) ---
+def extract_rows_bs4(html):
+    """
+    Accepts the page HTML or an already built BeautifulSoup tree.
+    """
+    soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, 'html.parser')
+    rows = soup.select(ROW_SELECTOR)
+
+    raw_rows = []
+    logger.info(f"DEBUG: Parsing {len(rows)} rows...")
+
+    for i, row in enumerate(rows):
+        try:
+            # 1. Profit
+            profit_elem = row.select_one('td:nth-child(1) .text-green-500')
+            if not profit_elem:
+                logger.info(f"Row {i}: No profit element found. Skipping.")
+                continue
+            profit = profit_elem.get_text(strip=True).replace('%', '')
+
+            # 2. Event & League
+            event_td = row.select_one('td:nth-child(2)')
+            if not event_td:
+                logger.info(f"Row {i}: No event column. Skipping.")
+                continue
+
+            league_elem = event_td.select_one('.line-clamp-1')
+            league = league_elem.get_text(strip=True) if league_elem else "Unknown League"
+            event_elem = event_td.select_one('.font-bold')
+            event_name = event_elem.get_text(strip=True) if event_elem else "Unknown Event"
+
+            # 3. Markets (Bets)
+            market_td = row.select_one('td:nth-child(3)')
+            markets = [div.get_text(strip=True) for div in market_td.select('.line-clamp-2')] if market_td else []
+
+            # 4. Bookmakers & Odds
+            bookie_td = row.select_one('td:nth-child(4)')
+            # Use a more generic selector for bookie rows in the cell
+            bookie_rows = bookie_td.select('div.flex.items-center.gap-2') if bookie_td else []
+
+            bookmakers = []
+            for br in bookie_rows:
+                # The text is usually in a div with w-12 or just text-left
+                odds_div = br.select_one('div[class*="text-left"]')
+                odds = odds_div.get_text(strip=True) if odds_div else "0.0"
+
+                img = br.select_one('img')
+                name = "Unknown"
+                if img and 'alt' in img.attrs:
+                    name = _bookie_name(img['alt'])
+
+                bookmakers.append({'name': name, 'odds': odds})
+
+            if not bookmakers:
+                 logger.info(f"Row {i}: No bookmakers found. Skipping.")
+                 continue
+
+            # 5. Start Time
+            time_td = row.select_one('td:nth-child(5)')
+            start_time = time_td.get_text(strip=True) if time_td else ""
+
+            raw_rows.append(_row(profit, league, event_name, markets, bookmakers, start_time))
+
+        except Exception as e:
+            logger.error(f"Error parsing row: {e}")
+            continue
+
+    return raw_rows
+
+
+# --- lxml (compiled XPath) ---
+def _has_class(*names):
+    return " and ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {n} ')" for n in names)
+
+
+if lxml is not None:
+    _X_ROWS = etree.XPath("//table[@role='table']//tbody[@role='rowgroup']//tr[@role='row']")
+    # td:nth-child(N) = a td that is the Nth element child of its parent
+    _X_TD = {n: etree.XPath(f".//td[count(preceding-sibling::*) = {n - 1}]") for n in range(1, 6)}
+    _X_PROFIT = etree.XPath(f".//*[{_has_class('text-green-500')}]")
+    _X_LEAGUE = etree.XPath(f".//*[{_has_class('line-clamp-1')}]")
+    _X_EVENT = etree.XPath(f".//*[{_has_class('font-bold')}]")
+    _X_MARKETS = etree.XPath(f".//*[{_has_class('line-clamp-2')}]")
+    _X_BOOKIES = etree.XPath(f".//div[{_has_class('flex', 'items-center', 'gap-2')}]")
+    _X_ODDS = etree.XPath(".//div[contains(@class, 'text-left')]")
+    _X_IMG = etree.XPath(".//img")
+    _X_TEXT = etree.XPath(".//text()")
+
+
+def _lx_text(el):
+    return "".join(t.strip() for t in _X_TEXT(el))
+
+
+def _lx_first(xpath, el):
+    found = xpath(el)
+    return found[0] if found else None
+
+
+def extract_rows_lxml(html):
+    rows = _X_ROWS(lxml.html.fromstring(html))
+
+    raw_rows = []
+    logger.info(f"DEBUG: Parsing {len(rows)} rows...")
+
+    for i, row in enumerate(rows):
+        try:
+            profit_td = _lx_first(_X_TD[1], row)
+            profit_elem = _lx_first(_X_PROFIT, profit_td) if profit_td is not None else None
+            if profit_elem is None:
+                logger.info(f"Row {i}: No profit element found. Skipping.")
+                continue
+
+            event_td = _lx_first(_X_TD[2], row)
+            if event_td is None:
+                logger.info(f"Row {i}: No event column. Skipping.")
+                continue
+            league_elem = _lx_first(_X_LEAGUE, event_td)
+            event_elem = _lx_first(_X_EVENT, event_td)
+
+            market_td = _lx_first(_X_TD[3], row)
+            markets = [_lx_text(d) for d in _X_MARKETS(market_td)] if market_td is not None else []
+
+            bookie_td = _lx_first(_X_TD[4], row)
+            bookmakers = []
+            for br in (_X_BOOKIES(bookie_td) if bookie_td is not None else []):
+                odds_div = _lx_first(_X_ODDS, br)
+                img = _lx_first(_X_IMG, br)
+                alt = img.get('alt') if img is not None else None
+                bookmakers.append({
+                    'name': _bookie_name(alt) if alt is not None else "Unknown",
+                    'odds': _lx_text(odds_div) if odds_div is not None else "0.0"
+                })
+            if not bookmakers:
+                 logger.info(f"Row {i}: No bookmakers found. Skipping.")
+                 continue
+
+            time_td = _lx_first(_X_TD[5], row)
+            raw_rows.append(_row(
+                _lx_text(profit_elem).replace('%', ''),
+                _lx_text(league_elem) if league_elem is not None else "Unknown League",
+                _lx_text(event_elem) if event_elem is not None else "Unknown Event",
+                markets,
+                bookmakers,
+                _lx_text(time_td) if time_td is not None else ""
+            ))
+
+        except Exception as e:
+            logger.error(f"Error parsing row: {e}")
+            continue
+
+    return raw_rows
+
+
+# --- selectolax ---
+def _sx_text(node):
+    return node.text(deep=True, separator='', strip=True)
+
+
+def extract_rows_selectolax(html):
+    rows = HTMLParser(html).css(ROW_SELECTOR)
+
+    raw_rows = []
+    logger.info(f"DEBUG: Parsing {len(rows)} rows...")
+
+    for i, row in enumerate(rows):
+        try:
+            profit_elem = row.css_first('td:nth-child(1) .text-green-500')
+            if profit_elem is None:
+                logger.info(f"Row {i}: No profit element found. Skipping.")
+                continue
+
+            event_td = row.css_first('td:nth-child(2)')
+            if event_td is None:
+                logger.info(f"Row {i}: No event column. Skipping.")
+                continue
+            league_elem = event_td.css_first('.line-clamp-1')
+            event_elem = event_td.css_first('.font-bold')
+
+            market_td = row.css_first('td:nth-child(3)')
+            markets = [_sx_text(d) for d in market_td.css('.line-clamp-2')] if market_td is not None else []
+
+            bookie_td = row.css_first('td:nth-child(4)')
+            bookmakers = []
+            for br in (bookie_td.css('div.flex.items-center.gap-2') if bookie_td is not None else []):
+                odds_div = br.css_first('div[class*="text-left"]')
+                img = br.css_first('img')
+                alt = img.attributes.get('alt') if img is not None else None
+                bookmakers.append({
+                    'name': _bookie_name(alt) if alt is not None else "Unknown",
+                    'odds': _sx_text(odds_div) if odds_div is not None else "0.0"
+                })
+            if not bookmakers:
+                 logger.info(f"Row {i}: No bookmakers found. Skipping.")
+                 continue
+
+            time_td = row.css_first('td:nth-child(5)')
+            raw_rows.append(_row(
+                _sx_text(profit_elem).replace('%', ''),
+                _sx_text(league_elem) if league_elem is not None else "Unknown League",
+                _sx_text(event_elem) if event_elem is not None else "Unknown Event",
+                markets,
+                bookmakers,
+                _sx_text(time_td) if time_td is not None else ""
+            ))
+
+        except Exception as e:
+            logger.error(f"Error parsing row: {e}")
+            continue
+
+    return raw_rows
+
+
+# --- Backend selection ---
+BACKENDS = {"bs4": extract_rows_bs4}
+if lxml is not None:
+    BACKENDS["lxml"] = extract_rows_lxml
+if HTMLParser is not None:
+    BACKENDS["selectolax"] = extract_rows_selectolax
+
+_PREFERENCE = ("selectolax", "lxml", "bs4")
+
+
+def get_backend(name=None):
+    """
+    Returns (name, extract_rows function). Unknown or missing backends fall
+    back to bs4.
+    """
+    name = (name or PARSER_BACKEND).lower()
+    if name == "auto":
+        name = next(n for n in _PREFERENCE if n in BACKENDS)
+    if name not in BACKENDS:
+        logger.warning(f"⚠️ Parser backend '{name}' not available, using bs4.")
+        name = "bs4"
+    return name, BACKENDS[name]
+
+
+def extract_rows(html, backend=None):
+    """
+    Pulls the raw cell values out of every surebet row. A BeautifulSoup tree
+    is always parsed with the bs4 backend.
+    """
+    if isinstance(html, BeautifulSoup):
+        return extract_rows_bs4(html)
+    return get_backend(backend)[1](html)
@@ -0,0 +1,211 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+
+from telegram.error import RetryAfter, TimedOut, NetworkError, Forbidden, BadRequest
+
+from rate_limit import TokenBucket
+from metrics import SEND_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# --- Alert Dispatcher ---
+# Sends per-user alerts through a bounded pool of concurrent workers while
+# staying under Telegram's limits: ~30 msg/s globally per bot and ~1 msg/s
+# per chat. Highest-priority (highest-profit) alerts leave the queue first.
+# Producers can tag a message with a key (e.g. (user, bet)): a key already
+# queued or in flight is not queued again, and `on_result(job, ok)` is awaited
+# once the message is finally sent (job gets 'latency' and 'message_id') or
+# given up. `wait_for_room()` lets the
+# producer stop reading new work while the backlog is too large.
+
+GLOBAL_RATE = 25          # msg/s, a bit under Telegram's ~30 to leave headroom
+PER_CHAT_INTERVAL = 1.0   # seconds between two messages to the same chat
+WORKERS = 8
+MAX_RETRIES = 3
+LATENCY_SAMPLES = 1000
+
+
+def _seconds(value):
+    # RetryAfter.retry_after is an int or a timedelta depending on the PTB version
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class AlertDispatcher:
+    def __init__(self, bot, workers=WORKERS, global_rate=GLOBAL_RATE,
+                 per_chat_interval=PER_CHAT_INTERVAL, max_retries=MAX_RETRIES, on_result=None):
+        self.bot = bot
+        self.workers = workers
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.on_result = on_result
+
+        self._bucket = TokenBucket(global_rate)
+        self._queue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._chat_next = {}  # chat_id -> monotonic time of the next allowed send
+        self._tasks = []
+        self._keys = set()  # Keys queued or in flight
+        self._pending = 0   # Submitted messages not sent or given up yet
+        self._room = asyncio.Condition()
+
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"📨 Alert dispatcher started with {self.workers} workers.")
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        await self._queue.join()
+
+    # --- Producer side ---
+    def submit(self, chat_id, text, priority=0.0, key=None, context=None, **kwargs):
+        """
+        Queues one message. Higher `priority` is sent first; ties keep FIFO order.
+        Returns False if a message with the same `key` is already pending.
+        `context` is handed back untouched in job['context'] to on_result.
+        Extra kwargs go straight to bot.send_message.
+        """
+        if key is not None:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+        job = {
+            'chat_id': chat_id,
+            'text': text,
+            'key': key,
+            'context': context,
+            'kwargs': kwargs,
+            'queued_at': time.monotonic(),
+            'attempt': 0
+        }
+        self._pending += 1
+        self._queue.put_nowait((-priority, next(self._seq), job))
+        return True
+
+    async def wait_for_room(self, max_pending):
+        """
+        Back-pressure: returns once at most `max_pending` messages are unfinished.
+        """
+        async with self._room:
+            await self._room.wait_for(lambda: self._pending <= max_pending)
+
+    # --- Workers ---
+    async def _wait_for_chat(self, chat_id):
+        now = time.monotonic()
+        ready_at = self._chat_next.get(chat_id, 0.0)
+        self._chat_next[chat_id] = max(now, ready_at) + self.per_chat_interval
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+    async def _worker(self, n):
+        while True:
+            prio, seq, job = await self._queue.get()
+            try:
+                ok = await self._send(prio, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Failed to send to {job['chat_id']}: {e}")
+                ok = False
+            finally:
+                self._queue.task_done()
+            if ok is not None:
+                await self._finish(job, ok)
+
+    async def _finish(self, job, ok):
+        self._keys.discard(job['key'])
+        self._pending -= 1
+        if self.on_result:
+            try:
+                await self.on_result(job, ok)
+            except Exception as e:
+                logger.error(f"Delivery callback failed for {job['chat_id']}: {e}")
+        async with self._room:
+            self._room.notify_all()
+
+    async def _send(self, prio, job):
+        # True = sent, False = given up, None = queued again for a retry
+        chat_id = job['chat_id']
+        await self._wait_for_chat(chat_id)
+        await self._bucket.acquire()
+        try:
+            with SEND_SECONDS.time(sender="dispatcher"):
+                msg = await self.bot.send_message(chat_id=chat_id, text=job['text'], **job['kwargs'])
+        except RetryAfter as e:
+            wait = _seconds(e.retry_after)
+            logger.warning(f"⏳ Flood control: pausing sends for {wait:.0f}s")
+            self._bucket.pause(wait)
+            self._retry(prio, job)
+            return None
+        except (Forbidden, BadRequest) as e:
+            # Blocked bot / deleted chat: retrying won't help
+            self.failed += 1
+            logger.warning(f"Failed to send to {chat_id}: {e}")
+            return False
+        except (TimedOut, NetworkError) as e:
+            if job['attempt'] >= self.max_retries:
+                raise
+            backoff = 2 ** job['attempt']
+            logger.warning(f"Send to {chat_id} failed ({e}), retrying in {backoff}s")
+            await asyncio.sleep(backoff)
+            self._retry(prio, job)
+            return None
+
+        self.sent += 1
+        job['latency'] = time.monotonic() - job['queued_at']
+        job['message_id'] = getattr(msg, 'message_id', None)
+        self._latencies.append(job['latency'])
+
+        # Keep the per-chat table from growing forever
+        if len(self._chat_next) > 10000:
+            now = time.monotonic()
+            self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+        return True
+
+    def _retry(self, prio, job):
+        job['attempt'] += 1
+        self.retried += 1
+        self._queue.put_nowait((prio, next(self._seq), job))
+
+    # --- Metrics ---
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        lat = sorted(self._latencies)
+
+        def pct(p):
+            if not lat:
+                return 0.0
+            return lat[min(len(lat) - 1, int(p * len(lat)))]
+
+        return {
+            'queue_depth': self.queue_depth(),
+            'pending': self._pending,
+            'workers': len(self._tasks),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'latency_p50': pct(0.50),
+            'latency_p95': pct(0.95),
+            'latency_max': lat[-1] if lat else 0.0
+        }
@@ -0,0 +1,11 @@
+import pytest
+
+import database as db
+
+
+@pytest.fixture
+def memory_db(monkeypatch):
+    # An empty in-memory surebets.db for this thread (database.get_connection reconnects on a new DB_NAME)
+    monkeypatch.setattr(db, "DB_NAME", ":memory:")
+    yield db.get_connection()
+    db.close_all()
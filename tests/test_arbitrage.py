@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+import pytest
+
+import arbitrage
+from arbitrage import evaluate, evaluate_bets, profit_percentage, parse_odds, profit_label
+
+
+def test_parse_odds():
+    assert parse_odds("2,10") == 2.1
+    assert parse_odds("@2.1") == 2.1
+    assert parse_odds(3) == 3.0
+    assert math.isnan(parse_odds("-"))
+
+
+def test_profit_percentage_two_and_three_legs():
+    assert profit_percentage([2.1, 2.1]) == pytest.approx(5.0)
+    assert profit_percentage([3.3, 3.4, 3.5]) == pytest.approx((1 / (1 / 3.3 + 1 / 3.4 + 1 / 3.5) - 1) * 100)
+
+
+@pytest.mark.parametrize("odds", [
+    [2.1, float("nan")],
+    [float("nan"), 2.1],
+    [2.1, float("inf")],
+    [2.1, parse_odds("-")],
+    [2.1, 1.0],
+    [2.1, "x"],
+    [2.1],
+])
+def test_profit_percentage_rejects_invalid_odds(odds):
+    assert profit_percentage(odds) is None
+
+
+def test_commission_lowers_exchange_odds():
+    plain = profit_percentage([2.05, 2.0])
+    with_commission = profit_percentage([2.05, 2.0], [0.0, 0.05])
+    assert with_commission < plain
+    assert with_commission == pytest.approx((1 / (1 / 2.05 + 1 / 1.95) - 1) * 100)
+
+
+def test_evaluate_matches_scalar_profit_and_splits_stakes():
+    arb = evaluate([[2.1, 2.05, np.nan], [3.3, 3.4, 3.5]], bankroll=100, rounding=0)
+    assert arb.profit[0] == pytest.approx(profit_percentage([2.1, 2.05]))
+    assert arb.profit[1] == pytest.approx(profit_percentage([3.3, 3.4, 3.5]))
+    assert np.nansum(arb.split, axis=1) == pytest.approx([1.0, 1.0])
+    # Same return on every leg
+    returns = arb.stakes[1] * np.array([3.3, 3.4, 3.5])
+    assert returns == pytest.approx(np.full(3, returns[0]))
+    assert arb.rounded_profit == pytest.approx(arb.profit)
+
+
+def test_evaluate_rejects_non_finite_and_short_bets():
+    arb = evaluate([[2.1, np.inf], [2.1, 0.9], [2.1, np.nan]])
+    assert np.isnan(arb.profit).all()
+    assert np.isnan(arb.stakes).all()
+
+
+def test_rounded_stakes_report_the_guaranteed_profit():
+    arb = evaluate([[2.1, 2.05]], bankroll=100, rounding=1)
+    assert arb.stakes[0].tolist() == [49.0, 51.0]
+    assert arb.rounded_profit[0] == pytest.approx((min(49 * 2.1, 51 * 2.05) / 100 - 1) * 100)
+
+
+def test_evaluate_bets_marks_unreadable_legs():
+    bets = [
+        {'bets': [{'odds': '2.10', 'bookie': 'bet365'}, {'odds': '2.05', 'bookie': 'bwin'}]},
+        {'bets': [{'odds': '2.10', 'bookie': 'bet365'}, {'odds': '-', 'bookie': 'bwin'}]},
+    ]
+    good, bad = evaluate_bets(bets)
+    assert good['profit'] == pytest.approx(3.73, abs=0.01)
+    assert good['stakes'] == [49.0, 51.0]
+    assert bad == {"profit": None, "stake_pct": [], "stakes": [], "rounded_profit": None}
+
+
+def test_exchange_commission_applies_by_bookie(monkeypatch):
+    monkeypatch.setitem(arbitrage.COMMISSIONS, "betfair exchange", 0.05)
+    bets = [{'legs': [{'odds': 2.05, 'bookie': 'Bet365'}, {'odds': 2.0, 'bookie': 'Betfair Exchange'}]}]
+    assert evaluate_bets(bets, legs_key='legs')[0]['profit'] == pytest.approx(-0.06, abs=0.01)
+
+
+def test_profit_label():
+    arb = {'profit': 3.73, 'rounded_profit': 2.9}
+    assert profit_label(3.2, arb) == "3.73% (2.90% con los stakes indicados) (fuente: 3.2%)"
+    assert profit_label("3.73", {'profit': 3.73, 'rounded_profit': 3.73}) == "3.73%"
+    assert profit_label("3.2", {'profit': None}) == "3.2%"
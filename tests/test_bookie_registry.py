@@ -0,0 +1,52 @@
+import pytest
+
+from bookie_registry import (ALL_MASK, KNOWN_BOOKIES, UNKNOWN, bookie_id, canonical_name, covers,
+                             legs_mask, mask_of, user_mask)
+
+
+@pytest.mark.parametrize("name, canonical", [
+    ("bet365", "bet365"),
+    ("Bet365 ES", "bet365"),
+    ("Bet 365", "bet365"),
+    ("bwin.es", "bwin"),
+    ("Betway Sports", "Betway"),
+    ("Pastón", "Pastón"),
+    ("paston", "Pastón"),
+    ("888", "888sport"),
+    ("Marathon", "Marathonbet"),
+    ("Betfair Exchange", "betfair exchange"),
+    ("Betfair Ex", "betfair exchange"),
+    ("Betfair", "betfair"),
+    ("Betfair Sportsbook", "betfair"),
+    ("William Hill ES", "William Hill"),
+])
+def test_aliases_map_to_one_registry_entry(name, canonical):
+    assert KNOWN_BOOKIES[bookie_id(name)] == canonical
+    assert canonical_name(name) == canonical
+
+
+@pytest.mark.parametrize("name", ["Some New Bookie", "bet", "exchange", "", None])
+def test_unknown_names(name):
+    assert bookie_id(name) is None
+    assert mask_of([name]) == UNKNOWN
+
+
+def test_ids_are_positions_and_bits():
+    for i, name in enumerate(KNOWN_BOOKIES):
+        assert bookie_id(name) == i
+        assert mask_of([name]) == 1 << i
+    assert bookie_id("betfair") != bookie_id("betfair exchange")
+    assert ALL_MASK == (1 << len(KNOWN_BOOKIES)) - 1
+    assert not UNKNOWN & ALL_MASK
+
+
+def test_masks_and_covers():
+    bet = legs_mask([{'bookie': 'Bet365 ES'}, {'bookie': 'bwin'}])
+    assert bet == mask_of(["bet365", "bwin"])
+    assert covers(user_mask(["bet365", "bwin", "Codere"]), bet)
+    assert not covers(user_mask(["bet365"]), bet)
+    assert covers(user_mask('ALL'), bet)
+    # A bet with an unregistered bookie is covered by nobody, not even 'ALL'
+    assert not covers(user_mask('ALL'), bet | UNKNOWN)
+    # Unregistered names in a user's list are ignored
+    assert user_mask(["bet365", "Some New Bookie"]) == mask_of(["bet365"])
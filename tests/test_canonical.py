@@ -0,0 +1,93 @@
+import pytest
+
+from canonical import NameIndex, TEAM_ALIASES, market_key, surebet_key
+
+
+@pytest.fixture
+def teams():
+    return NameIndex(TEAM_ALIASES)
+
+
+def _event(teams, event):
+    home, away = event.split(" vs ")
+    return teams.resolve(home), teams.resolve(away)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Real Madrid vs Barcelona", "Real Madrid B vs Barcelona B"),
+    ("Real Madrid B vs Barcelona B", "Real Madrid vs Barcelona"),
+    ("Barcelona vs Espanyol", "Barcelona W vs Espanyol W"),
+    ("Barcelona W vs Espanyol W", "Barcelona vs Espanyol"),
+    ("Spain vs Italy", "Spain U21 vs Italy U21"),
+    ("Spain U19 vs Italy U19", "Spain U21 vs Italy U21"),
+    ("Boca Juniors vs River Plate", "Boca Juniors Reserves vs River Plate Reserves"),
+    ("Sevilla Atletico vs Malaga", "Sevilla Atletico II vs Malaga II"),
+])
+def test_qualifiers_block_fuzzy_merge(teams, first, second):
+    seen_first = _event(teams, first)
+    assert _event(teams, second) != seen_first
+    # Learning the second team did not take over the first one
+    assert _event(teams, first) == seen_first
+
+
+def test_qualifier_spellings_still_merge(teams):
+    assert teams.resolve("Barcelona Women") == teams.resolve("FC Barcelona Femenino")
+    assert teams.resolve("Spain U-21") == teams.resolve("Spain U21")
+    assert teams.resolve("Real Madrid B") == teams.resolve("Real Madrid  B.")
+
+
+def test_fuzzy_and_initials_without_qualifiers(teams):
+    assert teams.resolve("Atlético de Madrid") == "atletico madrid"
+    assert teams.resolve("Carlos Alcaraz") == teams.resolve("C. Alcaraz")
+
+
+def test_market_units_are_kept():
+    assert market_key("Over 4.5 corners") != market_key("Over 4.5 goals")
+    assert market_key("Más de 4,5 córneres") == market_key("Over 4.5 corners")
+    assert market_key("Menos de 2.5 goles") == market_key("Under 2.5 goals")
+
+
+@pytest.mark.parametrize("a, b", [
+    ("o2.5", "Over 2.5"),
+    ("over2.5", "O 2.5"),
+    ("u3.5 goals", "Under 3.5goals"),
+    ("AH-1.5", "Hándicap asiático -1.5"),
+])
+def test_market_line_spacing(a, b):
+    assert market_key(a) == market_key(b)
+
+
+def test_surebet_key_tracks_odds():
+    legs = [{'market': 'Over 2.5 goals', 'bookie': 'Bet365', 'odds': '2,10'},
+            {'market': 'Under 2.5 goals', 'bookie': 'bwin', 'odds': '2.05'}]
+    same = [{'market': 'Menos de 2.5 goles', 'bookie': 'bwin.es', 'odds': 2.05},
+            {'market': 'Más de 2.5 goles', 'bookie': 'bet365', 'odds': '2.1'}]
+    better = [dict(legs[0], odds='2.20'), legs[1]]
+    assert surebet_key("Athletic Club - Atl. Madrid", legs) == surebet_key("Athletic Bilbao vs Atletico de Madrid", same)
+    assert surebet_key("Athletic Club - Atl. Madrid", legs) != surebet_key("Athletic Club - Atl. Madrid", better)
+
+
+def test_learned_names_are_bounded():
+    teams = NameIndex(TEAM_ALIASES, max_learned=50)
+    pinned = len(teams)
+    for i in range(500):
+        teams.resolve(f"Team {i:03d} Zqx{i}")
+        teams.resolve(f"Team {i:03d} Zqx{i} FC.")
+    assert len(teams) <= pinned + 50
+    assert len(teams._learned) <= 50
+    assert len(teams._aliases) <= pinned + sum(map(len, TEAM_ALIASES.values())) + 50
+    grams = set().union(*teams._grams.values())
+    assert grams == set(teams._sizes)
+    # Alias tables are never evicted, recent names still resolve to themselves
+    assert teams.resolve("Atl. Madrid") == "atletico madrid"
+    assert teams.resolve("Team 499 Zqx499") == "team 499 zqx499"
+
+
+def test_evicted_name_is_learned_again():
+    teams = NameIndex(max_learned=2)
+    assert teams.resolve("Alpha United") == "alpha united"
+    teams.resolve("Bravo Rovers")
+    teams.resolve("Charlie Town")
+    assert "alpha united" not in teams._sizes
+    assert teams.resolve("Alpha United") == "alpha united"
+    assert "alpha united" in teams._sizes
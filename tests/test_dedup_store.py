@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+
+import dedup_store
+import migrations
+from dedup_store import DedupStore, make_key, parse_start_time
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2026-10-20T18:30:00Z", datetime(2026, 10, 20, 18, 30)),
+    ("Tomorrow at 18:00", datetime(2026, 10, 19, 18, 0)),
+    ("Hoy 21:00", datetime(2026, 10, 18, 21, 0)),
+    ("In 15 minutes", datetime(2026, 10, 18, 12, 15)),
+    ("in 2 h", datetime(2026, 10, 18, 14, 0)),
+    ("20/10 21:00", datetime(2026, 10, 20, 21, 0)),
+    ("06/01 20:00", datetime(2027, 1, 6, 20, 0)),  # Early January seen in October: next year
+    ("21:00", datetime(2026, 10, 18, 21, 0)),
+    ("25:99", None),
+    ("", None),
+])
+def test_parse_start_time(text, expected):
+    assert parse_start_time(text, NOW) == expected
+
+
+def test_make_key_is_a_signed_64_bit_int():
+    key = make_key("A - B", 3.2, "2.10")
+    assert key == make_key("A - B", 3.2, "2.10")
+    assert key != make_key("A - B", 3.2, "2.15")
+    assert -2 ** 63 <= key < 2 ** 63
+
+
+def test_check_and_add():
+    store = DedupStore("t")
+    assert store.check_and_add(1)
+    assert not store.check_and_add(1)
+    assert 1 in store and 2 not in store
+
+
+def test_keys_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(dedup_store.time, "time", lambda: clock[0])
+    store = DedupStore("t", default_ttl=60)
+    store.add(1)
+    clock[0] += 59
+    assert store.seen(1)
+    clock[0] += 2
+    assert not store.seen(1)
+    assert len(store) == 0  # Dropped on read
+    assert store.check_and_add(1)
+
+
+def test_expiry_follows_the_start_time(monkeypatch):
+    store = DedupStore("t", default_ttl=60)
+    start = datetime(2030, 1, 1, 20, 0)
+    assert store.expiry_for(start.isoformat()) == start.timestamp() + dedup_store.AFTER_START_GRACE
+    # Already started long ago: still kept a minute, never expired on arrival
+    monkeypatch.setattr(dedup_store.time, "time", lambda: start.timestamp() + 10 * 3600)
+    assert store.expiry_for(start.isoformat()) == start.timestamp() + 10 * 3600 + 60
+
+
+def test_oldest_keys_are_evicted_past_max_entries():
+    store = DedupStore("t", max_entries=3)
+    for key in range(5):
+        store.add(key)
+    assert len(store) == 3
+    assert [k for k in range(5) if k in store] == [2, 3, 4]
+    store.add(2)  # Re-adding refreshes its age
+    store.add(5)
+    assert [k for k in range(6) if k in store] == [2, 4, 5]
+
+
+def test_periodic_purge(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(dedup_store.time, "time", lambda: clock[0])
+    monkeypatch.setattr(dedup_store, "PURGE_EVERY", 10)
+    store = DedupStore("t", default_ttl=60)
+    for key in range(5):
+        store.add(key)
+    clock[0] += 120
+    for key in range(5, 10):
+        store.add(key)  # 10th add sweeps the 5 expired keys without reading them
+    assert len(store) == 5
+
+
+def test_persisted_keys_survive_a_restart(memory_db, monkeypatch):
+    migrations.migrate()
+    clock = [1000.0]
+    monkeypatch.setattr(dedup_store.time, "time", lambda: clock[0])
+    store = DedupStore("scraper", persist=True, default_ttl=60)
+    assert store.check_and_add(1)
+    store.add(2)
+    DedupStore("other", persist=True).add(3)
+
+    clock[0] += 30
+    restarted = DedupStore("scraper", persist=True, default_ttl=60)
+    assert 1 in restarted and 2 in restarted
+    assert 3 not in restarted  # Own namespace only
+    assert not restarted.check_and_add(1)
+
+    clock[0] += 60
+    assert 1 not in DedupStore("scraper", persist=True)
+    rows = memory_db.execute("SELECT COUNT(*) FROM seen_bets WHERE namespace = 'scraper'").fetchone()[0]
+    assert rows == 0  # Expired rows deleted when a store loads
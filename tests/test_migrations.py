@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+import migrations
+from bookie_registry import ALL_MASK, mask_of, UNKNOWN
+
+# Schema as the baseline scraper and bot created it, before migrations.py existed
+BASELINE = '''
+    CREATE TABLE surebets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        event TEXT,
+        league TEXT,
+        profit REAL,
+        bookies_json TEXT,
+        raw_id TEXT UNIQUE
+    );
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER UNIQUE,
+        min_profit REAL DEFAULT 1.0,
+        bookies TEXT DEFAULT '[]',
+        sports TEXT DEFAULT '[]',
+        leagues TEXT DEFAULT '{}',
+        active INTEGER DEFAULT 1,
+        expiration_date TEXT DEFAULT NULL
+    );
+'''
+
+LEGS = [{'market': 'Over 2.5', 'bookie': 'Bet365', 'odds': '2,10'},
+        {'market': 'Under 2.5', 'bookie': 'Some New Bookie', 'odds': '2.05'}]
+
+
+@pytest.fixture
+def baseline_db(memory_db):
+    memory_db.executescript(BASELINE)
+    rows = [
+        ("Real Madrid - Barcelona", "Spain - LaLiga", 3.2, json.dumps(LEGS), "a"),
+        ("Real Madrid - Barcelona", "Spain - LaLiga", 3.2, json.dumps(LEGS), "b"),  # Same content
+        ("Duke - UNC", "NCAA Basketball", 1.5, json.dumps(LEGS[:1]), "c"),
+        ("Alabama - Auburn", "NCAA Football", 2.0, "not json", "d"),
+    ]
+    memory_db.executemany("INSERT INTO surebets (event, league, profit, bookies_json, raw_id) VALUES (?, ?, ?, ?, ?)", rows)
+    memory_db.executemany("INSERT INTO users (user_id, bookies) VALUES (?, ?)",
+                          [(1, '["bet365", "bwin"]'), (2, 'ALL'), (3, 'broken')])
+    memory_db.commit()
+    return memory_db
+
+
+def _schema(conn):
+    return sorted(tuple(row) for row in conn.execute("SELECT type, name, sql FROM sqlite_master"))
+
+
+def _data(conn):
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+    return {t: sorted(map(tuple, conn.execute(f"SELECT * FROM {t}"))) for t in tables if t != "sqlite_stat1"}
+
+
+def test_migrates_a_baseline_db(baseline_db):
+    assert migrations.migrate() == migrations.SCHEMA_VERSION
+    assert migrations.current_version() == migrations.SCHEMA_VERSION
+
+    rows = {r['raw_id']: r for r in baseline_db.execute("SELECT * FROM surebets")}
+    # v2: content hash (older duplicate keeps NULL so the unique index builds), odds summary
+    assert rows["a"]["content_hash"] == migrations.bet_signature("Real Madrid - Barcelona", 3.2, "2,10")
+    assert rows["b"]["content_hash"] is None
+    assert rows["a"]["leg_count"] == 2
+    assert rows["a"]["implied_prob"] == pytest.approx(1 / 2.1 + 1 / 2.05)
+    assert rows["d"]["leg_count"] == 0
+    # v4: legs in their own table
+    legs = migrations.fetch_legs(baseline_db, rows["a"]["id"], rows["a"]["id"])
+    assert [leg['bookie'] for leg in legs[rows["a"]["id"]]] == ["Bet365", "Some New Bookie"]
+    # v7 + v9: sport classified once
+    assert rows["a"]["sport"] == "Soccer"
+    assert rows["c"]["sport"] == "Basketball"
+    assert rows["d"]["sport"] == "American Football"
+    # v8: bookie masks
+    assert rows["a"]["bookies_mask"] == mask_of(["bet365"]) | UNKNOWN
+    masks = dict(baseline_db.execute("SELECT user_id, bookies_mask FROM users").fetchall())
+    assert masks == {1: mask_of(["bet365", "bwin"]), 2: ALL_MASK, 3: 0}
+
+
+def test_migrate_is_idempotent(baseline_db):
+    migrations.migrate()
+    schema, data = _schema(baseline_db), _data(baseline_db)
+    assert migrations.migrate() == migrations.SCHEMA_VERSION
+    # Re-running every step on a migrated DB (user_version reset) changes nothing either
+    baseline_db.execute("PRAGMA user_version = 0")
+    assert migrations.migrate() == migrations.SCHEMA_VERSION
+    assert _schema(baseline_db) == schema
+    assert _data(baseline_db) == data
+
+
+def test_migrates_an_empty_db(memory_db):
+    assert migrations.migrate() == migrations.SCHEMA_VERSION
+    tables = {row[0] for row in memory_db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"surebets", "users", "user_bets", "bot_state", "seen_bets", "bookies",
+            "surebet_legs", "deliveries"} <= tables
@@ -0,0 +1,105 @@
+import pytest
+
+import arbitrage
+import odds_validator
+from odds_validator import CHANGED, DEAD, NO_EDGE, OK, OddsBook, should_drop, warning_line
+
+T0 = 1_000_000.0
+EVENT = "Real Madrid vs Barcelona"
+LEGS = [{'market': 'Over 2.5 goals', 'bookie': 'Bet365', 'odds': '2.10'},
+        {'market': 'Under 2.5 goals', 'bookie': 'bwin', 'odds': '2.10'}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [T0]
+    monkeypatch.setattr(odds_validator.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def book(clock):
+    return OddsBook(ttl=900)
+
+
+def test_ok_when_nothing_newer(book):
+    v = book.validate(EVENT, LEGS, T0)
+    assert v.status == OK and v.changed == []
+    assert v.profit == pytest.approx(5.0)
+
+
+def test_changed_when_a_leg_moved_but_the_edge_holds(book, clock):
+    clock[0] += 10
+    book.observe("Real Madrid - Barcelona", [{'market': 'Más de 2,5 goles', 'bookie': 'bet365', 'odds': '2.20'}], "tg:1")
+    v = book.validate(EVENT, LEGS, T0)
+    assert v.status == CHANGED
+    assert v.changed == [(0, 2.1, 2.2, "tg:1")]
+    assert v.profit == pytest.approx((1 / (1 / 2.2 + 1 / 2.1) - 1) * 100)
+
+
+def test_dead_when_a_moved_leg_kills_the_edge(book, clock):
+    clock[0] += 10
+    book.observe(EVENT, [dict(LEGS[1], odds='1.80')], "bethero")
+    v = book.validate(EVENT, LEGS, T0)
+    assert v.status == DEAD
+    assert v.profit < 0
+
+
+def test_no_edge_without_changes_is_not_dead(book, monkeypatch):
+    # Exchange commission eats the edge, but nothing moved: flagged, never "odds changed"
+    monkeypatch.setitem(arbitrage.COMMISSIONS, "betfair exchange", 0.05)
+    legs = [{'market': '1', 'bookie': 'Bet365', 'odds': '2.05'},
+            {'market': '2', 'bookie': 'Betfair Exchange', 'odds': '2.00'}]
+    v = book.validate(EVENT, legs, T0)
+    assert v.status == NO_EDGE and v.changed == []
+    assert not should_drop(v)
+
+
+def test_unreadable_odds_are_ok_not_nan(book):
+    legs = [LEGS[0], dict(LEGS[1], odds='-')]
+    v = book.validate(EVENT, legs, T0)
+    assert v.status == OK and v.profit is None
+    assert warning_line(v) == ""
+
+
+def test_older_or_expired_observations_are_ignored(book, clock):
+    book.observe(EVENT, [dict(LEGS[0], odds='1.50')], "old", T0 - 5)  # Before the alert
+    assert book.validate(EVENT, LEGS, T0).status == OK
+    book.observe(EVENT, [dict(LEGS[0], odds='1.50')], "new", T0 + 5)
+    book.observe(EVENT, [dict(LEGS[0], odds='2.50')], "older", T0 + 1)  # Never replaces a newer one
+    assert book.latest(EVENT, LEGS[0])[0] == 1.5
+    clock[0] = T0 + 5 + 901
+    assert book.latest(EVENT, LEGS[0]) is None
+    assert book.validate(EVENT, LEGS, T0).status == OK
+
+
+def test_check_records_after_validating(book, clock):
+    assert book.check(EVENT, LEGS, "tg:1", T0).status == OK
+    moved = [dict(LEGS[0], odds='1.50'), LEGS[1]]
+    assert book.check(EVENT, moved, "tg:2", T0 + 1).status == NO_EDGE  # Its own odds, nothing newer
+    assert book.validate(EVENT, LEGS, T0).status == DEAD
+
+
+def test_prune_bounds_the_book(clock):
+    book = OddsBook(ttl=900, max_entries=5)
+    for i in range(20):
+        book.observe(f"Team {i} vs Other {i}", LEGS[:1], "bethero", T0 + i)
+    assert len(book) <= 5
+
+
+@pytest.mark.parametrize("mode, status, dropped", [
+    ("drop", DEAD, True), ("drop", NO_EDGE, False), ("flag", DEAD, False), ("off", DEAD, False),
+])
+def test_should_drop(monkeypatch, mode, status, dropped):
+    monkeypatch.setattr(odds_validator, "ODDS_VALIDATION", mode)
+    assert should_drop(odds_validator.Verdict(status, -1.0, [])) is dropped
+
+
+def test_warning_lines(monkeypatch):
+    Verdict = odds_validator.Verdict
+    assert warning_line(Verdict(OK, 5.0, [])) == ""
+    assert "CUOTAS CAMBIADAS" in warning_line(Verdict(DEAD, -3.0, [(0, 2.1, 1.8, "x")]))
+    assert warning_line(Verdict(CHANGED, 7.4419, [(0, 2.1, 2.2, "x")])) == "⚠️ Cuotas actualizadas: profit actual 7.44%"
+    assert warning_line(Verdict(NO_EDGE, -0.0625, [])) == "⚠️ Beneficio tras comisiones: -0.06%"
+    monkeypatch.setattr(odds_validator, "ODDS_VALIDATION", "off")
+    assert warning_line(Verdict(DEAD, -3.0, [])) == ""
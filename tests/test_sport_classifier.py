@@ -0,0 +1,50 @@
+import pytest
+
+from sport_classifier import OTHER, bet_sport, classify_sport, sport_emoji
+
+
+@pytest.mark.parametrize("league, event, sport", [
+    ("Spain - LaLiga", "Real Madrid - Barcelona", "Soccer"),
+    ("NBA", "Lakers @ Celtics", "Basketball"),
+    ("ATP Shanghai", "C. Alcaraz - J. Sinner", "Tennis"),
+    ("Rugby League", "", "Rugby"),
+    ("NRL", "Storm vs Broncos", "Rugby"),
+    ("Table Tennis Pro League", "", "Table Tennis"),
+    ("American Football", "", "American Football"),
+    ("Esports - LoL", "T1 vs Gen.G", "e-Sports"),
+    ("DFB-Pokal", "Bayern - Mainz", "Soccer"),
+    # NCAA: the sport comes from the explicit term, bare NCAA tells nothing
+    ("NCAA Football", "Alabama vs Auburn", "American Football"),
+    ("NCAAF", "", "American Football"),
+    ("NCAA Basketball", "Duke vs UNC", "Basketball"),
+    ("NCAAB", "", "Basketball"),
+    ("NCAA Baseball", "", "Baseball"),
+    ("NCAA", "Duke vs UNC", OTHER),
+])
+def test_classify_sport(league, event, sport):
+    assert classify_sport(league, event) == sport
+
+
+@pytest.mark.parametrize("league, event", [
+    ("Copenhagen Cup", "FC Copenhagen - Brondby"),   # "open" is not a keyword
+    ("Contest", "A vs B"),                          # nor "test"
+    ("Union Berlin", ""),                           # nor "union"
+    ("", ""),
+])
+def test_whole_words_only(league, event):
+    assert classify_sport(league, event) == OTHER
+
+
+def test_league_wins_over_event_text():
+    # Leftmost match in "league event"
+    assert classify_sport("NBA", "Football Club vs Other") == "Basketball"
+
+
+def test_bet_sport_prefers_the_stored_sport():
+    assert bet_sport({'sport': 'Tennis', 'league': 'NBA', 'event': ''}) == "Tennis"
+    assert bet_sport({'sport': None, 'league': 'NBA', 'event': ''}) == "Basketball"
+
+
+def test_sport_emoji():
+    assert sport_emoji("Soccer") == "⚽"
+    assert sport_emoji(OTHER) == "🏆"
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+
+from bookie_registry import ALL_MASK, mask_of
+from subscriber_index import NONE_MARKER, SubscriberIndex
+
+ACTIVE = "2099-01-01 00:00:00"
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+BET_BOOKIES = mask_of(["bet365", "bwin"])
+
+
+@pytest.fixture
+def index():
+    ix = SubscriberIndex()
+    ix.upsert(1, 0, ALL_MASK, [], {}, ACTIVE)                                  # everything
+    ix.upsert(2, 5, ALL_MASK, [], {}, ACTIVE)                                  # min profit 5%
+    ix.upsert(3, 0, ALL_MASK, ["Tennis"], {}, ACTIVE)                          # tennis only
+    ix.upsert(4, 0, ALL_MASK, ["Soccer"], {"Soccer": ["La Liga"]}, ACTIVE)     # one league
+    ix.upsert(5, 0, mask_of(["bet365"]), [], {}, ACTIVE)                       # lacks bwin
+    ix.upsert(6, 0, ALL_MASK, [], {}, "2020-01-01 00:00:00")                   # expired
+    ix.upsert(7, 0, ALL_MASK, [], {}, None)                                    # never subscribed
+    ix.upsert(8, 0, ALL_MASK, [NONE_MARKER], {}, ACTIVE)                       # no sport at all
+    ix.upsert(9, 0, ALL_MASK, ["Soccer"], {"Soccer": [NONE_MARKER]}, ACTIVE)   # no soccer league
+    return ix
+
+
+def test_match_filters_every_dimension(index):
+    assert sorted(index.match(3.0, "Soccer", "Spain - LaLiga", BET_BOOKIES, NOW)) == [1, 4]
+    assert sorted(index.match(3.0, "Soccer", "Serie A", BET_BOOKIES, NOW)) == [1]
+    assert sorted(index.match(3.0, "Tennis", "ATP", BET_BOOKIES, NOW)) == [1, 3]
+    assert sorted(index.match(6.0, "Tennis", "ATP", BET_BOOKIES, NOW)) == [1, 2, 3]
+
+
+def test_bookie_mask_must_cover_the_bet(index):
+    assert 5 not in index.match(3.0, "Soccer", "Serie A", BET_BOOKIES, NOW)
+    assert 5 in index.match(3.0, "Soccer", "Serie A", mask_of(["Bet365 ES"]), NOW)
+    # Unregistered bookie: nobody holds it
+    assert index.match(3.0, "Soccer", "Serie A", mask_of(["bet365", "Some New Bookie"]), NOW) == []
+
+
+def test_upsert_replaces_and_remove_frees_the_slot(index):
+    index.upsert(3, 0, ALL_MASK, ["Soccer"], {}, ACTIVE)
+    assert 3 in index.match(3.0, "Soccer", "Serie A", BET_BOOKIES, NOW)
+    assert 3 not in index.match(3.0, "Tennis", "ATP", BET_BOOKIES, NOW)
+
+    index.remove(4)
+    assert 4 not in index.match(3.0, "Soccer", "La Liga", BET_BOOKIES, NOW)
+    assert len(index) == 8
+    index.upsert(10, 0, ALL_MASK, [], {}, ACTIVE)  # Reuses the freed slot
+    assert 10 in index.match(3.0, "Soccer", "La Liga", BET_BOOKIES, NOW)
+    assert len(index) == 9
+
+
+def test_duplicate_preferences_and_clear(index):
+    index.upsert(11, 0, ALL_MASK, ["Soccer", "Soccer"], {"Soccer": ["La Liga", "La Liga"]}, ACTIVE)
+    index.remove(11)
+    assert 11 not in index.match(3.0, "Soccer", "La Liga", BET_BOOKIES, NOW)
+    index.clear()
+    assert len(index) == 0
+    assert index.match(3.0, "Soccer", "La Liga", BET_BOOKIES, NOW) == []
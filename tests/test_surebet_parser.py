@@ -0,0 +1,41 @@
+import logging
+from pathlib import Path
+
+import pytest
+
+import surebet_parser
+from bench_parser import DUMP_FILE, synthetic_page
+
+DUMP = Path(__file__).resolve().parent.parent / DUMP_FILE
+
+
+@pytest.fixture(scope="module")
+def pages():
+    logging.disable(logging.INFO)
+    html = DUMP.read_text(encoding="utf-8")
+    yield {"dump": html, "500 rows": synthetic_page(html, 500)}
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope="module")
+def golden(pages):
+    # Today's parser: BeautifulSoup
+    return {label: surebet_parser.extract_rows_bs4(html) for label, html in pages.items()}
+
+
+def test_golden_pages_have_rows(golden):
+    assert golden["dump"]
+    assert len(golden["500 rows"]) == 500
+
+
+@pytest.mark.parametrize("label", ["dump", "500 rows"])
+@pytest.mark.parametrize("backend", ["bs4", "lxml", "selectolax"])
+def test_backend_matches_bs4(backend, label, pages, golden):
+    if backend not in surebet_parser.BACKENDS:
+        pytest.skip(f"{backend} not installed")
+    assert surebet_parser.BACKENDS[backend](pages[label]) == golden[label]
+
+
+def test_auto_backend_matches_bs4(pages, golden):
+    name, fn = surebet_parser.get_backend("auto")
+    assert fn(pages["dump"]) == golden["dump"], name
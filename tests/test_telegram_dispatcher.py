@@ -0,0 +1,144 @@
+import asyncio
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from telegram.error import Forbidden, NetworkError, RetryAfter, TimedOut
+
+import telegram_dispatcher
+from rate_limit import TokenBucket
+from telegram_dispatcher import AlertDispatcher
+
+
+class FakeBot:
+    """
+    send_message() that raises the scripted errors of a chat first, then
+    succeeds. Records (chat_id, text, monotonic time) of every success.
+    """
+    def __init__(self, errors=None):
+        self.errors = {chat: list(errs) for chat, errs in (errors or {}).items()}
+        self.sent = []
+        self.calls = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls += 1
+        errs = self.errors.get(chat_id)
+        if errs:
+            raise errs.pop(0)
+        self.sent.append((chat_id, text, time.monotonic()))
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+def run(bot, submit, **kwargs):
+    """
+    Starts a dispatcher, submits through `submit(dispatcher)`, waits for the
+    queue to drain. Returns (dispatcher, results as (key, ok)).
+    """
+    results = []
+
+    async def on_result(job, ok):
+        results.append((job['key'], ok))
+
+    async def main():
+        d = AlertDispatcher(bot, on_result=on_result, **kwargs)
+        d.start()
+        submit(d)
+        await d.join()
+        await d.stop()
+        return d
+
+    return asyncio.run(main()), results
+
+
+def test_priority_order_and_duplicate_keys():
+    bot = FakeBot()
+
+    def submit(d):
+        assert d.submit(1, "low", priority=1.0, key=(1, "a"))
+        assert d.submit(2, "high", priority=9.0, key=(2, "a"))
+        assert not d.submit(1, "again", priority=5.0, key=(1, "a"))  # Already queued
+        assert d.submit(3, "mid", priority=5.0)
+
+    d, results = run(bot, submit, workers=1, per_chat_interval=0, global_rate=1000)
+    assert [text for _, text, _ in bot.sent] == ["high", "mid", "low"]
+    assert sorted(r for r in results if r[0]) == [((1, "a"), True), ((2, "a"), True)]
+    assert d.stats()['sent'] == 3 and d.stats()['pending'] == 0
+
+
+def test_per_chat_interval():
+    bot = FakeBot()
+    d, _ = run(bot, lambda d: [d.submit(1, str(i)) for i in range(3)],
+               workers=3, per_chat_interval=0.05, global_rate=1000)
+    times = [t for _, _, t in bot.sent]
+    assert all(b - a >= 0.045 for a, b in zip(times, times[1:]))
+
+
+def test_global_rate_limit():
+    # Burst of `rate` sends, then one every 1/rate seconds
+    bot = FakeBot()
+    start = time.monotonic()
+    run(bot, lambda d: [d.submit(chat, "x") for chat in range(25)],
+        workers=8, per_chat_interval=0, global_rate=20)
+    assert len(bot.sent) == 25
+    assert bot.sent[-1][2] - start >= 0.24  # 5 sends past the burst at 20/s
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(1000)
+    bucket.pause(0.1)
+    t0 = time.monotonic()
+    asyncio.run(bucket.acquire())
+    assert time.monotonic() - t0 >= 0.09
+
+
+def test_retry_after_pauses_and_resends():
+    bot = FakeBot({1: [RetryAfter(timedelta(seconds=0.2))]})
+    start = time.monotonic()
+    d, results = run(bot, lambda d: d.submit(1, "x", key=(1, 1)),
+                     workers=1, per_chat_interval=0, global_rate=1000)
+    assert results == [((1, 1), True)]
+    assert bot.sent[0][2] - start >= 0.19
+    assert d.retried == 1 and d.sent == 1
+
+
+def test_network_errors_back_off_then_give_up(monkeypatch):
+    waits = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(telegram_dispatcher.asyncio, "sleep", fake_sleep)
+    bot = FakeBot({
+        1: [TimedOut(), NetworkError("reset")],                 # recovers on the 3rd try
+        2: [TimedOut(), TimedOut(), TimedOut(), TimedOut()],    # one more than max_retries
+    })
+    d, results = run(bot, lambda d: [d.submit(1, "x", key=(1, 1)), d.submit(2, "x", key=(2, 1))],
+                     workers=1, per_chat_interval=0, global_rate=1000, max_retries=3)
+    assert sorted(results) == [((1, 1), True), ((2, 1), False)]
+    assert sorted(w for w in waits if w >= 1) == [1, 1, 2, 2, 4]  # 2 ** attempt per chat
+    assert d.failed == 1
+
+
+def test_forbidden_is_not_retried():
+    bot = FakeBot({1: [Forbidden("bot was blocked by the user")]})
+    d, results = run(bot, lambda d: d.submit(1, "x", key=(1, 1)),
+                     workers=1, per_chat_interval=0, global_rate=1000)
+    assert results == [((1, 1), False)]
+    assert bot.calls == 1 and d.retried == 0
+
+
+def test_wait_for_room():
+    async def main():
+        bot = FakeBot()
+        d = AlertDispatcher(bot, workers=2, per_chat_interval=0, global_rate=1000)
+        for chat in range(10):
+            d.submit(chat, "x")
+        d.start()
+        await asyncio.wait_for(d.wait_for_room(2), 5)
+        assert d.stats()['pending'] <= 2
+        await d.join()
+        await d.stop()
+
+    asyncio.run(main())
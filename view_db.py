@@ -28,12 +28,47 @@ def main():
         df = pd.read_sql_query("SELECT found_at, event, profit, league FROM surebets ORDER BY id DESC LIMIT 5", conn)
         print(df.to_string(index=False))
         
-        # 3. Export to CSV option
+        # 3. Bookies (aggregated in SQL over surebet_legs)
+        has_legs = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'surebet_legs'").fetchone()
+        if has_legs:
+            print("\n🏦 Top 10 Bookies:")
+            df = pd.read_sql_query("""
+                SELECT b.name AS bookie, COUNT(*) AS legs, ROUND(AVG(l.odds), 2) AS avg_odds, ROUND(AVG(s.profit), 2) AS avg_profit
+                FROM surebet_legs l
+                JOIN bookies b ON b.id = l.bookie_id
+                JOIN surebets s ON s.id = l.surebet_id
+                GROUP BY b.id ORDER BY legs DESC LIMIT 10
+            """, conn)
+            print(df.to_string(index=False))
+        
+        # 4. Alert deliveries (delivery log written by the filter bot)
+        has_deliveries = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'deliveries'").fetchone()
+        if has_deliveries:
+            print("\n📨 Deliveries:")
+            df = pd.read_sql_query("""
+                SELECT status, COUNT(*) AS alerts, COUNT(DISTINCT user_id) AS users,
+                       ROUND(AVG(latency_ms)) AS avg_ms, MAX(latency_ms) AS max_ms
+                FROM deliveries GROUP BY status ORDER BY alerts DESC
+            """, conn)
+            print(df.to_string(index=False))
+        
+        # 5. Export to CSV option
         export = input("\n💾 Do you want to export ALL to 'surebets_export.csv'? (y/n): ")
         if export.lower() == 'y':
             df_all = pd.read_sql_query("SELECT * FROM surebets ORDER BY id DESC", conn)
             df_all.to_csv("surebets_export.csv", index=False)
             print(f"✅ Exported {len(df_all)} rows to 'surebets_export.csv'.")
+            if has_legs:
+                # One row per leg, numeric odds, ready for spreadsheets
+                df_legs = pd.read_sql_query("""
+                    SELECT l.surebet_id, s.found_at, s.event, s.profit, l.leg_no, b.name AS bookie, l.market, l.odds
+                    FROM surebet_legs l
+                    JOIN bookies b ON b.id = l.bookie_id
+                    JOIN surebets s ON s.id = l.surebet_id
+                    ORDER BY l.surebet_id DESC, l.leg_no
+                """, conn)
+                df_legs.to_csv("surebet_legs_export.csv", index=False)
+                print(f"✅ Exported {len(df_legs)} legs to 'surebet_legs_export.csv'.")
             
         conn.close()
         